@@ -6,72 +6,194 @@ Main entry point that orchestrates credit checking, parsing, AI processing, and
 
 import json
 import os
-from typing import Dict, Any, Optional
-import boto3
-from botocore.exceptions import ClientError
-
-# Import local modules
-from src.conversation_parser import parse_conversation
-from src.gemini_processor import process_with_gemini_fallback
-from src.template_engine import render_journal_entry_safe
-
-# Initialize DynamoDB outside handler for connection reuse
-dynamodb = boto3.resource("dynamodb")
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
+
+# Import local modules (heavy SDKs inside them are imported lazily)
+from src import async_jobs, profiling
+from src.conversation_parser import parse_conversation_messages
+from src.credit_lease import CreditLeaseManager
+from src.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    check_deadline,
+    deadline_scope,
+    propagate_context,
+)
+from src.gemini_processor import get_model, load_genai
+from src.metrics import count, metrics_scope, set_property, span
+from src.chunked_processor import map_reduce_journal
+from src.model_router import (
+    RequestTooLargeError,
+    process_with_routing,
+    route_request,
+    routed_models,
+)
+from src.streaming import JournalStreamRenderer, stream_journal_entry
+from src.template_engine import get_template, render_journal_entry_safe
+from src.text_reducer import format_report, reduce_messages
+
+# DynamoDB is created on first use and reused across warm invocations
 table_name = os.environ.get("USER_CREDITS_TABLE_NAME", "RIJG-UserCredits")
-credits_table = dynamodb.Table(table_name)
+credits_table: Optional[Any] = None
+_credits_table_lock = threading.Lock()
 
 # Default free credits for new users
 DEFAULT_FREE_CREDITS = 5
 
+# Credit leases: reserve this many credits per user per warm container (<= 1 disables)
+CREDIT_LEASE_SIZE = int(os.environ.get("CREDIT_LEASE_SIZE", "0"))
+CREDIT_LEASE_TTL_SECONDS = float(os.environ.get("CREDIT_LEASE_TTL_SECONDS", "300"))
+CREDIT_LEASE_FLUSH_CREDITS = int(os.environ.get("CREDIT_LEASE_FLUSH_CREDITS", "5"))
+lease_manager: Optional[CreditLeaseManager] = None
+_lease_manager_lock = threading.Lock()
+
+# Batch requests: maximum conversations per request and concurrent Gemini calls
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "100"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+
+# Events with these sources (or {"warmup": true}) only preload dependencies
+WARMUP_EVENT_SOURCES = {"rijg.warmup", "aws.events", "serverless-plugin-warmup"}
+
+RESPONSE_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+STREAM_RESPONSE_HEADERS = {
+    "Content-Type": "text/markdown; charset=utf-8",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+def get_credits_table() -> Any:
+    """
+    Return the DynamoDB credits table, creating the boto3 resource on first use.
+
+    Returns:
+        boto3 DynamoDB Table resource
+    """
+    global credits_table
+    if credits_table is None:
+        with _credits_table_lock:
+            if credits_table is None:
+                import boto3
+
+                dynamodb = boto3.resource("dynamodb")
+                credits_table = dynamodb.Table(table_name)
+    return credits_table
+
+
+def get_lease_manager() -> Optional[CreditLeaseManager]:
+    """
+    Return the container's credit lease manager, or None if leases are disabled.
+
+    Returns:
+        CreditLeaseManager when CREDIT_LEASE_SIZE > 1, otherwise None
+    """
+    global lease_manager
+    if CREDIT_LEASE_SIZE <= 1:
+        return None
+    if lease_manager is None:
+        with _lease_manager_lock:
+            if lease_manager is None:
+                manager = CreditLeaseManager(
+                    get_credits_table(),
+                    lease_size=CREDIT_LEASE_SIZE,
+                    lease_ttl_seconds=CREDIT_LEASE_TTL_SECONDS,
+                    usage_flush_credits=CREDIT_LEASE_FLUSH_CREDITS,
+                    free_credits=DEFAULT_FREE_CREDITS,
+                    fallback_deduct=deduct_credits,
+                )
+                manager.install_shutdown_hooks()
+                lease_manager = manager
+    return lease_manager
+
+
+def deduct_credits(user_id: str, amount: int = 1) -> Optional[int]:
+    """
+    Atomically deduct credits in a single conditional UpdateItem.
+
+    New users are created with DEFAULT_FREE_CREDITS via if_not_exists, and the
+    condition rejects the update when the balance would drop below zero, so
+    concurrent requests for the same user can never overspend.
+
+    Args:
+        user_id: Unique user identifier
+        amount: Number of credits to deduct
+
+    Returns:
+        The new balance, or None if the user has insufficient credits
+
+    Raises:
+        ClientError: For DynamoDB errors other than a failed condition
+    """
+    from botocore.exceptions import ClientError
+
+    condition = "credit_balance >= :amount"
+    if amount <= DEFAULT_FREE_CREDITS:
+        condition = "attribute_not_exists(credit_balance) OR " + condition
+
+    try:
+        response = get_credits_table().update_item(
+            Key={"user_id": user_id},
+            UpdateExpression=(
+                "SET credit_balance = "
+                "if_not_exists(credit_balance, :free_credits) - :amount"
+            ),
+            ConditionExpression=condition,
+            ExpressionAttributeValues={
+                ":free_credits": DEFAULT_FREE_CREDITS,
+                ":amount": amount,
+            },
+            ReturnValues="UPDATED_NEW",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+
+    return int(response["Attributes"]["credit_balance"])
 
-def check_and_deduct_credits(user_id: str) -> bool:
+
+def check_and_deduct_credits(user_id: str, amount: int = 1) -> bool:
     """
-    Check if user has credits and deduct one if available.
+    Check if user has enough credits and deduct them if available.
 
     For MVP: Creates new users with free credits automatically.
 
     Args:
         user_id: Unique user identifier
+        amount: Number of credits to deduct (one per conversation)
 
     Returns:
-        True if credit was successfully deducted, False if insufficient credits
+        True if credits were successfully deducted, False if insufficient credits
     """
     # Mock credit check for local testing
     if os.environ.get("AWS_SAM_LOCAL") == "true":
         print(f"[MOCK] Bypassing credit check for local testing (user: {user_id})")
         return True
 
-    try:
-        # Try to get the user's current credits
-        response = credits_table.get_item(Key={"user_id": user_id})
-
-        if "Item" not in response:
-            # User doesn't exist - create them with free credits (MVP behavior)
-            credits_table.put_item(
-                Item={"user_id": user_id, "credit_balance": DEFAULT_FREE_CREDITS}
-            )
-            print(
-                f"Created new user {user_id} with {DEFAULT_FREE_CREDITS} free credits"
-            )
-            # Fetch the newly created item
-            response = credits_table.get_item(Key={"user_id": user_id})
-
-        current_balance = response["Item"]["credit_balance"]
+    from botocore.exceptions import ClientError
 
-        # Check if user has credits
-        if current_balance <= 0:
-            print(f"User {user_id} has insufficient credits: {current_balance}")
+    try:
+        # Serve from an in-memory lease when enabled (no DynamoDB write)
+        leases = get_lease_manager()
+        if leases is not None:
+            if not leases.acquire(user_id, amount):
+                print(f"User {user_id} has insufficient credits (lease mode)")
+                return False
+            return True
+
+        new_balance = deduct_credits(user_id, amount)
+
+        if new_balance is None:
+            print(f"User {user_id} has insufficient credits for {amount} request(s)")
             return False
 
-        # Deduct one credit
-        new_balance = current_balance - 1
-        credits_table.update_item(
-            Key={"user_id": user_id},
-            UpdateExpression="SET credit_balance = :new_balance",
-            ExpressionAttributeValues={":new_balance": new_balance},
-        )
-
-        print(f"Deducted credit for {user_id}. New balance: {new_balance}")
+        print(f"Deducted {amount} credit(s) for {user_id}. New balance: {new_balance}")
         return True
 
     except ClientError as e:
@@ -83,10 +205,357 @@ def check_and_deduct_credits(user_id: str) -> bool:
         return True
 
 
+def refund_credits(user_id: str, amount: int = 1) -> bool:
+    """
+    Give credits back for requests that could not be completed.
+
+    Args:
+        user_id: Unique user identifier
+        amount: Number of credits to return
+
+    Returns:
+        True if the refund was recorded, False if it failed
+    """
+    if os.environ.get("AWS_SAM_LOCAL") == "true":
+        print(f"[MOCK] Skipping credit refund for local testing (user: {user_id})")
+        return True
+
+    try:
+        get_credits_table().update_item(
+            Key={"user_id": user_id},
+            UpdateExpression="ADD credit_balance :amount",
+            ExpressionAttributeValues={":amount": amount},
+        )
+        print(f"Refunded {amount} credit(s) to {user_id}")
+        return True
+    except Exception as e:
+        print(f"Failed to refund {amount} credit(s) to {user_id}: {e}")
+        return False
+
+
+def is_warmup_event(event: Any) -> bool:
+    """Return True for scheduled warm-up pings rather than journal requests."""
+    if not isinstance(event, dict):
+        return False
+    return event.get("warmup") is True or event.get("source") in WARMUP_EVENT_SOURCES
+
+
+def preload_dependencies() -> Dict[str, Any]:
+    """
+    Import heavy SDKs and build reusable clients in parallel.
+
+    Creates the DynamoDB table resource, the Gemini models of every routing
+    tier (no API call is made) and the compiled template. Never touches credits
+    or calls Gemini.
+
+    Returns:
+        Dictionary mapping each component to its load time in ms, or an error
+    """
+
+    def load_gemini():
+        load_genai()
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if api_key:
+            for model_name in routed_models():
+                get_model(model_name, api_key)
+
+    loaders = {
+        "dynamodb": get_credits_table,
+        "gemini": load_gemini,
+        "template": get_template,
+    }
+
+    def timed(name):
+        start = time.perf_counter()
+        try:
+            loaders[name]()
+            return name, round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            return name, f"error: {e}"
+
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        return dict(executor.map(timed, loaders))
+
+
+# Optionally start loading during the init phase instead of the first request
+if os.environ.get("RIJG_PRELOAD_ON_INIT") == "true":
+    threading.Thread(target=preload_dependencies, daemon=True).start()
+
+
+def _build_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build an API Gateway response with JSON body and CORS headers."""
+    return {
+        "statusCode": status_code,
+        "headers": dict(RESPONSE_HEADERS),
+        "body": json.dumps(body),
+    }
+
+
+def _insufficient_credits_response() -> Dict[str, Any]:
+    return _build_response(
+        402,
+        {
+            "error": "Insufficient credits",
+            "message": "You have no remaining credits. Please purchase more to continue.",
+        },
+    )
+
+
+def run_pipeline(conversation_data: dict) -> Dict[str, Any]:
+    """
+    Run parse -> reduce -> Gemini -> merge -> render for a single conversation.
+
+    Args:
+        conversation_data: Raw ChatGPT conversation dictionary
+
+    Returns:
+        Dictionary with markdown_content and metadata
+
+    Raises:
+        ValueError: For validation or parsing errors
+        Exception: For processing errors (Gemini, template rendering, etc.)
+    """
+    # Step 1: Parse the conversation
+    print("Step 1: Parsing conversation...")
+    with span("parse"):
+        parsed_data, messages = parse_conversation_messages(conversation_data)
+    print(f"Parsed conversation: {parsed_data.get('title', 'Unknown')}")
+    set_property("source_id", parsed_data.get("source_id"))
+
+    # Step 2: Reduce the prompt text (the transcript keeps the full text)
+    with span("reduce"):
+        prompt_text, reduction = reduce_messages(messages)
+    print(f"Reduced prompt text: {format_report(reduction)}")
+    count("prompt_tokens_estimated", reduction["reduced_tokens"])
+
+    check_deadline("Gemini processing")
+
+    # Step 3: Route by size and process with Gemini (map-reduce for very long
+    # conversations; inputs over budget are rejected before any API call)
+    print("Step 3: Processing with Gemini...")
+    with span("llm"):
+        gemini_data = process_with_routing(prompt_text)
+    print(f"Gemini processing complete: {gemini_data.get('title', 'Unknown')}")
+
+    # Step 4: Merge the data
+    print("Step 4: Merging data...")
+    with span("merge"):
+        final_data = {**parsed_data, **gemini_data}
+
+    check_deadline("rendering")
+
+    # Step 5: Render the Markdown
+    print("Step 5: Rendering Markdown...")
+    with span("render"):
+        markdown_content = render_journal_entry_safe(final_data)
+    print(f"Rendered {len(markdown_content)} characters of Markdown")
+    count("markdown_bytes", len(markdown_content.encode("utf-8")), "Bytes")
+
+    return {
+        "markdown_content": markdown_content,
+        "metadata": {
+            "title": final_data.get("title"),
+            "date": final_data.get("date"),
+            "topic": final_data.get("topic"),
+            "tags": final_data.get("tags"),
+            "source_id": final_data.get("source_id"),
+        },
+    }
+
+
+def stream_pipeline(conversation_data: dict) -> Iterator[str]:
+    """
+    Streaming variant of run_pipeline that yields the Markdown as it is generated.
+
+    Parsing, reduction and routing run before this returns, so invalid or
+    oversized input raises straight away. The returned iterator yields the
+    front-matter and title once Gemini has sent them, then the entry body as it
+    arrives, then the transcript. Conversations routed to map-reduce can't be
+    streamed and are yielded as one chunk once rendered.
+
+    Args:
+        conversation_data: Raw ChatGPT conversation dictionary
+
+    Returns:
+        Iterator of Markdown chunks that concatenate to the run_pipeline output
+
+    Raises:
+        ValueError: For validation, parsing or size errors
+    """
+    parsed_data, messages = parse_conversation_messages(conversation_data)
+    prompt_text, reduction = reduce_messages(messages)
+    print(f"Reduced prompt text: {format_report(reduction)}")
+    route = route_request(prompt_text)
+    print(f"Streaming ~{route['estimated_tokens']} tokens (tier {route['tier']})")
+
+    def chunks() -> Iterator[str]:
+        check_deadline("Gemini processing")
+        if route["mode"] == "chunked":
+            gemini_data = map_reduce_journal(
+                prompt_text,
+                segment_tokens=route["segment_tokens"],
+                models=route["models"],
+            )
+            check_deadline("rendering")
+            yield render_journal_entry_safe({**parsed_data, **gemini_data})
+            return
+
+        renderer = JournalStreamRenderer(parsed_data)
+        for event in stream_journal_entry(prompt_text, models=route["models"]):
+            yield from renderer.feed(event)
+
+    return chunks()
+
+
+def _run_batch_item(index: int, conversation_data: Any) -> Dict[str, Any]:
+    """Run the pipeline for one batch item, capturing errors per item."""
+    try:
+        if not isinstance(conversation_data, dict):
+            raise ValueError("Each conversation must be a JSON object")
+        return {"index": index, "success": True, **run_pipeline(conversation_data)}
+    except DeadlineExceededError as e:
+        print(f"Batch item {index} deadline exceeded: {e}")
+        return {
+            "index": index,
+            "success": False,
+            "error": "Deadline exceeded",
+            "message": str(e),
+        }
+    except RequestTooLargeError as e:
+        print(f"Batch item {index} too large: {e}")
+        return {
+            "index": index,
+            "success": False,
+            "error": "Request too large",
+            "message": str(e),
+        }
+    except ValueError as e:
+        print(f"Batch item {index} validation error: {e}")
+        return {
+            "index": index,
+            "success": False,
+            "error": "Invalid input",
+            "message": str(e),
+        }
+    except Exception as e:
+        print(f"Batch item {index} processing error: {e}")
+        return {
+            "index": index,
+            "success": False,
+            "error": "Processing failed",
+            "message": str(e),
+        }
+
+
+def process_batch(
+    conversations: List[Any], max_concurrency: int = BATCH_MAX_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Run the pipeline for many conversations with bounded concurrency.
+
+    Gemini calls are I/O bound, so a thread pool keeps up to max_concurrency
+    requests in flight and total latency approaches that of the slowest item.
+
+    Args:
+        conversations: List of raw ChatGPT conversation dictionaries
+        max_concurrency: Maximum number of conversations processed at once
+
+    Returns:
+        Per-item results in input order
+    """
+    if not conversations:
+        return []
+
+    workers = max(1, min(max_concurrency, len(conversations)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                propagate_context(_run_batch_item),
+                range(len(conversations)),
+                conversations,
+            )
+        )
+
+
+def _handle_batch(user_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle a batch request: {"user_id": ..., "conversations": [...]}."""
+    conversations = body["conversations"]
+
+    if not isinstance(conversations, list) or not conversations:
+        return _build_response(
+            400,
+            {
+                "error": "Invalid input",
+                "message": "'conversations' must be a non-empty list",
+            },
+        )
+
+    if len(conversations) > BATCH_MAX_ITEMS:
+        return _build_response(
+            400,
+            {
+                "error": "Invalid input",
+                "message": f"Batch exceeds maximum of {BATCH_MAX_ITEMS} conversations",
+            },
+        )
+
+    max_concurrency = body.get("max_concurrency", BATCH_MAX_CONCURRENCY)
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        return _build_response(
+            400,
+            {
+                "error": "Invalid input",
+                "message": "'max_concurrency' must be a positive integer",
+            },
+        )
+    max_concurrency = min(max_concurrency, BATCH_MAX_CONCURRENCY)
+
+    # One credit per conversation, deducted in a single check for the batch
+    if not check_and_deduct_credits(user_id, amount=len(conversations)):
+        return _insufficient_credits_response()
+
+    print(
+        f"Processing batch of {len(conversations)} conversations "
+        f"(max concurrency: {max_concurrency})"
+    )
+    results = process_batch(conversations, max_concurrency=max_concurrency)
+    succeeded = sum(1 for result in results if result["success"])
+
+    # Conversations cut off by the deadline or rejected by the router before
+    # any API call are not charged
+    timed_out = sum(
+        1 for result in results if result.get("error") == "Deadline exceeded"
+    )
+    too_large = sum(
+        1 for result in results if result.get("error") == "Request too large"
+    )
+    uncharged = timed_out + too_large
+    refunded = uncharged if uncharged and refund_credits(user_id, uncharged) else 0
+
+    return _build_response(
+        504 if timed_out == len(results) else 200,
+        {
+            "success": succeeded == len(results),
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "refunded": refunded,
+            "results": results,
+        },
+    )
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Main Lambda handler for journal generation.
 
+    The body is either a single conversation ({"conversation": {...}}) or a batch
+    ({"conversations": [...], "max_concurrency": 8}). Work is bounded by a
+    deadline taken from context.get_remaining_time_in_millis(); a request that
+    runs out of time gets a 504 response and its credit back. Stage timings and
+    Gemini usage are emitted as one EMF metrics record per request; invocations
+    can be profiled on request (see src.profiling).
+
     Args:
         event: API Gateway event with conversation JSON in body
         context: Lambda context object
@@ -94,130 +563,369 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Returns:
         API Gateway response with status code and body
     """
+    # Warm-up ping - preload clients without touching credits or Gemini
+    if is_warmup_event(event):
+        loaded = preload_dependencies()
+        print(f"Warm-up complete: {loaded}")
+        return _build_response(200, {"warmed": True, "loaded": loaded})
+
+    profile_mode = (
+        profiling.requested_profile_mode(event) if profiling.PROFILING_ENABLED else None
+    )
+    if profile_mode is None:
+        return _handle_with_metrics(event, context)
+
+    with profiling.profiled(profile_mode) as report:
+        response = _handle_with_metrics(event, context)
+        report["source_id"] = _response_source_id(response)
+        return response
+
+
+def _handle_with_metrics(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Run _handle_journal_request inside a metrics scope."""
+    with metrics_scope(handler="lambda_handler"):
+        with span("handler"):
+            response = _handle_journal_request(event, context)
+        set_property("status_code", response["statusCode"])
+        count("response_bytes", len(response["body"].encode("utf-8")), "Bytes")
+        return response
+
+
+def _response_source_id(response: Dict[str, Any]) -> str:
+    """source_id of the conversation a response is for (to tag profiles)."""
+    try:
+        body = json.loads(response["body"])
+    except (KeyError, TypeError, ValueError):
+        return "unknown"
+    if "results" in body:
+        return f"batch-{len(body['results'])}"
+    return (body.get("metadata") or {}).get("source_id") or "unknown"
+
+
+def _handle_journal_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Handle a single or batch journal request (see lambda_handler)."""
     try:
         # Parse the request body
         body = event.get("body", "{}")
 
         # Handle both string and dict body
         if isinstance(body, str):
+            count("request_bytes", len(body.encode("utf-8")), "Bytes")
             body = json.loads(body)
 
         # Extract user ID (default to test-user for MVP)
         user_id = body.get("user_id", "test-user")
 
+        deadline = Deadline.from_lambda_context(context)
+
+        # Batch request - credits are deducted once for the whole batch
+        if "conversations" in body:
+            with deadline_scope(deadline):
+                return _handle_batch(user_id, body)
+
         # Check and deduct credits
         if not check_and_deduct_credits(user_id):
-            return {
-                "statusCode": 402,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                },
-                "body": json.dumps(
-                    {
-                        "error": "Insufficient credits",
-                        "message": "You have no remaining credits. Please purchase more to continue.",
-                    }
-                ),
-            }
+            return _insufficient_credits_response()
 
         # Extract conversation data
         conversation_data = body.get("conversation", body)
 
         # THE PIPELINE
         try:
-            # Step 1: Parse the conversation
-            print("Step 1: Parsing conversation...")
-            parsed_data = parse_conversation(conversation_data)
-            print(f"Parsed conversation: {parsed_data.get('title', 'Unknown')}")
-
-            # Step 2: Process with Gemini
-            print("Step 2: Processing with Gemini...")
-            gemini_data = process_with_gemini_fallback(parsed_data["raw_text"])
-            print(f"Gemini processing complete: {gemini_data.get('title', 'Unknown')}")
-
-            # Step 3: Merge the data
-            print("Step 3: Merging data...")
-            final_data = {**parsed_data, **gemini_data}
-
-            # Step 4: Render the Markdown
-            print("Step 4: Rendering Markdown...")
-            markdown_content = render_journal_entry_safe(final_data)
-            print(f"Rendered {len(markdown_content)} characters of Markdown")
+            with deadline_scope(deadline):
+                result = run_pipeline(conversation_data)
 
             # Return success response
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
+            return _build_response(200, {"success": True, **result})
+
+        except DeadlineExceededError as e:
+            # Out of time - respond before Lambda kills the invocation
+            print(f"Deadline exceeded: {e}")
+            refunded = refund_credits(user_id)
+            return _build_response(
+                504,
+                {
+                    "error": "Deadline exceeded",
+                    "message": str(e),
+                    "refunded": refunded,
                 },
-                "body": json.dumps(
-                    {
-                        "success": True,
-                        "markdown_content": markdown_content,
-                        "metadata": {
-                            "title": final_data.get("title"),
-                            "date": final_data.get("date"),
-                            "topic": final_data.get("topic"),
-                            "tags": final_data.get("tags"),
-                            "source_id": final_data.get("source_id"),
-                        },
-                    }
-                ),
-            }
+            )
+
+        except RequestTooLargeError as e:
+            # Rejected by the router before any API call - nothing to charge for
+            print(f"Validation error: {e}")
+            refunded = refund_credits(user_id)
+            return _build_response(
+                400,
+                {"error": "Invalid input", "message": str(e), "refunded": refunded},
+            )
 
         except ValueError as e:
             # Validation or parsing errors
             print(f"Validation error: {e}")
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                },
-                "body": json.dumps({"error": "Invalid input", "message": str(e)}),
-            }
+            return _build_response(400, {"error": "Invalid input", "message": str(e)})
 
         except Exception as e:
             # Processing errors (Gemini, template rendering, etc.)
             print(f"Processing error: {e}")
-            return {
-                "statusCode": 500,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                },
-                "body": json.dumps({"error": "Processing failed", "message": str(e)}),
-            }
+            return _build_response(
+                500, {"error": "Processing failed", "message": str(e)}
+            )
 
     except json.JSONDecodeError as e:
         # Invalid JSON in request body
         print(f"JSON decode error: {e}")
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-            },
-            "body": json.dumps(
-                {"error": "Invalid JSON", "message": "Request body must be valid JSON"}
-            ),
-        }
+        return _build_response(
+            400,
+            {"error": "Invalid JSON", "message": "Request body must be valid JSON"},
+        )
 
     except Exception as e:
         # Catch-all for unexpected errors
         print(f"Unexpected error: {e}")
+        return _build_response(
+            500,
+            {
+                "error": "Internal server error",
+                "message": "An unexpected error occurred",
+            },
+        )
+
+
+def stream_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Journal generation with a streamed Markdown body, to cut time-to-first-byte.
+
+    Takes the same single-conversation body as lambda_handler. On success the
+    response body is an iterator of Markdown chunks (see stream_pipeline) for a
+    front end that can stream it, such as a Lambda Web Adapter or local server;
+    errors found before generation starts get the usual JSON responses. If
+    generation fails mid-stream the credit is refunded and the stream ends with
+    an HTML comment describing the error.
+
+    Args:
+        event: API Gateway event with conversation JSON in body
+        context: Lambda context object
+
+    Returns:
+        Response with status code, headers and body (an iterator on success)
+    """
+    try:
+        body = event.get("body", "{}")
+        if isinstance(body, str):
+            body = json.loads(body)
+
+        user_id = body.get("user_id", "test-user")
+        conversation_data = body.get("conversation", body)
+        deadline = Deadline.from_lambda_context(context)
+
+        # Validate and route before charging; nothing is generated until the
+        # body is iterated
+        try:
+            chunks = stream_pipeline(conversation_data)
+        except ValueError as e:
+            print(f"Validation error: {e}")
+            return _build_response(400, {"error": "Invalid input", "message": str(e)})
+
+        if not check_and_deduct_credits(user_id):
+            return _insufficient_credits_response()
+
         return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
+            "statusCode": 200,
+            "headers": STREAM_RESPONSE_HEADERS,
+            "body": _stream_body(chunks, user_id, deadline),
+        }
+
+    except json.JSONDecodeError as e:
+        print(f"JSON decode error: {e}")
+        return _build_response(
+            400,
+            {"error": "Invalid JSON", "message": "Request body must be valid JSON"},
+        )
+
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return _build_response(
+            500,
+            {
+                "error": "Internal server error",
+                "message": "An unexpected error occurred",
             },
-            "body": json.dumps(
+        )
+
+
+def _stream_body(
+    chunks: Iterator[str], user_id: str, deadline: Optional[Deadline]
+) -> Iterator[str]:
+    """Yield chunks under the request deadline, refunding if generation fails."""
+    with deadline_scope(deadline), metrics_scope(handler="stream_handler"):
+        try:
+            yield from chunks
+        except Exception as e:
+            print(f"Streaming error: {e}")
+            refunded = refund_credits(user_id)
+            error = (
+                "Deadline exceeded"
+                if isinstance(e, DeadlineExceededError)
+                else "Processing failed"
+            )
+            message = str(e).replace("--", "- -")
+            yield f"\n\n<!-- {error}: {message} (refunded: {refunded}) -->\n"
+
+
+def jobs_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Async job API: POST /jobs submits a conversation, GET /jobs/{job_id} polls it.
+
+    Submitting deducts the credit, stores the conversation and returns 202 with a
+    job ID straight away; the worker (worker_handler) runs the pipeline. Polling
+    returns the job status and, once succeeded, markdown_content and metadata.
+
+    Args:
+        event: API Gateway event
+        context: Lambda context object
+
+    Returns:
+        API Gateway response with status code and body
+    """
+    try:
+        if event.get("httpMethod") == "GET":
+            return _get_job_response(event)
+
+        body = event.get("body", "{}")
+        if isinstance(body, str):
+            body = json.loads(body)
+
+        user_id = body.get("user_id", "test-user")
+        conversation_data = body.get("conversation", body)
+        if (
+            not isinstance(conversation_data, dict)
+            or "mapping" not in conversation_data
+        ):
+            return _build_response(
+                400,
                 {
-                    "error": "Internal server error",
-                    "message": "An unexpected error occurred",
-                }
-            ),
-        }
+                    "error": "Invalid input",
+                    "message": "Body must contain a conversation with a 'mapping'",
+                },
+            )
+
+        if not check_and_deduct_credits(user_id):
+            return _insufficient_credits_response()
+
+        try:
+            job = async_jobs.submit_job(user_id, conversation_data)
+        except Exception as e:
+            print(f"Job submission failed: {e}")
+            refund_credits(user_id)
+            return _build_response(
+                500, {"error": "Submission failed", "message": str(e)}
+            )
+
+        print(f"Queued job {job['job_id']} for {user_id}")
+        return _build_response(202, {"job_id": job["job_id"], "status": job["status"]})
+
+    except json.JSONDecodeError as e:
+        print(f"JSON decode error: {e}")
+        return _build_response(
+            400,
+            {"error": "Invalid JSON", "message": "Request body must be valid JSON"},
+        )
+
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return _build_response(
+            500,
+            {
+                "error": "Internal server error",
+                "message": "An unexpected error occurred",
+            },
+        )
+
+
+def _get_job_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the status (and result, when done) of the job in the request path."""
+    job_id = (event.get("pathParameters") or {}).get("job_id")
+    user_id = (event.get("queryStringParameters") or {}).get("user_id", "test-user")
+
+    job = async_jobs.get_job(job_id) if job_id else None
+    if job is None or job.get("user_id") != user_id:
+        return _build_response(
+            404, {"error": "Not found", "message": f"No job with id {job_id}"}
+        )
+    return _build_response(200, job)
+
+
+def worker_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    SQS worker: run the pipeline for each queued job in the batch.
+
+    Jobs in a batch run concurrently. Pipeline errors mark the job failed and
+    refund its credit; infrastructure errors are reported as batch item failures
+    so SQS redelivers just those messages.
+
+    Args:
+        event: SQS event ({"Records": [{"messageId": ..., "body": '{"job_id": ...}'}]})
+        context: Lambda context object
+
+    Returns:
+        {"batchItemFailures": [...]} for partial batch responses
+    """
+    records = event.get("Records", [])
+    if not records:
+        return {"batchItemFailures": []}
+
+    workers = max(1, min(BATCH_MAX_CONCURRENCY, len(records)))
+    with deadline_scope(Deadline.from_lambda_context(context)):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            failures = list(executor.map(propagate_context(_run_job_record), records))
+
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id} for message_id in failures if message_id
+        ]
+    }
+
+
+def _run_job_record(record: Dict[str, Any]) -> Optional[str]:
+    """Run one SQS record's job; return its messageId if it should be retried."""
+    try:
+        job_id = json.loads(record["body"])["job_id"]
+        with metrics_scope(handler="worker_handler", job_id=job_id):
+            job = async_jobs.run_job(job_id, run_pipeline)
+        if job is not None and job["status"] == async_jobs.FAILED:
+            refund_credits(job["user_id"])
+        return None
+    except Exception as e:
+        print(f"Worker error for message {record.get('messageId')}: {e}")
+        return record.get("messageId")
+
+
+def run_local_worker(max_jobs: Optional[int] = None) -> int:
+    """
+    Drain the local job queue through worker_handler (JOB_BACKEND=local).
+
+    Args:
+        max_jobs: Stop after this many jobs (default: until the queue is empty)
+
+    Returns:
+        Number of jobs handed to the worker
+    """
+    backend = async_jobs.get_job_backend()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        batch_size = 10 if max_jobs is None else min(10, max_jobs - processed)
+        job_ids = backend.receive(batch_size)
+        if not job_ids:
+            break
+        worker_handler(
+            {
+                "Records": [
+                    {"messageId": job_id, "body": json.dumps({"job_id": job_id})}
+                    for job_id in job_ids
+                ]
+            },
+            None,
+        )
+        processed += len(job_ids)
+    return processed
@@ -0,0 +1,392 @@
+"""
+Async Jobs Module
+
+Submit/poll job mode: a submitted conversation is stored and queued, a worker runs
+the pipeline, and clients poll for the result. Backed by DynamoDB, S3 and SQS in
+AWS, or by a local SQLite file and directory so the flow runs offline.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+# Job backend configuration (overridable via environment)
+JOB_BACKEND = os.environ.get("JOB_BACKEND", "local")
+JOBS_TABLE_NAME = os.environ.get("JOBS_TABLE_NAME", "RIJG-Jobs")
+JOB_BUCKET_NAME = os.environ.get("JOB_BUCKET_NAME", "")
+JOB_QUEUE_URL = os.environ.get("JOB_QUEUE_URL", "")
+JOB_LOCAL_DIR = os.environ.get("JOB_LOCAL_DIR", "/tmp/rijg_jobs")
+
+# How long job records and results are kept (seconds)
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+# A running job not finished after this long may be claimed again (worker died).
+# Must stay above the worker timeout (300s) and well below the queue's
+# visibility timeout, so a redelivered message finds the job claimable.
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobInProgressError(Exception):
+    """A job is still claimed by another worker; retry the message later."""
+
+
+def _payload_key(job_id: str) -> str:
+    return f"payloads/{job_id}.json"
+
+
+def _result_key(job_id: str) -> str:
+    return f"results/{job_id}.json"
+
+
+class LocalJobBackend:
+    """
+    Offline stand-in: job records and the queue in SQLite, payloads and results
+    as JSON files in a directory.
+    """
+
+    def __init__(self, directory: str = JOB_LOCAL_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "jobs.sqlite3"), check_same_thread=False
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                status TEXT NOT NULL,
+                claimed_at REAL NOT NULL DEFAULT 0
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL
+            )
+            """)
+        self._conn.commit()
+
+    def put_object(self, key: str, value: Any) -> None:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def get_object(self, key: str) -> Any:
+        with open(os.path.join(self.directory, key), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def create_job(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, record, status) VALUES (?, ?, ?)",
+                (job["job_id"], json.dumps(job), job["status"]),
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim_job(self, job_id: str, now: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, claimed_at = ? WHERE job_id = ? "
+                "AND (status = ? OR (status = ? AND claimed_at < ?))",
+                (RUNNING, now, job_id, QUEUED, RUNNING, now - JOB_STALE_SECONDS),
+            )
+            self._conn.commit()
+            claimed = cursor.rowcount == 1
+        if claimed:
+            self._update_record(job_id, status=RUNNING, updated_at=int(now))
+        return claimed
+
+    def finish_job(self, job_id: str, **fields: Any) -> None:
+        self._update_record(job_id, **fields)
+
+    def enqueue(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT INTO job_queue (job_id) VALUES (?)", (job_id,))
+            self._conn.commit()
+
+    def receive(self, max_messages: int = 10) -> List[str]:
+        """Pop up to max_messages queued job IDs (local queue only)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, job_id FROM job_queue ORDER BY seq LIMIT ?",
+                (max_messages,),
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    "DELETE FROM job_queue WHERE seq <= ?", (rows[-1][0],)
+                )
+                self._conn.commit()
+        return [job_id for _, job_id in rows]
+
+    def _update_record(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            record = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE jobs SET record = ?, status = ? WHERE job_id = ?",
+                (json.dumps(record), record["status"], job_id),
+            )
+            self._conn.commit()
+
+
+class AWSJobBackend:
+    """
+    Job records in DynamoDB (TTL on expires_at), payloads and results in S3 and
+    the work queue in SQS. Payloads go to S3 because conversations can exceed the
+    DynamoDB item and SQS message size limits.
+    """
+
+    def __init__(
+        self,
+        table_name: str = JOBS_TABLE_NAME,
+        bucket_name: str = JOB_BUCKET_NAME,
+        queue_url: str = JOB_QUEUE_URL,
+        dynamodb_resource: Any = None,
+        s3_client: Any = None,
+        sqs_client: Any = None,
+    ):
+        import boto3
+
+        self.table = (dynamodb_resource or boto3.resource("dynamodb")).Table(table_name)
+        self.bucket_name = bucket_name
+        self.queue_url = queue_url
+        self.s3 = s3_client or boto3.client("s3")
+        self.sqs = sqs_client or boto3.client("sqs")
+
+    def put_object(self, key: str, value: Any) -> None:
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=json.dumps(value).encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def get_object(self, key: str) -> Any:
+        response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+        return json.loads(response["Body"].read())
+
+    def create_job(self, job: Dict[str, Any]) -> None:
+        self.table.put_item(
+            Item={**job, "claimed_at": 0},
+            ConditionExpression="attribute_not_exists(job_id)",
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"job_id": job_id}).get("Item")
+        if not item:
+            return None
+        item.pop("claimed_at", None)
+        return _from_dynamodb(item)
+
+    def claim_job(self, job_id: str, now: float) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.update_item(
+                Key={"job_id": job_id},
+                UpdateExpression="SET #status = :running, claimed_at = :now, "
+                "updated_at = :now",
+                ConditionExpression="#status = :queued OR "
+                "(#status = :running AND claimed_at < :stale)",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={
+                    ":running": RUNNING,
+                    ":queued": QUEUED,
+                    ":now": int(now),
+                    ":stale": int(now - JOB_STALE_SECONDS),
+                },
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    def finish_job(self, job_id: str, **fields: Any) -> None:
+        names = {f"#{name}": name for name in fields}
+        self.table.update_item(
+            Key={"job_id": job_id},
+            UpdateExpression="SET " + ", ".join(f"#{n} = :{n}" for n in fields),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={
+                f":{name}": _to_dynamodb(value) for name, value in fields.items()
+            },
+        )
+
+    def enqueue(self, job_id: str) -> None:
+        self.sqs.send_message(
+            QueueUrl=self.queue_url, MessageBody=json.dumps({"job_id": job_id})
+        )
+
+
+def _to_dynamodb(value: Any) -> Any:
+    """Convert floats (not accepted by boto3) to ints, recursively."""
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _to_dynamodb(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamodb(v) for v in value]
+    return value
+
+
+def _from_dynamodb(value: Any) -> Any:
+    """Convert boto3 Decimals back to ints, recursively."""
+    if isinstance(value, dict):
+        return {k: _from_dynamodb(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamodb(v) for v in value]
+    if type(value).__name__ == "Decimal":
+        return int(value)
+    return value
+
+
+_job_backend: Any = None
+_job_backend_lock = threading.Lock()
+
+
+def get_job_backend() -> Any:
+    """
+    Return the process-wide job backend, creating it on first use.
+
+    Environment:
+        JOB_BACKEND: local (default) or aws
+        JOBS_TABLE_NAME, JOB_BUCKET_NAME, JOB_QUEUE_URL: AWS resources
+        JOB_LOCAL_DIR: Directory for the local backend
+    """
+    global _job_backend
+    if _job_backend is None:
+        with _job_backend_lock:
+            if _job_backend is None:
+                if JOB_BACKEND == "aws":
+                    _job_backend = AWSJobBackend()
+                elif JOB_BACKEND == "local":
+                    _job_backend = LocalJobBackend()
+                else:
+                    raise ValueError(f"Unknown JOB_BACKEND: {JOB_BACKEND}")
+    return _job_backend
+
+
+def set_job_backend(backend: Any) -> None:
+    """Replace the process-wide job backend."""
+    global _job_backend
+    with _job_backend_lock:
+        _job_backend = backend
+
+
+def submit_job(user_id: str, conversation_data: dict) -> Dict[str, Any]:
+    """
+    Store a conversation and queue it for the worker.
+
+    Args:
+        user_id: Owner of the job
+        conversation_data: Raw ChatGPT conversation dictionary
+
+    Returns:
+        The new job record (status "queued")
+    """
+    backend = get_job_backend()
+    now = time.time()
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "status": QUEUED,
+        "created_at": int(now),
+        "updated_at": int(now),
+        "expires_at": int(now + JOB_TTL_SECONDS),
+    }
+
+    # Payload first, so a queued job always has its conversation
+    backend.put_object(_payload_key(job["job_id"]), conversation_data)
+    backend.create_job(job)
+    backend.enqueue(job["job_id"])
+    return job
+
+
+def get_job(job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Return a job record, with its result once the job has succeeded.
+
+    Args:
+        job_id: Job identifier
+        include_result: Load markdown_content and metadata for finished jobs
+
+    Returns:
+        Job record, or None if the job does not exist
+    """
+    backend = get_job_backend()
+    job = backend.get_job(job_id)
+    if job and include_result and job["status"] == SUCCEEDED:
+        job["result"] = backend.get_object(_result_key(job_id))
+    return job
+
+
+def run_job(
+    job_id: str, pipeline: Callable[[dict], Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Claim a queued job, run the pipeline on its conversation and record the outcome.
+
+    A job that another worker already finished is skipped, so duplicate queue
+    deliveries do no work. A job another worker is still running (and has not
+    gone stale) raises JobInProgressError, so the message is redelivered later
+    instead of being dropped while the job may never finish.
+
+    Args:
+        job_id: Job identifier
+        pipeline: Callable taking the conversation and returning the result
+            (see app.run_pipeline)
+
+    Returns:
+        The final job record, or None if the job was skipped
+
+    Raises:
+        JobInProgressError: If the job is running in another worker
+    """
+    backend = get_job_backend()
+    if not backend.claim_job(job_id, time.time()):
+        job = backend.get_job(job_id)
+        if job is not None and job["status"] == RUNNING:
+            raise JobInProgressError(f"Job {job_id} is still running elsewhere")
+        print(f"Job {job_id} already finished, skipping")
+        return None
+
+    try:
+        result = pipeline(backend.get_object(_payload_key(job_id)))
+    except Exception as e:
+        print(f"Job {job_id} failed: {e}")
+        backend.finish_job(
+            job_id, status=FAILED, error=str(e), updated_at=int(time.time())
+        )
+    else:
+        backend.put_object(_result_key(job_id), result)
+        backend.finish_job(
+            job_id,
+            status=SUCCEEDED,
+            metadata=result.get("metadata", {}),
+            updated_at=int(time.time()),
+        )
+
+    return backend.get_job(job_id)
@@ -0,0 +1,634 @@
+"""
+Batch Prediction Module
+
+Bulk mode for backfills that don't need interactive latency: conversations are
+parsed up front and written to one JSONL request file (same system instruction,
+response schema and prompt as process_with_gemini), submitted as a Gemini batch
+job, and the JSONL results are later validated and rendered. Submission and
+polling go through a backend interface; LocalBatchBackend is a file-based
+stand-in that runs jobs through the regular model client, so the whole flow
+works offline.
+
+Usage:
+    python -m src.batch_prediction prepare conversations.json batches/2024-06-01
+    python -m src.batch_prediction submit batches/2024-06-01 --backend gemini
+    python -m src.batch_prediction poll batches/2024-06-01 --poll-seconds 300
+    python -m src.batch_prediction ingest batches/2024-06-01 --vault ~/Vault
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from src.conversation_parser import parse_conversation_messages
+from src.export_reader import iter_conversations
+from src.gemini_processor import (
+    GENERATION_CONFIG,
+    PRIMARY_MODEL,
+    PROMPT_TEMPLATE,
+    SAFETY_SETTINGS,
+    SYSTEM_INSTRUCTION,
+    generate_with_retries,
+    get_api_key,
+    get_model,
+    parse_journal_response,
+)
+from src.model_router import route_request
+from src.template_engine import render_journal_entry_safe
+from src.text_reducer import reduce_messages
+
+# Batch configuration (overridable via environment)
+DEFAULT_BATCH_BACKEND = "local"
+DEFAULT_BATCH_LOCAL_DIR = "/tmp/rijg_batches"
+BATCH_MODEL = os.environ.get("BATCH_MODEL", PRIMARY_MODEL)
+BATCH_POLL_SECONDS = float(os.environ.get("BATCH_POLL_SECONDS", "60"))
+
+# Files inside a batch directory
+REQUESTS_FILE = "requests.jsonl"
+ENTRIES_FILE = "entries.jsonl"
+RESULTS_FILE = "results.jsonl"
+JOB_FILE = "job.json"
+
+# Request key of a result line, for lines that don't parse as JSON
+_RESULT_KEY = re.compile(r'"key"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# Job states reported by backends
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class BatchJobError(Exception):
+    """Raised when a batch job fails, is cancelled or does not finish in time."""
+
+
+def _api_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert RESPONSE_SCHEMA to the API's schema JSON (upper-case type names)."""
+    schema = copy.deepcopy(schema)
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node.get("type"), str):
+            node["type"] = node["type"].upper()
+        stack.extend((node.get("properties") or {}).values())
+        if isinstance(node.get("items"), dict):
+            stack.append(node["items"])
+    return schema
+
+
+def build_batch_request(prompt_text: str) -> Dict[str, Any]:
+    """
+    Build the request body for one conversation, matching process_with_gemini.
+
+    Args:
+        prompt_text: Reduced conversation text
+
+    Returns:
+        GenerateContentRequest as JSON (contents, system instruction, generation
+        config and safety settings)
+    """
+    generation_config = dict(GENERATION_CONFIG)
+    generation_config["response_schema"] = _api_schema(
+        generation_config["response_schema"]
+    )
+    return {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": PROMPT_TEMPLATE.format(text=prompt_text)}],
+            }
+        ],
+        "system_instruction": {"parts": [{"text": SYSTEM_INSTRUCTION}]},
+        "generation_config": generation_config,
+        "safety_settings": SAFETY_SETTINGS,
+    }
+
+
+def write_request_file(
+    items: Iterable[Tuple[Dict[str, Any], str]], batch_dir: Union[str, Path]
+) -> int:
+    """
+    Write the JSONL request file for parsed conversations.
+
+    Alongside requests.jsonl, entries.jsonl keeps each conversation's parsed data
+    (title, date, transcript...) so results can be rendered without the export.
+
+    Args:
+        items: (parsed data without messages, prompt text) pairs
+        batch_dir: Directory for the batch files (created if missing)
+
+    Returns:
+        Number of requests written
+    """
+    batch_dir = Path(batch_dir)
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(batch_dir / REQUESTS_FILE, "w", encoding="utf-8") as requests, open(
+        batch_dir / ENTRIES_FILE, "w", encoding="utf-8"
+    ) as entries:
+        for parsed_data, prompt_text in items:
+            key = parsed_data["source_id"]
+            request = {"key": key, "request": build_batch_request(prompt_text)}
+            requests.write(json.dumps(request, ensure_ascii=False) + "\n")
+            entries.write(json.dumps(parsed_data, ensure_ascii=False) + "\n")
+            written += 1
+    return written
+
+
+def prepare_batch(
+    conversations: Iterable[Dict[str, Any]],
+    batch_dir: Union[str, Path],
+    stats: Optional[Dict[str, int]] = None,
+) -> int:
+    """
+    Parse conversations and write their batch request file.
+
+    Conversations that fail to parse, or that the router would send to
+    map-reduce or reject, are skipped (and counted); those need the regular
+    pipeline.
+
+    Args:
+        conversations: Raw ChatGPT conversation dictionaries
+        batch_dir: Directory for the batch files
+        stats: Optional dictionary updated with prepared/skipped counts
+
+    Returns:
+        Number of requests written
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("prepared", 0)
+    stats.setdefault("skipped", 0)
+
+    def items() -> Iterator[Tuple[Dict[str, Any], str]]:
+        for conversation in conversations:
+            source_id = conversation.get("id", "unknown")
+            try:
+                parsed_data, messages = parse_conversation_messages(conversation)
+                prompt_text, _ = reduce_messages(messages)
+                route = route_request(prompt_text)
+            except ValueError as e:
+                print(f"Skipping {source_id}: {e}")
+                stats["skipped"] += 1
+                continue
+            if route["mode"] != "single":
+                print(f"Skipping {source_id}: needs map-reduce (tier {route['tier']})")
+                stats["skipped"] += 1
+                continue
+            stats["prepared"] += 1
+            yield parsed_data, prompt_text
+
+    return write_request_file(items(), batch_dir)
+
+
+def response_text(response: Dict[str, Any]) -> str:
+    """
+    Extract the generated text from a result line's response.
+
+    Raises:
+        Exception: If the response has no candidates or no text
+    """
+    candidates = response.get("candidates") or []
+    if not candidates:
+        feedback = response.get("promptFeedback") or response.get("prompt_feedback")
+        raise Exception(f"Gemini API error: No candidates in response ({feedback})")
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    text = "".join(part.get("text", "") for part in parts)
+    if not text:
+        reason = candidates[0].get("finishReason") or candidates[0].get("finish_reason")
+        raise Exception(f"Gemini API error: Empty response (finish reason {reason})")
+    return text
+
+
+def iter_batch_results(
+    batch_dir: Union[str, Path], results_path: Optional[Union[str, Path]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Validate and render the results of a batch, one conversation at a time.
+
+    Parsed data is looked up by byte offset in entries.jsonl, so memory use does
+    not grow with the batch. A result line that isn't valid JSON fails the
+    request whose key it names (if one can be read from it); requests with no
+    usable result line are reported last.
+
+    Args:
+        batch_dir: Directory written by prepare_batch / write_request_file
+        results_path: Results JSONL (default: <batch_dir>/results.jsonl)
+
+    Yields:
+        Per-conversation dictionaries with source_id and success, plus
+        markdown_content and metadata (as in run_pipeline) or error and message
+    """
+    batch_dir = Path(batch_dir)
+    results_path = Path(results_path) if results_path else batch_dir / RESULTS_FILE
+    offsets = _entry_offsets(batch_dir / ENTRIES_FILE)
+
+    with open(batch_dir / ENTRIES_FILE, "rb") as entries, open(
+        results_path, "r", encoding="utf-8"
+    ) as results:
+        for line in results:
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError as e:
+                key = _malformed_result_key(line)
+                print(f"Malformed result line for key {key}: {e}")
+                if offsets.pop(key, None) is not None:
+                    yield {
+                        "source_id": key,
+                        "success": False,
+                        "error": "Invalid result",
+                        "message": f"Malformed result line: {e}",
+                    }
+                continue
+            key = result.get("key")
+            offset = offsets.pop(key, None)
+            if offset is None:
+                print(f"Ignoring result for unknown or repeated key: {key}")
+                continue
+            entries.seek(offset)
+            parsed_data = json.loads(entries.readline())
+            yield _render_result(key, parsed_data, result)
+
+    for key in offsets:
+        yield {
+            "source_id": key,
+            "success": False,
+            "error": "Missing result",
+            "message": "The batch job returned no result for this request",
+        }
+
+
+def _malformed_result_key(line: str) -> Optional[str]:
+    """Best-effort request key of a result line that isn't valid JSON."""
+    match = _RESULT_KEY.search(line)
+    if match is None:
+        return None
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except ValueError:
+        return None
+
+
+def _entry_offsets(path: Path) -> Dict[str, int]:
+    offsets = {}
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            offsets[json.loads(line)["source_id"]] = offset
+            offset += len(line)
+    return offsets
+
+
+def _render_result(
+    key: str, parsed_data: Dict[str, Any], result: Dict[str, Any]
+) -> Dict[str, Any]:
+    try:
+        if result.get("error") or result.get("status"):
+            error = result.get("error") or result.get("status")
+            raise Exception(f"Gemini API error: {json.dumps(error)}")
+        gemini_data = parse_journal_response(response_text(result["response"]))
+        final_data = {**parsed_data, **gemini_data}
+        markdown_content = render_journal_entry_safe(final_data)
+    except Exception as e:
+        return {
+            "source_id": key,
+            "success": False,
+            "error": (
+                "Invalid input" if isinstance(e, ValueError) else "Processing failed"
+            ),
+            "message": str(e),
+        }
+    return {
+        "source_id": key,
+        "success": True,
+        "markdown_content": markdown_content,
+        "metadata": {
+            "title": final_data.get("title"),
+            "date": final_data.get("date"),
+            "topic": final_data.get("topic"),
+            "tags": final_data.get("tags"),
+            "source_id": final_data.get("source_id"),
+        },
+    }
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the Gemini batch API.
+
+    submit copies the request file into <root_dir>/<job_id>/; the first poll
+    runs every request through respond (by default the regular model client,
+    so tests can swap in a stubbed SDK) and writes results.jsonl in the batch
+    API's result format.
+
+    Args:
+        root_dir: Directory holding local jobs
+        respond: Callable(model_name, request) -> response dictionary
+    """
+
+    def __init__(
+        self,
+        root_dir: str = DEFAULT_BATCH_LOCAL_DIR,
+        respond: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None,
+    ):
+        self.root_dir = Path(root_dir)
+        self.respond = respond or _respond_with_model
+
+    def submit(self, requests_path: Union[str, Path], model_name: str) -> str:
+        job_id = f"local-{uuid.uuid4().hex[:12]}"
+        job_dir = self.root_dir / job_id
+        job_dir.mkdir(parents=True)
+        shutil.copyfile(requests_path, job_dir / REQUESTS_FILE)
+        self._set_state(job_id, PENDING, model=model_name)
+        return job_id
+
+    def poll(self, job_id: str) -> str:
+        status = self._status(job_id)
+        if status["state"] == PENDING:
+            self._set_state(job_id, RUNNING, model=status["model"])
+            try:
+                self._run(job_id, status["model"])
+            except Exception as e:
+                self._set_state(job_id, FAILED, model=status["model"], error=str(e))
+                return FAILED
+            self._set_state(job_id, SUCCEEDED, model=status["model"])
+            return SUCCEEDED
+        return status["state"]
+
+    def fetch_results(self, job_id: str, dest_path: Union[str, Path]) -> Path:
+        shutil.copyfile(self.root_dir / job_id / RESULTS_FILE, dest_path)
+        return Path(dest_path)
+
+    def _run(self, job_id: str, model_name: str) -> None:
+        job_dir = self.root_dir / job_id
+        with open(job_dir / REQUESTS_FILE, "r", encoding="utf-8") as requests, open(
+            job_dir / RESULTS_FILE, "w", encoding="utf-8"
+        ) as results:
+            for line in requests:
+                request = json.loads(line)
+                result: Dict[str, Any] = {"key": request["key"]}
+                try:
+                    result["response"] = self.respond(model_name, request["request"])
+                except Exception as e:
+                    result["error"] = {"code": 500, "message": str(e)}
+                results.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def _status(self, job_id: str) -> Dict[str, Any]:
+        with open(self.root_dir / job_id / JOB_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _set_state(self, job_id: str, state: str, **fields: Any) -> None:
+        with open(self.root_dir / job_id / JOB_FILE, "w", encoding="utf-8") as f:
+            json.dump({"state": state, **fields}, f)
+
+
+def _respond_with_model(model_name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer a batch request with the regular (synchronous) model client."""
+    prompt = "".join(
+        part.get("text", "")
+        for content in request["contents"]
+        for part in content.get("parts", [])
+    )
+    model = get_model(model_name, get_api_key())
+    response = generate_with_retries(model, prompt)
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "candidates": [
+            {"content": {"role": "model", "parts": [{"text": response.text}]}}
+        ],
+        "usageMetadata": {
+            "promptTokenCount": getattr(usage, "prompt_token_count", 0),
+            "candidatesTokenCount": getattr(usage, "candidates_token_count", 0),
+        },
+    }
+
+
+class GeminiBatchBackend:
+    """
+    Gemini API batch mode, through the google-genai SDK (imported on first use).
+
+    Args:
+        api_key: Gemini API key (default: GEMINI_API_KEY)
+    """
+
+    _STATES = {
+        "JOB_STATE_PENDING": PENDING,
+        "JOB_STATE_QUEUED": PENDING,
+        "JOB_STATE_RUNNING": RUNNING,
+        "JOB_STATE_SUCCEEDED": SUCCEEDED,
+        "JOB_STATE_FAILED": FAILED,
+        "JOB_STATE_CANCELLED": CANCELLED,
+        "JOB_STATE_EXPIRED": FAILED,
+    }
+
+    def __init__(self, api_key: Optional[str] = None):
+        from google import genai as google_genai
+
+        self.client = google_genai.Client(api_key=api_key or get_api_key())
+
+    def submit(self, requests_path: Union[str, Path], model_name: str) -> str:
+        uploaded = self.client.files.upload(
+            file=str(requests_path),
+            config={
+                "display_name": Path(requests_path).parent.name,
+                "mime_type": "jsonl",
+            },
+        )
+        job = self.client.batches.create(
+            model=model_name,
+            src=uploaded.name,
+            config={"display_name": f"rijg-{Path(requests_path).parent.name}"},
+        )
+        return job.name
+
+    def poll(self, job_id: str) -> str:
+        job = self.client.batches.get(name=job_id)
+        return self._STATES.get(job.state.name, RUNNING)
+
+    def fetch_results(self, job_id: str, dest_path: Union[str, Path]) -> Path:
+        job = self.client.batches.get(name=job_id)
+        content = self.client.files.download(file=job.dest.file_name)
+        with open(dest_path, "wb") as f:
+            f.write(content)
+        return Path(dest_path)
+
+
+def create_batch_backend(backend_name: Optional[str] = None) -> Any:
+    """
+    Create a batch backend from environment configuration.
+
+    Environment:
+        BATCH_BACKEND: local (default) or gemini
+        BATCH_LOCAL_DIR: Job directory for the local backend
+
+    Returns:
+        Backend instance
+    """
+    backend_name = (
+        backend_name or os.environ.get("BATCH_BACKEND", DEFAULT_BATCH_BACKEND)
+    ).lower()
+
+    if backend_name == "local":
+        return LocalBatchBackend(
+            os.environ.get("BATCH_LOCAL_DIR", DEFAULT_BATCH_LOCAL_DIR)
+        )
+    if backend_name == "gemini":
+        return GeminiBatchBackend()
+    raise ValueError(f"Unknown BATCH_BACKEND: {backend_name}")
+
+
+def submit_batch(
+    batch_dir: Union[str, Path], backend: Any, model_name: str = BATCH_MODEL
+) -> str:
+    """Submit a prepared batch and record the job in <batch_dir>/job.json."""
+    batch_dir = Path(batch_dir)
+    job_id = backend.submit(batch_dir / REQUESTS_FILE, model_name)
+    with open(batch_dir / JOB_FILE, "w", encoding="utf-8") as f:
+        json.dump({"job_id": job_id, "model": model_name}, f)
+    print(f"Submitted {batch_dir} as {job_id} ({model_name})")
+    return job_id
+
+
+def wait_for_batch(
+    batch_dir: Union[str, Path],
+    backend: Any,
+    poll_seconds: float = BATCH_POLL_SECONDS,
+    timeout_seconds: Optional[float] = None,
+) -> Path:
+    """
+    Poll a submitted batch until it finishes, then download its results.
+
+    Returns:
+        Path of the results file in batch_dir
+
+    Raises:
+        BatchJobError: If the job fails, is cancelled or times out
+    """
+    batch_dir = Path(batch_dir)
+    with open(batch_dir / JOB_FILE, "r", encoding="utf-8") as f:
+        job_id = json.load(f)["job_id"]
+
+    started = time.monotonic()
+    while True:
+        state = backend.poll(job_id)
+        print(f"Batch job {job_id}: {state}")
+        if state == SUCCEEDED:
+            return backend.fetch_results(job_id, batch_dir / RESULTS_FILE)
+        if state in TERMINAL_STATES:
+            raise BatchJobError(f"Batch job {job_id} ended in state {state}")
+        if timeout_seconds is not None and time.monotonic() - started > timeout_seconds:
+            raise BatchJobError(f"Batch job {job_id} still {state} after timeout")
+        time.sleep(poll_seconds)
+
+
+def ingest_batch(
+    batch_dir: Union[str, Path],
+    write: Callable[[str, Dict[str, Any]], Any],
+    results_path: Optional[Union[str, Path]] = None,
+) -> Dict[str, int]:
+    """
+    Render a finished batch, passing each entry to write(markdown, metadata).
+
+    Failed conversations are logged to <batch_dir>/failures.jsonl.
+
+    Returns:
+        Counts of succeeded and failed conversations
+    """
+    stats = {"succeeded": 0, "failed": 0}
+    with open(Path(batch_dir) / "failures.jsonl", "w", encoding="utf-8") as failures:
+        for result in iter_batch_results(batch_dir, results_path):
+            if result["success"]:
+                write(result["markdown_content"], result["metadata"])
+                stats["succeeded"] += 1
+            else:
+                failures.write(json.dumps(result, ensure_ascii=False) + "\n")
+                stats["failed"] += 1
+    print(f"Ingested batch: {stats['succeeded']} succeeded, {stats['failed']} failed")
+    return stats
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gemini batch prediction bulk mode")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare = commands.add_parser("prepare", help="Write the batch request file")
+    prepare.add_argument("export", help="Path to conversations.json")
+    prepare.add_argument("batch_dir")
+    prepare.add_argument("--limit", type=int)
+
+    submit = commands.add_parser("submit", help="Submit a prepared batch")
+    submit.add_argument("batch_dir")
+    submit.add_argument("--backend", help="local or gemini (default: BATCH_BACKEND)")
+    submit.add_argument("--model", default=BATCH_MODEL)
+
+    poll = commands.add_parser("poll", help="Wait for a batch and fetch its results")
+    poll.add_argument("batch_dir")
+    poll.add_argument("--backend")
+    poll.add_argument("--poll-seconds", type=float, default=BATCH_POLL_SECONDS)
+    poll.add_argument("--timeout", type=float)
+
+    ingest = commands.add_parser("ingest", help="Validate and render batch results")
+    ingest.add_argument("batch_dir")
+    destination = ingest.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--output", help="Directory for <source_id>.md files")
+    destination.add_argument("--vault", help="Obsidian vault to write into")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        conversations: Iterable[Dict[str, Any]] = iter_conversations(args.export)
+        if args.limit is not None:
+            conversations = itertools.islice(conversations, args.limit)
+        stats: Dict[str, int] = {}
+        written = prepare_batch(conversations, args.batch_dir, stats)
+        print(f"Wrote {written} requests ({stats['skipped']} skipped)")
+        return 0
+
+    if args.command == "submit":
+        submit_batch(args.batch_dir, create_batch_backend(args.backend), args.model)
+        return 0
+
+    if args.command == "poll":
+        try:
+            wait_for_batch(
+                args.batch_dir,
+                create_batch_backend(args.backend),
+                args.poll_seconds,
+                args.timeout,
+            )
+        except BatchJobError as e:
+            print(f"ERROR: {e}")
+            return 1
+        return 0
+
+    from src.vault_writer import VaultWriter, atomic_write_text, safe_name
+
+    if args.vault:
+        vault = VaultWriter(args.vault)
+        stats = ingest_batch(args.batch_dir, vault.write_entry)
+        vault.close()
+    else:
+
+        def write(markdown: str, metadata: Dict[str, Any]) -> None:
+            path = Path(args.output) / f"{safe_name(metadata['source_id'])}.md"
+            atomic_write_text(path, markdown)
+
+        stats = ingest_batch(args.batch_dir, write)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Chunked Processor Module
+
+Map-reduce journaling for conversations too long for a single Gemini call.
+Segments are summarised in parallel (map), then one final call turns the
+segment notes into the RESPONSE_SCHEMA journal entry (reduce).
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from src.deadline import DeadlineExceededError, check_deadline, propagate_context
+from src.gemini_processor import (
+    DEFAULT_MODELS,
+    generate_with_retries,
+    get_api_key,
+    get_model,
+    process_with_gemini_fallback,
+)
+from src.result_cache import get_result_cache, make_cache_key
+from src.token_estimator import estimate_tokens, tokens_to_chars
+
+# Conversations estimated above this many tokens use the map-reduce path
+CHUNK_THRESHOLD_TOKENS = int(os.environ.get("CHUNK_THRESHOLD_TOKENS", "60000"))
+
+# Token budget for each segment sent to the map step
+CHUNK_SEGMENT_TOKENS = int(os.environ.get("CHUNK_SEGMENT_TOKENS", "20000"))
+
+# Maximum number of segment summaries requested at once
+CHUNK_MAX_PARALLEL = int(os.environ.get("CHUNK_MAX_PARALLEL", "4"))
+
+# System instruction for the map step
+SEGMENT_SYSTEM_INSTRUCTION = """You are summarising one segment of a longer conversation so that it can later be rewritten as a first-person journal entry. Preserve the user's questions, decisions, realizations, named people and projects, and the order in which things happened. Be concise and use bullet points. Do not invent details."""
+
+# Generation settings for the map step (plain text notes)
+SEGMENT_GENERATION_CONFIG = {
+    "response_mime_type": "text/plain",
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+SEGMENT_PROMPT_TEMPLATE = """Summarise segment {index} of {total} of the conversation below:
+
+{text}
+"""
+
+# Prompt for the reduce step, which produces the RESPONSE_SCHEMA JSON
+REDUCE_PROMPT_TEMPLATE = """The following are chronological notes, one section per segment, summarising a single long conversation. Convert them into one reflective first-person journal entry covering the whole conversation:
+
+{text}
+
+Remember to:
+- Write in first person ("I realized", "I decided", etc.)
+- Bold key insights and important points
+- Maintain the reflective, introspective tone
+- Structure the entry clearly
+"""
+
+# raw_text separates messages with a blank line before each speaker label
+_MESSAGE_BOUNDARY = re.compile(r"\n\n(?=(?:User|Assistant): )")
+
+
+def split_at_message_boundaries(text: str, max_tokens: int) -> List[str]:
+    """
+    Split raw_text into segments of at most max_tokens, breaking between messages.
+
+    Messages larger than the budget are split at paragraph breaks, and as a last
+    resort at the character budget.
+
+    Args:
+        text: Conversation raw_text ("User: ..." / "Assistant: ..." blocks)
+        max_tokens: Token budget per segment
+
+    Returns:
+        List of segment strings in conversation order
+    """
+    max_chars = tokens_to_chars(max_tokens)
+    segments: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    def flush():
+        nonlocal current, current_len
+        if current:
+            segments.append("\n\n".join(current))
+            current = []
+            current_len = 0
+
+    for message in _MESSAGE_BOUNDARY.split(text):
+        for piece in _split_oversized(message, max_chars):
+            added = len(piece) + (2 if current else 0)
+            if current and current_len + added > max_chars:
+                flush()
+                added = len(piece)
+            current.append(piece)
+            current_len += added
+
+    flush()
+    return segments
+
+
+def _split_oversized(message: str, max_chars: int) -> List[str]:
+    """Break a single message that exceeds max_chars into smaller pieces."""
+    if len(message) <= max_chars:
+        return [message]
+
+    pieces: List[str] = []
+    for paragraph in message.split("\n\n"):
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if pieces and len(pieces[-1]) + len(paragraph) + 2 <= max_chars:
+            pieces[-1] = f"{pieces[-1]}\n\n{paragraph}"
+        elif paragraph:
+            pieces.append(paragraph)
+    return pieces
+
+
+def summarize_segment(
+    segment: str, index: int, total: int, models: Optional[Sequence[str]] = None
+) -> str:
+    """
+    Summarise one segment (map step), falling back to the secondary model.
+
+    Args:
+        segment: Segment text
+        index: 1-based segment number
+        total: Number of segments
+        models: Model chain to try in order (default: DEFAULT_MODELS)
+
+    Returns:
+        Plain-text notes for the segment
+    """
+    models = list(models or DEFAULT_MODELS)
+    api_key = get_api_key()
+    prompt = SEGMENT_PROMPT_TEMPLATE.format(index=index, total=total, text=segment)
+
+    last_error: Optional[Exception] = None
+    for model_name in models:
+        try:
+            return _summarize_with_model(prompt, model_name, api_key)
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            print(f"Segment {index}/{total} failed on {model_name}: {e}")
+            last_error = e
+    raise Exception(f"Segment {index}/{total} summary failed: {last_error}")
+
+
+def _summarize_with_model(prompt: str, model_name: str, api_key: str) -> str:
+    """One map-step call, cached under the model that answers it."""
+
+    def generate() -> dict:
+        model = get_model(
+            model_name, api_key, SEGMENT_GENERATION_CONFIG, SEGMENT_SYSTEM_INSTRUCTION
+        )
+        response = generate_with_retries(model, prompt)
+        if not response.text:
+            raise Exception("Empty segment summary from Gemini API")
+        return {"summary": response.text.strip()}
+
+    cache = get_result_cache()
+    if cache is None:
+        return generate()["summary"]
+
+    cache_key = make_cache_key(
+        prompt,
+        model_name,
+        SEGMENT_SYSTEM_INSTRUCTION,
+        SEGMENT_GENERATION_CONFIG,
+    )
+    return cache.get_or_compute(cache_key, generate)["summary"]
+
+
+def map_reduce_journal(
+    text: str,
+    segment_tokens: Optional[int] = None,
+    max_parallel: Optional[int] = None,
+    models: Optional[Sequence[str]] = None,
+) -> dict:
+    """
+    Summarise segments of text in parallel, then reduce the notes to a journal entry.
+
+    Args:
+        text: Conversation raw_text
+        segment_tokens: Token budget per segment (default: CHUNK_SEGMENT_TOKENS)
+        max_parallel: Concurrent segment summaries (default: CHUNK_MAX_PARALLEL)
+        models: Model chain for every call (default: DEFAULT_MODELS)
+
+    Returns:
+        Dictionary with journal entry data (RESPONSE_SCHEMA fields)
+    """
+    segment_tokens = segment_tokens or CHUNK_SEGMENT_TOKENS
+    max_parallel = max_parallel or CHUNK_MAX_PARALLEL
+    models = list(models or DEFAULT_MODELS)
+
+    segments = split_at_message_boundaries(text, segment_tokens)
+    total = len(segments)
+    print(
+        f"Long conversation (~{estimate_tokens(text)} tokens): summarising "
+        f"{total} segments, {max_parallel} at a time"
+    )
+
+    # Map: summarise segments in parallel, keeping conversation order
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, total))) as executor:
+        summaries = list(
+            executor.map(
+                propagate_context(summarize_segment),
+                segments,
+                range(1, total + 1),
+                [total] * total,
+                [models] * total,
+            )
+        )
+
+    # Reduce: one structured call over the ordered segment notes
+    check_deadline("reduce step")
+    notes = "\n\n".join(
+        f"## Segment {index}\n{summary}" for index, summary in enumerate(summaries, 1)
+    )
+    return process_with_gemini_fallback(
+        notes, prompt_template=REDUCE_PROMPT_TEMPLATE, models=models
+    )
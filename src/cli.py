@@ -0,0 +1,499 @@
+"""
+Bulk Processing CLI
+
+Offline, resumable processing of a whole ChatGPT export. Parsing, reduction and
+rendering run in a process pool; Gemini calls run in threads, with at most
+--gemini-concurrency in flight. Each entry is written to disk as soon as it is
+rendered, and its source_id is then checkpointed in an ingest manifest, so a
+rerun after a crash (or against a newer export) skips everything already done.
+
+Usage:
+    python -m src.cli data/raw_conversations/conversations.json --output out/
+    python -m src.cli conversations.json --output out/ --workers 4 \\
+        --gemini-concurrency 8 --limit 100
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from src.conversation_parser import parse_conversation_messages
+from src.ingest_manifest import SQLiteManifest, scan_export
+from src.model_router import process_with_routing
+from src.near_duplicates import (
+    NEAR_DUP_THRESHOLD,
+    NearDuplicateIndex,
+    minhash_signature,
+)
+from src.template_engine import render_journal_entry_safe
+from src.text_reducer import format_report, reduce_messages
+from src.vault_writer import VaultWriter, atomic_write_text
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_GEMINI_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+
+ENTRIES_DIR = "entries"
+RESULTS_FILE = "results.jsonl"
+CHECKPOINT_FILE = "checkpoint.sqlite3"
+NEAR_DUPLICATES_FILE = "near_duplicates.sqlite3"
+
+# flag: process near-duplicates and note the match; skip: link them to the
+# matching conversation instead of calling Gemini
+NEAR_DUPLICATE_MODES = ("flag", "skip")
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def prepare_conversation(conversation_data: dict) -> Tuple[Dict[str, Any], str]:
+    """
+    Parse a conversation and build its reduced prompt text (process pool stage).
+
+    Args:
+        conversation_data: Raw ChatGPT conversation dictionary
+
+    Returns:
+        Tuple of (parsed data, prompt text)
+
+    Raises:
+        ValueError: For validation or parsing errors
+    """
+    parsed_data, messages = parse_conversation_messages(conversation_data)
+    prompt_text, reduction = reduce_messages(messages)
+    print(f"Reduced {parsed_data['source_id']}: {format_report(reduction)}")
+    return parsed_data, prompt_text
+
+
+def render_entry(final_data: dict) -> str:
+    """Render the Markdown for merged entry data (process pool stage)."""
+    return render_journal_entry_safe(final_data)
+
+
+class ResultWriter:
+    """
+    Writes each finished entry to disk and checkpoints its source_id.
+
+    Entries go to entries/<source_id>.md, or into an Obsidian vault when one is
+    given, and are written atomically so a crash never leaves a partial entry.
+    Every outcome is appended to results.jsonl. A conversation is checkpointed
+    only after its entry is on disk; failures are logged but not checkpointed.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        manifest: SQLiteManifest,
+        vault: Optional[VaultWriter] = None,
+    ):
+        self.output_dir = output_dir
+        self.vault = vault
+        self.entries_dir = output_dir / ENTRIES_DIR
+        self.manifest = manifest
+        self.stats = {"succeeded": 0, "failed": 0, "near_duplicates": 0}
+        self._lock = threading.Lock()
+        self._results = open(output_dir / RESULTS_FILE, "a", encoding="utf-8")
+
+    def write_entry(
+        self,
+        source_id: str,
+        fingerprint: str,
+        markdown: str,
+        metadata: dict,
+        duplicate: Optional[Dict[str, Any]] = None,
+    ) -> Path:
+        if self.vault is not None:
+            path = self.vault.write_entry(
+                markdown, {**metadata, "source_id": source_id}
+            )
+        else:
+            path = self.entries_dir / f"{_SAFE_NAME.sub('_', source_id)}.md"
+            atomic_write_text(path, markdown)
+        self.manifest.record(source_id, fingerprint, {"title": metadata.get("title")})
+        result = {
+            "source_id": source_id,
+            "success": True,
+            "path": str(path),
+            "metadata": metadata,
+        }
+        if duplicate:
+            result.update(_duplicate_fields(duplicate))
+        self._append(result)
+        return path
+
+    def write_duplicate(
+        self, source_id: str, fingerprint: str, duplicate: Dict[str, Any]
+    ) -> None:
+        """Checkpoint a skipped near-duplicate, linked to the conversation it matches."""
+        fields = _duplicate_fields(duplicate)
+        self.manifest.record(source_id, fingerprint, fields)
+        self._append({"source_id": source_id, "success": True, **fields})
+
+    def write_failure(self, source_id: str, error: Exception) -> None:
+        self._append(
+            {
+                "source_id": source_id,
+                "success": False,
+                "error": type(error).__name__,
+                "message": str(error),
+            }
+        )
+
+    def _append(self, result: Dict[str, Any]) -> None:
+        result["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._lock:
+            self._results.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._results.flush()
+            self.stats["succeeded" if result["success"] else "failed"] += 1
+            if "duplicate_of" in result:
+                self.stats["near_duplicates"] += 1
+
+    def close(self) -> None:
+        self._results.close()
+
+
+def _duplicate_fields(duplicate: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "duplicate_of": duplicate["source_id"],
+        "similarity": duplicate["similarity"],
+    }
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted calls in the caller's thread (--workers 0)."""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class NearDuplicateClaims:
+    """
+    Near-duplicate index shared by the conversations of one run.
+
+    A new conversation claims its signature in the index before Gemini is
+    called, so a retry next to it in the export is caught in the same run. A
+    near-duplicate of a claim still in flight waits for that conversation's
+    outcome: it is linked once the entry is written, and checked again (and
+    usually processed itself) if the original fails and its claim is dropped.
+
+    Args:
+        index: Persistent near-duplicate index
+    """
+
+    def __init__(self, index: NearDuplicateIndex):
+        self.index = index
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+
+    def claim(
+        self, source_id: str, signature: Sequence[int], info: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claim a signature, or return the written entry it duplicates.
+
+        Returns:
+            The best match, or None if the conversation was claimed (call
+            finish() with its outcome)
+        """
+        while True:
+            with self._lock:
+                duplicate = self.index.check_and_add(source_id, signature, info)
+                if duplicate is None:
+                    self._pending[source_id] = Future()
+                    return None
+                pending = self._pending.get(duplicate["source_id"])
+            if pending is None or pending.result():
+                return duplicate
+
+    def finish(self, source_id: str, written: bool) -> None:
+        """Record a claimed conversation's outcome, dropping its claim on failure."""
+        with self._lock:
+            if not written:
+                self.index.remove(source_id)
+            pending = self._pending.pop(source_id)
+        pending.set_result(written)
+
+
+def process_one(
+    conversation_data: dict,
+    fingerprint: str,
+    cpu_pool: Executor,
+    gemini_slots: threading.BoundedSemaphore,
+    writer: ResultWriter,
+    near_duplicates: Optional[NearDuplicateClaims] = None,
+    near_duplicate_mode: str = "flag",
+) -> bool:
+    """
+    Run one conversation through every stage and write the result.
+
+    Args:
+        conversation_data: Raw ChatGPT conversation dictionary
+        fingerprint: Manifest fingerprint recorded on success
+        cpu_pool: Executor for parsing and rendering
+        gemini_slots: Bounds the number of concurrent Gemini calls
+        writer: Destination for entries and results
+        near_duplicates: Claims checked before Gemini is called (None disables)
+        near_duplicate_mode: One of NEAR_DUPLICATE_MODES
+
+    Returns:
+        True if the entry was written (or the near-duplicate was linked)
+    """
+    source_id = conversation_data.get("id", "unknown")
+    duplicate = None
+    claimed = False
+    try:
+        parsed_data, prompt_text = cpu_pool.submit(
+            prepare_conversation, conversation_data
+        ).result()
+
+        if near_duplicates is not None:
+            signature = cpu_pool.submit(
+                minhash_signature,
+                parsed_data["raw_text"],
+                near_duplicates.index.num_perm,
+                near_duplicates.index.shingle_size,
+            ).result()
+            duplicate = near_duplicates.claim(
+                source_id, signature, {"title": parsed_data.get("title")}
+            )
+            claimed = duplicate is None
+            if duplicate is not None:
+                print(
+                    f"≈ {source_id} matches {duplicate['source_id']} "
+                    f"(similarity {duplicate['similarity']:.2f})"
+                )
+                if near_duplicate_mode == "skip":
+                    writer.write_duplicate(source_id, fingerprint, duplicate)
+                    return True
+
+        with gemini_slots:
+            gemini_data = process_with_routing(prompt_text)
+        final_data = {**parsed_data, **gemini_data}
+        markdown = cpu_pool.submit(render_entry, final_data).result()
+        path = writer.write_entry(
+            source_id,
+            fingerprint,
+            markdown,
+            {
+                "title": final_data.get("title"),
+                "date": final_data.get("date"),
+                "topic": final_data.get("topic"),
+                "tags": final_data.get("tags"),
+            },
+            duplicate,
+        )
+        if claimed:
+            claimed = False
+            near_duplicates.finish(source_id, written=True)
+        print(f"✓ {source_id} -> {path}")
+        return True
+    except Exception as e:
+        print(f"✗ {source_id}: {type(e).__name__}: {e}")
+        writer.write_failure(source_id, e)
+        return False
+    finally:
+        if claimed:
+            # Near-duplicates waiting on this conversation are checked again
+            near_duplicates.finish(source_id, written=False)
+
+
+def run_bulk(
+    export_path: str,
+    output_dir: str,
+    workers: int = DEFAULT_WORKERS,
+    gemini_concurrency: int = DEFAULT_GEMINI_CONCURRENCY,
+    checkpoint_path: Optional[str] = None,
+    limit: Optional[int] = None,
+    fingerprint_mode: Optional[str] = None,
+    vault_dir: Optional[str] = None,
+    near_duplicate_mode: Optional[str] = None,
+    near_duplicate_threshold: float = NEAR_DUP_THRESHOLD,
+) -> Dict[str, int]:
+    """
+    Process every new or changed conversation of an export.
+
+    The export is streamed and at most a few conversations per worker are held
+    in memory at once, so memory stays flat however large the export is.
+
+    Args:
+        export_path: Path to conversations.json
+        output_dir: Directory for entries/, results.jsonl and the checkpoint
+        workers: Processes for parsing and rendering (0 runs them inline)
+        gemini_concurrency: Maximum Gemini calls in flight
+        checkpoint_path: Checkpoint manifest (default: <output_dir>/checkpoint.sqlite3)
+        limit: Stop after submitting this many conversations
+        fingerprint_mode: Fingerprint mode for detecting changed conversations
+        vault_dir: Obsidian vault to write entries into (instead of entries/)
+        near_duplicate_mode: flag or skip near-duplicates of conversations
+            already processed (index in <output_dir>/near_duplicates.sqlite3);
+            None disables the check
+        near_duplicate_threshold: Similarity at or above which to flag or skip
+
+    Returns:
+        Counts: total, new, changed, unchanged (skipped), succeeded, failed and
+        near_duplicates
+    """
+    if near_duplicate_mode not in (None,) + NEAR_DUPLICATE_MODES:
+        raise ValueError(f"Unknown near-duplicate mode: {near_duplicate_mode}")
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest = SQLiteManifest(checkpoint_path or str(output / CHECKPOINT_FILE))
+    vault = VaultWriter(vault_dir) if vault_dir else None
+    writer = ResultWriter(output, manifest, vault)
+    near_duplicates = (
+        NearDuplicateClaims(
+            NearDuplicateIndex(
+                str(output / NEAR_DUPLICATES_FILE), threshold=near_duplicate_threshold
+            )
+        )
+        if near_duplicate_mode
+        else None
+    )
+    gemini_concurrency = max(1, gemini_concurrency)
+
+    # One coordinating thread per conversation in flight: enough to keep every
+    # Gemini slot and every worker process busy at the same time
+    threads = gemini_concurrency + max(1, workers)
+    in_flight = threading.BoundedSemaphore(threads * 2)
+    gemini_slots = threading.BoundedSemaphore(gemini_concurrency)
+    stats: Dict[str, int] = {}
+
+    # Workers are spawned rather than forked: the coordinating threads are
+    # already running when the pool starts its processes
+    cpu_pool = (
+        ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        if workers
+        else _InlineExecutor()
+    )
+    coordinator = ThreadPoolExecutor(max_workers=threads)
+    start = time.perf_counter()
+    submitted = 0
+    try:
+        for _, conversation, fingerprint in scan_export(
+            export_path, manifest, fingerprint_mode, stats
+        ):
+            if limit is not None and submitted >= limit:
+                break
+            in_flight.acquire()
+            future = coordinator.submit(
+                process_one,
+                conversation,
+                fingerprint,
+                cpu_pool,
+                gemini_slots,
+                writer,
+                near_duplicates,
+                near_duplicate_mode,
+            )
+            future.add_done_callback(lambda _: in_flight.release())
+            submitted += 1
+        coordinator.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("Interrupted: finishing conversations in flight...")
+        coordinator.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        cpu_pool.shutdown(wait=True)
+        writer.close()
+        if vault is not None:
+            vault.close()
+        if near_duplicates is not None:
+            near_duplicates.index.close()
+
+    stats.update(writer.stats)
+    print(
+        f"Processed {submitted} conversations in {time.perf_counter() - start:.1f} s: "
+        f"{stats['succeeded']} succeeded, {stats['failed']} failed, "
+        f"{stats['near_duplicates']} near-duplicates, "
+        f"{stats.get('unchanged', 0)} already done"
+    )
+    return stats
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Turn a ChatGPT export into journal entries (resumable)"
+    )
+    parser.add_argument("export", help="Path to conversations.json")
+    parser.add_argument("--output", "-o", required=True, help="Output directory")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Processes for parsing and rendering (0 runs them inline)",
+    )
+    parser.add_argument(
+        "--gemini-concurrency",
+        type=int,
+        default=DEFAULT_GEMINI_CONCURRENCY,
+        help="Maximum Gemini calls in flight",
+    )
+    parser.add_argument(
+        "--vault", help="Write entries into this Obsidian vault, with tag/date pages"
+    )
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: in --output)")
+    parser.add_argument("--limit", type=int, help="Process at most N conversations")
+    parser.add_argument(
+        "--fingerprint",
+        choices=["update_time", "hash", "both"],
+        help="How changed conversations are detected",
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        choices=NEAR_DUPLICATE_MODES,
+        help="Flag near-duplicate conversations, or skip them before Gemini",
+    )
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=NEAR_DUP_THRESHOLD,
+        help="Estimated similarity (0-1) that counts as a near-duplicate",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    if not os.environ.get("GEMINI_API_KEY"):
+        print("ERROR: GEMINI_API_KEY not found in environment variables")
+        return 2
+
+    stats = run_bulk(
+        args.export,
+        args.output,
+        workers=args.workers,
+        gemini_concurrency=args.gemini_concurrency,
+        checkpoint_path=args.checkpoint,
+        limit=args.limit,
+        fingerprint_mode=args.fingerprint,
+        vault_dir=args.vault,
+        near_duplicate_mode=args.near_duplicates,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,16 +4,58 @@ Conversation Parser Module
 Extracts metadata and formats conversation text from raw ChatGPT conversation dictionaries.
 """
 
+import os
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
+# Which messages of the conversation tree to use:
+#   active  - the branch ending at current_node (what the user last saw)
+#   longest - the deepest root-to-leaf branch
+#   all     - every node, sorted by create_time (includes regenerated/edited branches)
+BRANCH_MODES = ("active", "longest", "all")
+DEFAULT_BRANCH_MODE = os.environ.get("CONVERSATION_BRANCH_MODE", "active")
 
-def parse_conversation(conversation_data: dict) -> dict:
+# Role labels used in raw_text and transcript; other roles (system, tool) are skipped
+RAW_TEXT_LABELS = {"user": "User: ", "assistant": "Assistant: "}
+TRANSCRIPT_LABELS = {"user": "**User:** ", "assistant": "**Assistant:** "}
+
+
+class Message:
+    """
+    One extracted conversation message.
+
+    Uses __slots__ to keep per-message overhead small on long conversations; text
+    references the export's own string where possible instead of a copy.
+    text_only holds just the string parts (no image pointers or other non-text
+    parts) and is the same object as text when every part is a string.
+    """
+
+    __slots__ = ("id", "author_role", "create_time", "text", "text_only")
+
+    def __init__(
+        self,
+        id: str,
+        author_role: str,
+        create_time: float,
+        text: str,
+        text_only: Optional[str] = None,
+    ):
+        self.id = id
+        self.author_role = author_role
+        self.create_time = create_time
+        self.text = text
+        self.text_only = text if text_only is None else text_only
+
+
+def parse_conversation(
+    conversation_data: dict, branch_mode: Optional[str] = None
+) -> dict:
     """
     Parse a ChatGPT conversation dictionary and extract metadata and formatted content.
 
     Args:
         conversation_data: Raw ChatGPT conversation dictionary with 'mapping' structure
+        branch_mode: One of BRANCH_MODES (default: CONVERSATION_BRANCH_MODE or "active")
 
     Returns:
         Dictionary containing:
@@ -24,6 +66,23 @@ def parse_conversation(conversation_data: dict) -> dict:
             - raw_text: Clean combined text for AI processing
             - transcript: Formatted markdown transcript with User/Assistant labels
     """
+    return parse_conversation_messages(conversation_data, branch_mode)[0]
+
+
+def parse_conversation_messages(
+    conversation_data: dict, branch_mode: Optional[str] = None
+) -> Tuple[dict, List[Message]]:
+    """
+    Parse a conversation like parse_conversation, also returning its messages.
+
+    Args:
+        conversation_data: Raw ChatGPT conversation dictionary with 'mapping' structure
+        branch_mode: One of BRANCH_MODES (default: CONVERSATION_BRANCH_MODE or "active")
+
+    Returns:
+        Tuple of (parse_conversation's dictionary, list of Message records the
+        outputs were built from, e.g. for text_reducer.reduce_messages)
+    """
     # Extract basic metadata
     title = conversation_data.get("title", "Untitled Conversation")
     conversation_id = conversation_data.get("id", "unknown")
@@ -40,15 +99,18 @@ def parse_conversation(conversation_data: dict) -> dict:
         date_str = now.strftime("%Y-%m-%d")
         time_str = now.strftime("%H:%M")
 
-    # Extract and sort messages from mapping
+    # Extract messages of the selected branch from mapping
     mapping = conversation_data.get("mapping", {})
-    messages = _extract_messages_from_mapping(mapping)
+    messages = _extract_messages_from_mapping(
+        mapping,
+        current_node=conversation_data.get("current_node"),
+        branch_mode=branch_mode or DEFAULT_BRANCH_MODE,
+    )
 
-    # Generate raw text and transcript
-    raw_text = _generate_raw_text(messages)
-    transcript = _generate_transcript(messages)
+    # Generate raw text and transcript in one pass
+    raw_text, transcript = _render_messages(messages)
 
-    return {
+    parsed_data = {
         "title": title,
         "date": date_str,
         "time": time_str,
@@ -56,24 +118,55 @@ def parse_conversation(conversation_data: dict) -> dict:
         "raw_text": raw_text,
         "transcript": transcript,
     }
+    return parsed_data, messages
 
 
-def _extract_messages_from_mapping(mapping: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _extract_messages_from_mapping(
+    mapping: Dict[str, Any],
+    current_node: Optional[str] = None,
+    branch_mode: str = "all",
+) -> List[Message]:
     """
-    Extract messages from ChatGPT's tree-structured mapping and sort chronologically.
+    Extract messages from ChatGPT's tree-structured mapping in conversation order.
 
-    ChatGPT conversations use a tree structure with parent links. This function
-    traverses the structure and sorts messages by creation time.
+    ChatGPT conversations use a tree structure with parent links; regenerated and
+    edited messages create sibling branches. The "active" and "longest" modes
+    follow a single branch in O(n) without sorting; "all" keeps every node and
+    sorts by creation time.
 
     Args:
         mapping: The 'mapping' dictionary from ChatGPT JSON
+        current_node: ID of the conversation's current (last viewed) node
+        branch_mode: One of BRANCH_MODES
 
     Returns:
-        List of message dictionaries sorted by create_time
+        List of Message records in conversation order
+
+    Raises:
+        ValueError: If branch_mode is not recognised
     """
+    if branch_mode not in BRANCH_MODES:
+        raise ValueError(
+            f"Unknown branch mode: {branch_mode} (expected one of {BRANCH_MODES})"
+        )
+
+    # A mapping without tree links (several roots and no current_node to follow)
+    # has no single branch - keep every node in time order instead
+    if branch_mode == "longest" or current_node not in mapping:
+        if len(_find_roots(mapping)) > 1:
+            branch_mode = "all"
+
+    if branch_mode == "all":
+        node_ids = list(mapping)
+    elif branch_mode == "active":
+        node_ids = _active_branch(mapping, current_node)
+    else:
+        node_ids = _longest_branch(mapping)
+
     messages = []
 
-    for node_id, node_data in mapping.items():
+    for node_id in node_ids:
+        node_data = mapping.get(node_id) or {}
         message = node_data.get("message")
         if not message:
             continue
@@ -88,69 +181,132 @@ def _extract_messages_from_mapping(mapping: Dict[str, Any]) -> List[Dict[str, An
         if not parts or not any(parts):
             continue
 
-        # Combine all text parts
-        text = "\n".join(str(part) for part in parts if part)
-        if not text.strip():
+        # Combine all text parts (a single str part is reused, not copied)
+        text = "\n".join(str(part) for part in parts if part).strip()
+        if not text:
             continue
 
+        if all(isinstance(part, str) for part in parts):
+            text_only = text
+        else:
+            text_only = "\n".join(
+                part for part in parts if isinstance(part, str) and part
+            ).strip()
+
         messages.append(
-            {
-                "id": message.get("id", node_id),
-                "author_role": message.get("author", {}).get("role", "unknown"),
-                "create_time": message.get("create_time", 0),
-                "text": text.strip(),
-            }
+            Message(
+                message.get("id", node_id),
+                message.get("author", {}).get("role", "unknown"),
+                message.get("create_time", 0),
+                text,
+                text_only,
+            )
         )
 
-    # Sort by creation time to ensure chronological order
-    messages.sort(key=lambda m: m["create_time"])
+    if branch_mode == "all":
+        # Sort by creation time to ensure chronological order
+        messages.sort(key=lambda m: m.create_time or 0)
 
     return messages
 
 
-def _generate_raw_text(messages: List[Dict[str, Any]]) -> str:
-    """
-    Generate clean combined text for AI processing.
+def _find_roots(mapping: Dict[str, Any]) -> List[str]:
+    """Return IDs of nodes without a parent in the mapping."""
+    return [
+        node_id
+        for node_id, node_data in mapping.items()
+        if (node_data or {}).get("parent") not in mapping
+    ]
 
-    Args:
-        messages: List of sorted message dictionaries
 
-    Returns:
-        Clean text combining user and assistant messages
+def _active_branch(mapping: Dict[str, Any], current_node: Optional[str]) -> List[str]:
     """
-    text_parts = []
-
-    for msg in messages:
-        role = msg["author_role"]
-        text = msg["text"]
+    Return node IDs from the root to current_node by following parent links.
 
-        if role == "user":
-            text_parts.append(f"User: {text}")
-        elif role == "assistant":
-            text_parts.append(f"Assistant: {text}")
+    Without a usable current_node, walks down from the root taking the last
+    (most recent) child at each step.
+    """
+    if current_node not in mapping:
+        return _latest_child_branch(mapping)
+
+    path = []
+    seen = set()
+    node_id = current_node
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        path.append(node_id)
+        node_id = (mapping[node_id] or {}).get("parent")
+
+    path.reverse()
+    return path
+
+
+def _latest_child_branch(mapping: Dict[str, Any]) -> List[str]:
+    """Walk down from the first root, always taking the last listed child."""
+    roots = _find_roots(mapping)
+    if not roots:
+        return []
+
+    path = []
+    seen = set()
+    node_id = roots[0]
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        path.append(node_id)
+        children = [
+            c for c in (mapping[node_id] or {}).get("children") or [] if c in mapping
+        ]
+        node_id = children[-1] if children else None
+
+    return path
+
+
+def _longest_branch(mapping: Dict[str, Any]) -> List[str]:
+    """Return node IDs of the deepest root-to-leaf branch (iterative DFS)."""
+    depth: Dict[str, int] = {}
+    deepest = None
+    stack = [(root, 0) for root in reversed(_find_roots(mapping))]
+
+    while stack:
+        node_id, node_depth = stack.pop()
+        if node_id in depth:
+            continue
+        depth[node_id] = node_depth
+        if deepest is None or node_depth > depth[deepest]:
+            deepest = node_id
+        for child in (mapping[node_id] or {}).get("children") or []:
+            if child in mapping and child not in depth:
+                stack.append((child, node_depth + 1))
 
-    return "\n\n".join(text_parts)
+    if deepest is None:
+        return []
+    return _active_branch(mapping, deepest)
 
 
-def _generate_transcript(messages: List[Dict[str, Any]]) -> str:
+def _render_messages(messages: List[Message]) -> Tuple[str, str]:
     """
-    Generate formatted Markdown transcript with User/Assistant labels.
+    Generate the raw text for AI processing and the Markdown transcript in one pass.
+
+    Both outputs are built from parts lists that reference each message's text, so
+    message bodies are copied only once per output by the final join.
 
     Args:
-        messages: List of sorted message dictionaries
+        messages: List of Message records in conversation order
 
     Returns:
-        Markdown-formatted transcript
+        Tuple of (raw_text, transcript)
     """
-    transcript_parts = []
+    raw_parts: List[str] = []
+    transcript_parts: List[str] = []
 
     for msg in messages:
-        role = msg["author_role"]
-        text = msg["text"]
-
-        if role == "user":
-            transcript_parts.append(f"**User:** {text}")
-        elif role == "assistant":
-            transcript_parts.append(f"**Assistant:** {text}")
+        raw_label = RAW_TEXT_LABELS.get(msg.author_role)
+        if raw_label is None:
+            continue
+        if raw_parts:
+            raw_parts.append("\n\n")
+            transcript_parts.append("\n\n")
+        raw_parts += (raw_label, msg.text)
+        transcript_parts += (TRANSCRIPT_LABELS[msg.author_role], msg.text)
 
-    return "\n\n".join(transcript_parts)
+    return "".join(raw_parts), "".join(transcript_parts)
@@ -0,0 +1,355 @@
+"""
+Credit Lease Module
+
+Lets a warm container reserve a block of credits for a user with one DynamoDB
+write and serve that user's following requests from memory.
+
+Lease lifecycle and failure behaviour:
+    - Reserve: one conditional UpdateItem moves K credits out of credit_balance,
+      adds K to leased_credits and lease_unused and sets lease_expires_at on
+      the user's item. If the user has fewer than K credits, expired leases are
+      reclaimed (below) and the reservation retried once; failing that, the
+      request falls back to an exact, unleased deduction.
+    - Serve: requests for that user are deducted from the in-memory lease.
+      Usage is written back in batches: every usage_flush_credits credits
+      served, one UpdateItem subtracts them from lease_unused.
+    - Return: when the lease expires (checked on every acquire) or the container
+      shuts down (atexit / SIGTERM), one UpdateItem adds the unused credits back
+      to credit_balance and takes the lease out of leased_credits and
+      lease_unused.
+    - Container death: if a container is killed (or recycled) without running
+      its shutdown hooks, its lease stays in leased_credits. Once every lease on
+      the item is past lease_expires_at plus a grace period, the next
+      reservation that runs short moves lease_unused back to credit_balance,
+      zeroes leased_credits and bumps lease_epoch. Only usage that was never
+      flushed is refunded with it (fewer than usage_flush_credits per lease).
+      A container that wakes up holding a reclaimed lease sees lease_epoch
+      changed and drops the lease instead of returning it twice.
+"""
+
+import atexit
+import math
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_LEASE_SIZE = 10
+DEFAULT_LEASE_TTL_SECONDS = 300
+DEFAULT_RECLAIM_GRACE_SECONDS = 60
+DEFAULT_USAGE_FLUSH_CREDITS = 5
+
+
+class CreditLease:
+    """Credits reserved for one user in this container."""
+
+    __slots__ = (
+        "user_id",
+        "reserved",
+        "remaining",
+        "unflushed",
+        "expires_at",
+        "epoch",
+    )
+
+    def __init__(self, user_id: str, reserved: int, expires_at: float, epoch: int):
+        self.user_id = user_id
+        self.reserved = reserved
+        self.remaining = reserved
+        # Credits served but not yet subtracted from lease_unused on the item
+        self.unflushed = 0
+        self.expires_at = expires_at
+        self.epoch = epoch
+
+
+class CreditLeaseManager:
+    """
+    Serves credit deductions from per-user leases held in container memory.
+
+    Args:
+        table: boto3 DynamoDB Table resource for user credits
+        lease_size: Credits reserved per lease (K)
+        lease_ttl_seconds: Lease lifetime before unused credits are returned
+        free_credits: Balance given to users that don't exist yet
+        fallback_deduct: Exact deduction used when a full lease can't be
+            reserved; called as fallback_deduct(user_id, amount) and returns the
+            new balance or None
+        reclaim_grace_seconds: How long past lease_expires_at a lease must be
+            before another container reclaims it (covers clock skew)
+        usage_flush_credits: Credits served from a lease between writes of its
+            usage to the item (1 records every request)
+        clock: Time source (seconds)
+    """
+
+    def __init__(
+        self,
+        table: Any,
+        lease_size: int = DEFAULT_LEASE_SIZE,
+        lease_ttl_seconds: float = DEFAULT_LEASE_TTL_SECONDS,
+        free_credits: int = 0,
+        fallback_deduct: Optional[Callable[[str, int], Optional[int]]] = None,
+        reclaim_grace_seconds: float = DEFAULT_RECLAIM_GRACE_SECONDS,
+        usage_flush_credits: int = DEFAULT_USAGE_FLUSH_CREDITS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.table = table
+        self.lease_size = lease_size
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.free_credits = free_credits
+        self.fallback_deduct = fallback_deduct
+        self.reclaim_grace_seconds = reclaim_grace_seconds
+        self.usage_flush_credits = max(1, usage_flush_credits)
+        self.clock = clock
+        self.stats = {
+            "served_from_lease": 0,
+            "reservations": 0,
+            "returns": 0,
+            "reclaims": 0,
+            "usage_flushes": 0,
+        }
+        # _leases is only changed under _lock (iterated by return_expired and
+        # return_all); a user's lease is only used or replaced under its user lock
+        self._leases: Dict[str, CreditLease] = {}
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+
+    def acquire(self, user_id: str, amount: int = 1) -> bool:
+        """
+        Deduct credits for a request, reserving a new lease when needed.
+
+        Args:
+            user_id: Unique user identifier
+            amount: Number of credits to deduct
+
+        Returns:
+            True if credits were deducted, False if the user has insufficient credits
+        """
+        self.return_expired()
+
+        with self._user_lock(user_id):
+            lease = self._leases.get(user_id)
+            if lease is not None and lease.remaining >= amount:
+                self._serve(lease, amount)
+                self.stats["served_from_lease"] += 1
+                return True
+
+            # Current lease is used up (or too small) - return leftovers first
+            if lease is not None:
+                self._return_lease(lease)
+
+            if amount < self.lease_size and self._reserve(user_id):
+                self._serve(self._leases[user_id], amount)
+                return True
+
+        if self.fallback_deduct is None:
+            return False
+        return self.fallback_deduct(user_id, amount) is not None
+
+    def return_expired(self) -> None:
+        """Return unused credits of every lease past its expiry."""
+        now = self.clock()
+        with self._lock:
+            expired = [
+                lease for lease in self._leases.values() if lease.expires_at <= now
+            ]
+        for lease in expired:
+            with self._user_lock(lease.user_id):
+                if self._leases.get(lease.user_id) is lease:
+                    self._return_lease(lease)
+
+    def return_all(self) -> None:
+        """Return unused credits of every lease (container shutdown)."""
+        with self._lock:
+            leases = list(self._leases.values())
+        for lease in leases:
+            with self._user_lock(lease.user_id):
+                if self._leases.get(lease.user_id) is lease:
+                    self._return_lease(lease)
+
+    def install_shutdown_hooks(self) -> None:
+        """
+        Return leases when the process exits.
+
+        Lambda only sends SIGTERM to the runtime when an extension is registered;
+        without one, atexit covers orderly interpreter shutdown.
+        """
+        atexit.register(self.return_all)
+
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            self.return_all()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(0)
+
+        try:
+            signal.signal(signal.SIGTERM, on_sigterm)
+        except ValueError:
+            # Not on the main thread - atexit still applies
+            pass
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    def _reserve(self, user_id: str) -> bool:
+        """Reserve a lease, reclaiming expired ones if the balance is short."""
+        if self._try_reserve(user_id):
+            return True
+        return self._reclaim_expired(user_id) and self._try_reserve(user_id)
+
+    def _try_reserve(self, user_id: str) -> bool:
+        """Reserve lease_size credits in one conditional UpdateItem."""
+        from botocore.exceptions import ClientError
+
+        condition = "credit_balance >= :lease"
+        if self.lease_size <= self.free_credits:
+            condition = "attribute_not_exists(credit_balance) OR " + condition
+
+        expires_at = self.clock() + self.lease_ttl_seconds
+        try:
+            response = self.table.update_item(
+                Key={"user_id": user_id},
+                UpdateExpression=(
+                    "SET credit_balance = "
+                    "if_not_exists(credit_balance, :free_credits) - :lease, "
+                    "lease_expires_at = :expires_at "
+                    "ADD leased_credits :lease, lease_unused :lease"
+                ),
+                ConditionExpression=condition,
+                ExpressionAttributeValues={
+                    ":free_credits": self.free_credits,
+                    ":lease": self.lease_size,
+                    ":expires_at": math.ceil(expires_at),
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+        epoch = int(response["Attributes"].get("lease_epoch", 0))
+        lease = CreditLease(user_id, self.lease_size, expires_at, epoch)
+        with self._lock:
+            self._leases[user_id] = lease
+        self.stats["reservations"] += 1
+        return True
+
+    def _reclaim_expired(self, user_id: str) -> bool:
+        """
+        Move the unused credits of expired, never-returned leases back to the balance.
+
+        Only succeeds when every lease on the item is past its expiry plus the
+        grace period, so no live container can still be serving from one.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.update_item(
+                Key={"user_id": user_id},
+                UpdateExpression=(
+                    "SET credit_balance = "
+                    "credit_balance + if_not_exists(lease_unused, :zero), "
+                    "leased_credits = :zero, "
+                    "lease_unused = :zero, "
+                    "lease_epoch = if_not_exists(lease_epoch, :zero) + :one"
+                ),
+                ConditionExpression=(
+                    "leased_credits > :zero AND lease_expires_at < :stale"
+                ),
+                ExpressionAttributeValues={
+                    ":zero": 0,
+                    ":one": 1,
+                    ":stale": math.floor(self.clock() - self.reclaim_grace_seconds),
+                },
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+        print(f"Reclaimed expired credit leases for {user_id}")
+        self.stats["reclaims"] += 1
+        return True
+
+    def _serve(self, lease: CreditLease, amount: int) -> None:
+        """Deduct from a lease, recording usage on the item every few credits."""
+        lease.remaining -= amount
+        lease.unflushed += amount
+        if lease.unflushed >= self.usage_flush_credits:
+            self._flush_usage(lease)
+
+    def _flush_usage(self, lease: CreditLease) -> None:
+        """Subtract served credits from lease_unused (caller holds user lock)."""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.update_item(
+                Key={"user_id": lease.user_id},
+                UpdateExpression="ADD lease_unused :used",
+                ConditionExpression=(
+                    "attribute_not_exists(lease_epoch) OR lease_epoch = :epoch"
+                ),
+                ExpressionAttributeValues={
+                    ":used": -lease.unflushed,
+                    ":epoch": lease.epoch,
+                },
+            )
+        except Exception as e:
+            if (
+                isinstance(e, ClientError)
+                and e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+            ):
+                # Reclaimed while this container was frozen: stop serving from it
+                print(f"Lease for {lease.user_id} was already reclaimed")
+                with self._lock:
+                    if self._leases.get(lease.user_id) is lease:
+                        del self._leases[lease.user_id]
+                return
+            # Try again with the next flush (or the return)
+            print(f"Failed to record lease usage for {lease.user_id}: {e}")
+            return
+        lease.unflushed = 0
+        self.stats["usage_flushes"] += 1
+
+    def _return_lease(self, lease: CreditLease) -> None:
+        """Give unused credits back and close the lease (caller holds user lock)."""
+        from botocore.exceptions import ClientError
+
+        with self._lock:
+            del self._leases[lease.user_id]
+        try:
+            self.table.update_item(
+                Key={"user_id": lease.user_id},
+                UpdateExpression=(
+                    "SET credit_balance = credit_balance + :unused "
+                    "ADD leased_credits :released, lease_unused :still_counted"
+                ),
+                ConditionExpression=(
+                    "attribute_not_exists(lease_epoch) OR lease_epoch = :epoch"
+                ),
+                ExpressionAttributeValues={
+                    ":unused": lease.remaining,
+                    ":released": -lease.reserved,
+                    ":still_counted": -(lease.remaining + lease.unflushed),
+                    ":epoch": lease.epoch,
+                },
+            )
+            self.stats["returns"] += 1
+        except Exception as e:
+            if (
+                isinstance(e, ClientError)
+                and e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+            ):
+                print(f"Lease for {lease.user_id} was already reclaimed")
+                return
+            print(
+                f"Failed to return {lease.remaining} leased credit(s) "
+                f"for {lease.user_id}: {e}"
+            )
@@ -0,0 +1,123 @@
+"""
+Deadline Module
+
+Per-request time budget derived from the Lambda context. The active deadline is
+kept in a context variable so every stage (retries, fallbacks, hedging, chunked
+segments) can check it without threading an argument through each call.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+# Seconds kept back from the Lambda timeout to refund credits and respond
+DEADLINE_RESERVE_SECONDS = float(os.environ.get("DEADLINE_RESERVE_SECONDS", "3"))
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar(
+    "rijg_deadline", default=None
+)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request has no time left for the next stage."""
+
+
+class Deadline:
+    """
+    Absolute point in (monotonic) time by which a request must finish.
+
+    Args:
+        seconds: Time budget from now
+        clock: Monotonic time source (seconds)
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def from_lambda_context(
+        cls, context: Any, reserve_seconds: float = DEADLINE_RESERVE_SECONDS
+    ) -> Optional["Deadline"]:
+        """
+        Build a deadline from context.get_remaining_time_in_millis().
+
+        Args:
+            context: Lambda context object (None or a context without the method
+                when run locally)
+            reserve_seconds: Time kept back for the handler to respond
+
+        Returns:
+            Deadline, or None if the context has no remaining-time information
+        """
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if get_remaining is None:
+            return None
+        return cls(get_remaining() / 1000 - reserve_seconds)
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)."""
+        return self.expires_at - self.clock()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str) -> None:
+        """
+        Raise if the deadline has passed.
+
+        Args:
+            stage: Name of the stage about to start (for the error message)
+
+        Raises:
+            DeadlineExceededError: If no time is left
+        """
+        if self.expired():
+            raise DeadlineExceededError(f"Request deadline exceeded before {stage}")
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the request being processed, if any."""
+    return _current_deadline.get()
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left for the current request, or None without a deadline."""
+    deadline = _current_deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check_deadline(stage: str) -> None:
+    """Raise DeadlineExceededError if the current request is out of time."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make deadline the current deadline for the duration of the block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def propagate_context(fn: Callable) -> Callable:
+    """
+    Wrap fn so that it runs with the caller's context variables.
+
+    Thread pool workers don't inherit context variables; wrap the callable given
+    to executor.submit/map so the deadline (and other request context) follows
+    the work. Each call runs in its own copy, so the wrapper can be used by many
+    workers at once.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
@@ -0,0 +1,146 @@
+"""
+Export Reader Module
+
+Streams conversations out of a ChatGPT conversations.json export without loading
+the whole file into memory.
+"""
+
+import json
+from typing import Any, Dict, IO, Iterator, Union
+from pathlib import Path
+
+from src.conversation_parser import parse_conversation
+
+# Size of each read from the export file (characters)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_conversations(
+    source: Union[str, Path, IO[str]], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield conversation dictionaries one at a time from a ChatGPT export.
+
+    The export is a top-level JSON array of conversations. Only the conversation
+    currently being decoded is held in memory, so peak memory is bounded by the
+    largest single conversation rather than the size of the export. A top-level
+    object (single conversation export) is also accepted.
+
+    Args:
+        source: Path to conversations.json or an open text file object
+        chunk_size: Number of characters to read per chunk
+
+    Yields:
+        Raw ChatGPT conversation dictionaries
+
+    Raises:
+        ValueError: If the export is not valid JSON
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from _iter_json_array(f, chunk_size)
+    else:
+        yield from _iter_json_array(source, chunk_size)
+
+
+def iter_parsed_conversations(
+    source: Union[str, Path, IO[str]], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """
+    Lazily parse each conversation of an export with parse_conversation.
+
+    Args:
+        source: Path to conversations.json or an open text file object
+        chunk_size: Number of characters to read per chunk
+
+    Yields:
+        Parsed conversation dictionaries (see parse_conversation)
+    """
+    for conversation in iter_conversations(source, chunk_size):
+        yield parse_conversation(conversation)
+
+
+def _iter_json_array(f: IO[str], chunk_size: int) -> Iterator[Any]:
+    """
+    Incrementally decode the elements of a top-level JSON array.
+
+    When an element is incomplete, the next read is sized to the current buffer so
+    that very large elements are re-decoded a logarithmic number of times.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill(min_size: int) -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(max(chunk_size, min_size))
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if eof or not fill(0):
+                return False
+
+    if not skip_whitespace():
+        raise ValueError("Export is empty")
+
+    if buffer[pos] == "{":
+        # Single conversation export - decode it as a whole
+        while fill(len(buffer)):
+            pass
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in export: {e}")
+        yield value
+        return
+
+    if buffer[pos] != "[":
+        raise ValueError("Export must be a JSON array of conversations")
+    pos += 1
+
+    expect_value = True
+    while True:
+        if not skip_whitespace():
+            raise ValueError("Unexpected end of export: unterminated array")
+
+        char = buffer[pos]
+        if char == "]":
+            return
+        if char == ",":
+            if expect_value:
+                raise ValueError("Unexpected ',' in export")
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f"Expected ',' or ']' in export, found {char!r}")
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # Scalars at the end of the buffer may still be truncated
+                if end < len(buffer) or eof or char in '{["':
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Invalid JSON in export: {e}")
+            if not fill(len(buffer) - pos):
+                continue
+
+        yield value
+        pos = end
+        expect_value = False
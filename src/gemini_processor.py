@@ -6,10 +6,30 @@ Interfaces with Google Gemini API to rewrite conversation text into journal entr
 
 import os
 import json
+import threading
 import time
-from typing import Dict, Any, Optional
-import google.generativeai as genai
-from google.api_core import exceptions
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Sequence
+
+from src.deadline import (
+    DeadlineExceededError,
+    check_deadline,
+    propagate_context,
+    remaining_seconds,
+)
+from src.metrics import count, set_property, span
+from src.model_health import (
+    breaker_states,
+    get_circuit_breaker,
+    get_latency_tracker,
+)
+from src.rate_limiter import backoff_delay, get_rate_limiter, retry_after_seconds
+from src.result_cache import get_result_cache, make_cache_key
+
+# Heavy SDK modules, imported on first use to keep cold starts fast
+genai: Any = None  # google.generativeai
+exceptions: Any = None  # google.api_core.exceptions
 
 # System instruction for Gemini
 SYSTEM_INSTRUCTION = """You are a reflective personal journalist. Analyze the provided conversation and rewrite it as a first-person journal entry. Frame insights as 'I realized' or 'I decided'. Use bolding for key points. If the conversation clearly indicates the user is asking on behalf of someone else (e.g., 'my wife,' 'my friend'), frame the journal entry as 'I helped [person] explore...' or 'I researched [topic] for [person]...' instead of claiming the goal as your own. Maintain the first-person perspective of the user. Your output MUST be valid JSON."""
@@ -39,14 +59,215 @@ RESPONSE_SCHEMA = {
     "required": ["title", "topic", "tags", "rewritten_entry_body"],
 }
 
+# Generation settings shared by every journal request
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RESPONSE_SCHEMA,
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+# Prompt wrapped around the conversation text
+PROMPT_TEMPLATE = """Convert the following conversation into a reflective first-person journal entry:
+
+{text}
+
+Remember to:
+- Write in first person ("I realized", "I decided", etc.)
+- Bold key insights and important points
+- Maintain the reflective, introspective tone
+- Structure the entry clearly
+"""
+
+# Model chain used by process_with_gemini_fallback
+PRIMARY_MODEL = "gemini-2.5-flash"
+FALLBACK_MODEL = "gemini-2.0-flash-exp"
+DEFAULT_MODELS = (PRIMARY_MODEL, FALLBACK_MODEL)
+
+# Safety settings - disable filters for personal journal content
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+# Attempts per model call for rate limits and transient errors
+MAX_ATTEMPTS = int(os.environ.get("GEMINI_MAX_ATTEMPTS", "4"))
+
+# google.api_core exception classes worth retrying
+THROTTLE_ERRORS = ("ResourceExhausted", "TooManyRequests")
+TRANSIENT_ERRORS = (
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+    "Aborted",
+)
+
+# Hedging: fire the fallback model when the primary is slower than this percentile
+HEDGE_ENABLED = os.environ.get("GEMINI_HEDGE_ENABLED", "false") == "true"
+HEDGE_PERCENTILE = float(os.environ.get("GEMINI_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_SECONDS = float(
+    os.environ.get("GEMINI_HEDGE_DEFAULT_DELAY_SECONDS", "15")
+)
+HEDGE_MAX_WORKERS = int(os.environ.get("GEMINI_HEDGE_MAX_WORKERS", "16"))
+
+# How long the genai.list_models() result is reused (seconds)
+MODEL_LIST_TTL_SECONDS = 3600
+
+# Per-container model registry, reused across warm Lambda invocations
+_model_registry: Dict[tuple, Any] = {}
+_registry_lock = threading.Lock()
+_configured_api_key: Optional[str] = None
+_model_list_cache: Dict[str, Any] = {"models": None, "expires_at": 0.0}
+
+# Model chain counters (see get_model_chain_stats)
+_chain_stats = {
+    "primary_successes": 0,
+    "fallback_successes": 0,
+    "breaker_skips": 0,
+    "hedges": 0,
+    "hedge_primary_wins": 0,
+    "hedge_fallback_wins": 0,
+}
+_chain_stats_lock = threading.Lock()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+
+
+def load_genai() -> Any:
+    """
+    Import the Gemini SDK on first use.
+
+    Returns:
+        The google.generativeai module
+    """
+    global genai, exceptions
+    if exceptions is None:
+        from google.api_core import exceptions as api_exceptions
+
+        exceptions = api_exceptions
+    if genai is None:
+        import google.generativeai
+
+        genai = google.generativeai
+    return genai
+
+
+def get_model(
+    model_name: str,
+    api_key: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    system_instruction: Optional[str] = None,
+) -> Any:
+    """
+    Return a GenerativeModel for (model_name, generation_config), built once per container.
+
+    genai.configure resets the SDK's cached gRPC clients, so it is only called
+    when the API key changes; models keep their client between invocations.
+
+    Args:
+        model_name: The Gemini model to use
+        api_key: Gemini API key
+        generation_config: Generation settings (default: GENERATION_CONFIG)
+        system_instruction: System instruction (default: SYSTEM_INSTRUCTION)
 
-def process_with_gemini(text: str, model_name: str = "gemini-2.5-flash") -> dict:
+    Returns:
+        Cached genai.GenerativeModel instance
+    """
+    global _configured_api_key
+
+    load_genai()
+    if generation_config is None:
+        generation_config = GENERATION_CONFIG
+    if system_instruction is None:
+        system_instruction = SYSTEM_INSTRUCTION
+    key = (
+        model_name,
+        json.dumps(generation_config, sort_keys=True),
+        system_instruction,
+    )
+
+    model = _model_registry.get(key)
+    if model is not None and api_key == _configured_api_key:
+        return model
+
+    with _registry_lock:
+        if api_key != _configured_api_key:
+            # Key rotated (or first use) - reconfigure and drop stale models
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            _model_registry.clear()
+            _model_list_cache["models"] = None
+
+        model = _model_registry.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                system_instruction=system_instruction,
+                generation_config=generation_config,
+            )
+            _model_registry[key] = model
+
+    return model
+
+
+def list_available_models() -> List[str]:
+    """
+    Return the names of the models available to the configured API key.
+
+    The listing is cached for MODEL_LIST_TTL_SECONDS to avoid an extra network
+    round trip on every failure.
+
+    Returns:
+        List of model names
+    """
+    load_genai()
+    now = time.time()
+    if _model_list_cache["models"] is None or _model_list_cache["expires_at"] <= now:
+        _model_list_cache["models"] = [m.name for m in genai.list_models()]
+        _model_list_cache["expires_at"] = now + MODEL_LIST_TTL_SECONDS
+    return _model_list_cache["models"]
+
+
+def reset_model_registry() -> None:
+    """Drop all cached models and model listings (forces reconfiguration)."""
+    global _configured_api_key
+    with _registry_lock:
+        _model_registry.clear()
+        _configured_api_key = None
+        _model_list_cache["models"] = None
+        _model_list_cache["expires_at"] = 0.0
+
+
+def get_api_key() -> str:
+    """
+    Return the Gemini API key from the environment.
+
+    Raises:
+        ValueError: If GEMINI_API_KEY is not set
+    """
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    return api_key
+
+
+def process_with_gemini(
+    text: str,
+    model_name: str = PRIMARY_MODEL,
+    prompt_template: str = PROMPT_TEMPLATE,
+) -> dict:
     """
     Process conversation text with Gemini API to generate a journal entry.
 
     Args:
         text: The conversation text to process
         model_name: The Gemini model to use (default: gemini-2.5-flash)
+        prompt_template: Prompt wrapped around the text (must contain {text})
 
     Returns:
         Dictionary containing:
@@ -60,117 +281,461 @@ def process_with_gemini(text: str, model_name: str = "gemini-2.5-flash") -> dict
         Exception: For other API errors
     """
     # Get API key from environment
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    api_key = get_api_key()
+    count("gemini_requests")
 
-    # Configure the Gemini client
-    genai.configure(api_key=api_key)
-
-    # Initialize the model with system instruction
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        system_instruction=SYSTEM_INSTRUCTION,
-        generation_config={
-            "response_mime_type": "application/json",
-            "response_schema": RESPONSE_SCHEMA,
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        },
+    cache = get_result_cache()
+    if cache is None:
+        return _generate_journal_entry(text, model_name, api_key, prompt_template)
+
+    # Identical input, model and settings always map to the same entry
+    cache_key = make_cache_key(
+        text,
+        model_name,
+        SYSTEM_INSTRUCTION,
+        RESPONSE_SCHEMA,
+        GENERATION_CONFIG,
+        prompt_template,
     )
+    computed = []
 
-    # Generate the journal entry prompt
-    prompt = f"""Convert the following conversation into a reflective first-person journal entry:
+    def compute() -> dict:
+        computed.append(True)
+        return _generate_journal_entry(text, model_name, api_key, prompt_template)
 
-{text}
+    result = cache.get_or_compute(cache_key, compute)
+    if not computed:
+        count("result_cache_hits")
+    return result
 
-Remember to:
-- Write in first person ("I realized", "I decided", etc.)
-- Bold key insights and important points
-- Maintain the reflective, introspective tone
-- Structure the entry clearly
-"""
 
-    # Safety settings - disable filters for personal journal content
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
+def _error_kind(error: Exception) -> Optional[str]:
+    """Classify an SDK error as "throttle", "transient" or None (not retryable)."""
+    if exceptions is not None:
+        if isinstance(error, tuple(getattr(exceptions, n) for n in THROTTLE_ERRORS)):
+            return "throttle"
+        if isinstance(error, tuple(getattr(exceptions, n) for n in TRANSIENT_ERRORS)):
+            return "transient"
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return "transient"
+    return None
+
 
-    # Retry logic with rate limit handling
-    max_retries = 3
-    retry_delay = 10  # seconds
+def is_availability_error(error: BaseException) -> bool:
+    """
+    True if an error (or one it was raised from) is a rate limit or transient
+    failure of the model, as opposed to a configuration or input problem.
+
+    Only these count against a model's circuit breaker.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if _error_kind(error) is not None:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def generate_with_retries(model: Any, prompt: str, stream: bool = False) -> Any:
+    """
+    Call generate_content through the shared rate limiter, retrying transient errors.
 
-    for attempt in range(max_retries):
+    Rate limit errors slow the process-wide limiter down (and pause it for any
+    server retry hint); rate limits and transient errors (503, deadline, 500,
+    connection errors) are retried with jittered exponential backoff. Under a
+    request deadline (see src.deadline), calls are given the remaining time as
+    their timeout and no wait or retry starts that would end past it.
+
+    Args:
+        model: genai.GenerativeModel to call
+        prompt: Full prompt text
+        stream: Request a streamed response (retries cover the initial request;
+            errors while iterating the chunks are the caller's to handle)
+
+    Returns:
+        The Gemini response object
+
+    Raises:
+        DeadlineExceededError: If the request deadline leaves no time for a call
+        Exception: If every attempt failed or the error is not retryable
+    """
+    load_genai()
+    limiter = get_rate_limiter()
+
+    for attempt in range(MAX_ATTEMPTS):
+        check_deadline("Gemini call")
+        with span("rate_limiter_wait"):
+            acquired = limiter.acquire(timeout=remaining_seconds())
+        if not acquired:
+            raise DeadlineExceededError(
+                "Request deadline exceeded waiting for the rate limiter"
+            )
+
+        call_options: Dict[str, Any] = {"safety_settings": SAFETY_SETTINGS}
+        if stream:
+            call_options["stream"] = True
+        remaining = remaining_seconds()
+        if remaining is not None:
+            call_options["request_options"] = {"timeout": max(remaining, 0.1)}
+
+        count("gemini_attempts")
         try:
-            # Generate content
-            response = model.generate_content(prompt, safety_settings=safety_settings)
+            with span("gemini_attempt"):
+                response = model.generate_content(prompt, **call_options)
+            limiter.on_success()
+            return response
+
+        except Exception as e:
+            count("gemini_errors")
+            kind = _error_kind(e)
+            if kind is None:
+                # For other errors, don't retry
+                raise Exception(f"Gemini API error: {str(e)}")
 
-            # Parse the JSON response
-            if not response.text:
-                raise ValueError("Empty response from Gemini API")
+            retry_after = retry_after_seconds(e)
+            if kind == "throttle":
+                count("gemini_throttles")
+                limiter.on_throttle(retry_after)
 
-            result = json.loads(response.text)
+            if attempt == MAX_ATTEMPTS - 1:
+                if kind == "throttle":
+                    raise Exception(
+                        f"Rate limit exceeded after {MAX_ATTEMPTS} attempts: {str(e)}"
+                    )
+                raise Exception(
+                    f"Gemini API error after {MAX_ATTEMPTS} attempts: {str(e)}"
+                )
 
-            # Validate the response structure
-            required_fields = ["title", "topic", "tags", "rewritten_entry_body"]
-            for field in required_fields:
-                if field not in result:
-                    raise ValueError(f"Missing required field in response: {field}")
+            delay = backoff_delay(attempt, retry_after)
+            remaining = remaining_seconds()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceededError(
+                    f"Request deadline exceeded: no time to retry after "
+                    f"{type(e).__name__}: {str(e)}"
+                )
+            print(
+                f"{type(e).__name__} (attempt {attempt + 1}/{MAX_ATTEMPTS}), "
+                f"retrying in {delay:.1f}s..."
+            )
+            count("gemini_retries")
+            with span("gemini_backoff"):
+                time.sleep(delay)
+
+    # Should never reach here, but just in case
+    raise Exception(f"Failed after {MAX_ATTEMPTS} attempts")
+
+
+def parse_journal_response(response_text: str) -> dict:
+    """
+    Parse and validate Gemini's JSON journal entry.
+
+    Args:
+        response_text: Raw response text
+
+    Returns:
+        Journal entry dictionary with all RESPONSE_SCHEMA required fields
+
+    Raises:
+        ValueError: If the response is not valid JSON
+        Exception: If the response is empty or missing required fields
+    """
+    if not response_text:
+        raise Exception("Gemini API error: Empty response from Gemini API")
+
+    try:
+        result = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Failed to parse Gemini response as JSON: {e}")
+
+    # Validate the response structure
+    for field in RESPONSE_SCHEMA["required"]:
+        if field not in result:
+            raise Exception(
+                f"Gemini API error: Missing required field in response: {field}"
+            )
+
+    return result
+
+
+def _generate_journal_entry(
+    text: str, model_name: str, api_key: str, prompt_template: str = PROMPT_TEMPLATE
+) -> dict:
+    """
+    Call the Gemini API (with rate limit retries) and validate the response.
+
+    Args:
+        text: The conversation text to process
+        model_name: The Gemini model to use
+        api_key: Gemini API key
+        prompt_template: Prompt wrapped around the text
+
+    Returns:
+        Validated journal entry dictionary
+    """
+    # Reuse the container-wide model (and its gRPC client)
+    model = get_model(model_name, api_key)
+
+    # Generate the journal entry prompt
+    prompt = prompt_template.format(text=text)
+
+    set_property("gemini_model", model_name)
+    response = generate_with_retries(model, prompt)
+    record_token_usage(response)
+    try:
+        response_text = response.text
+    except Exception as e:
+        raise Exception(f"Gemini API error: {str(e)}")
+
+    return parse_journal_response(response_text)
 
-            return result
 
-        except exceptions.ResourceExhausted as e:
-            # Rate limit hit (429 error)
-            if attempt < max_retries - 1:
-                print(
-                    f"Rate limit hit (attempt {attempt + 1}/{max_retries}), waiting {retry_delay}s..."
+def record_token_usage(response: Any) -> None:
+    """
+    Add a response's usage_metadata token counts to the request metrics.
+
+    Args:
+        response: Gemini response (or the last chunk of a streamed one)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    count("gemini_input_tokens", getattr(usage, "prompt_token_count", 0) or 0)
+    count("gemini_output_tokens", getattr(usage, "candidates_token_count", 0) or 0)
+
+
+def _count(name: str) -> None:
+    with _chain_stats_lock:
+        _chain_stats[name] += 1
+    count(f"gemini_{name}")
+
+
+def get_model_chain_stats() -> Dict[str, Any]:
+    """
+    Return counters for the primary/fallback model chain.
+
+    Returns:
+        Dictionary with success, breaker-skip and hedge counters plus the
+        circuit state of each model
+    """
+    with _chain_stats_lock:
+        stats: Dict[str, Any] = dict(_chain_stats)
+    stats["breakers"] = breaker_states()
+    return stats
+
+
+def reset_model_chain_stats() -> None:
+    """Zero the model chain counters."""
+    with _chain_stats_lock:
+        for name in _chain_stats:
+            _chain_stats[name] = 0
+
+
+def _call_model(text: str, model_name: str, prompt_template: str) -> dict:
+    """Call one model, feeding its circuit breaker and latency tracker."""
+    breaker = get_circuit_breaker(model_name)
+    start = time.monotonic()
+    try:
+        result = process_with_gemini(text, model_name, prompt_template)
+    except DeadlineExceededError:
+        # Running out of request time says nothing about the model's health
+        breaker.release()
+        raise
+    except Exception as e:
+        # Missing keys, bad input and unparseable responses aren't outages
+        if is_availability_error(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    breaker.record_success()
+    get_latency_tracker(model_name).record(time.monotonic() - start)
+    return result
+
+
+def hedge_delay_seconds(model_name: str = PRIMARY_MODEL) -> float:
+    """
+    Seconds to wait for a model before firing a hedge request.
+
+    Uses the HEDGE_PERCENTILE of recent latencies once HEDGE_MIN_SAMPLES have
+    been seen, HEDGE_DEFAULT_DELAY_SECONDS before that.
+    """
+    tracker = get_latency_tracker(model_name)
+    if len(tracker) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    return tracker.percentile(HEDGE_PERCENTILE)
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _chain_stats_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="gemini-hedge"
                 )
-                time.sleep(retry_delay)
+    return _hedge_executor
+
+
+def _process_hedged(text: str, prompt_template: str, models: List[str]) -> dict:
+    """
+    Race the first fallback model against a slow primary and take the first success.
+
+    The loser is not cancelled (the SDK call can't be interrupted); its result
+    still lands in the result cache.
+    """
+    primary_model, hedge_model = models[0], models[1]
+    executor = _get_hedge_executor()
+    primary = executor.submit(
+        propagate_context(_call_model), text, primary_model, prompt_template
+    )
+
+    hedge_delay = hedge_delay_seconds(primary_model)
+    remaining = remaining_seconds()
+    try:
+        result = primary.result(
+            timeout=hedge_delay if remaining is None else min(hedge_delay, remaining)
+        )
+        _count("primary_successes")
+        return result
+    except FutureTimeoutError:
+        check_deadline("hedge request")
+    except DeadlineExceededError:
+        raise
+    except Exception as e:
+        print(f"Primary model ({primary_model}) failed, trying fallback: {e}")
+        return _process_fallback(text, prompt_template, models[1:], e)
+
+    if not get_circuit_breaker(hedge_model).allow_request():
+        # Nothing to hedge with - keep waiting for the primary
+        try:
+            result = primary.result(timeout=remaining_seconds())
+        except FutureTimeoutError:
+            raise DeadlineExceededError("Request deadline exceeded waiting for Gemini")
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            return _process_fallback(text, prompt_template, models[2:], e)
+        _count("primary_successes")
+        return result
+
+    _count("hedges")
+    print(f"Primary model ({primary_model}) is slow, hedging with {hedge_model}")
+    fallback = executor.submit(
+        propagate_context(_call_model), text, hedge_model, prompt_template
+    )
+    pending = {primary: primary_model, fallback: hedge_model}
+    last_error: Optional[Exception] = None
+
+    while pending:
+        done, _ = wait(
+            pending, timeout=remaining_seconds(), return_when=FIRST_COMPLETED
+        )
+        if not done:
+            raise DeadlineExceededError("Request deadline exceeded waiting for Gemini")
+        for future in done:
+            model_name = pending.pop(future)
+            try:
+                result = future.result()
+            except DeadlineExceededError:
+                raise
+            except Exception as e:
+                print(f"Hedged call to {model_name} failed: {e}")
+                last_error = e
                 continue
+            if model_name == primary_model:
+                _count("hedge_primary_wins")
+                _count("primary_successes")
             else:
-                raise Exception(
-                    f"Rate limit exceeded after {max_retries} attempts: {str(e)}"
-                )
+                _count("hedge_fallback_wins")
+                _count("fallback_successes")
+            return result
+
+    return _process_fallback(text, prompt_template, models[2:], last_error)
 
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse Gemini response as JSON: {e}")
 
+def _process_fallback(
+    text: str,
+    prompt_template: str,
+    fallback_models: List[str],
+    last_error: Optional[Exception],
+) -> dict:
+    """Try each fallback model in order after the primary failed or was skipped."""
+    for model_name in fallback_models:
+        check_deadline(f"fallback to {model_name}")
+        if not get_circuit_breaker(model_name).allow_request():
+            _count("breaker_skips")
+            print(f"Fallback model ({model_name}) circuit open")
+            continue
+        try:
+            result = _call_model(text, model_name, prompt_template)
+            _count("fallback_successes")
+            return result
+        except DeadlineExceededError:
+            raise
         except Exception as e:
-            # For other errors, don't retry
-            raise Exception(f"Gemini API error: {str(e)}")
+            print(f"Fallback model ({model_name}) failed: {e}")
+            last_error = e
 
-    # Should never reach here, but just in case
-    raise Exception(f"Failed after {max_retries} attempts")
+    _raise_chain_failure(last_error)
 
 
-def process_with_gemini_fallback(text: str) -> dict:
+def _raise_chain_failure(last_error: Optional[Exception]) -> None:
+    """Log the available models and raise the final model chain error."""
+    # Print available models for debugging
+    try:
+        available_models = list_available_models()
+        print(f"Available Models: {available_models}")
+    except Exception:
+        print("Could not list available models")
+
+    if last_error is None:
+        raise Exception("Both models failed. All model circuits are open")
+    raise Exception(f"Both models failed. Last error: {last_error}")
+
+
+def process_with_gemini_fallback(
+    text: str,
+    prompt_template: str = PROMPT_TEMPLATE,
+    models: Optional[Sequence[str]] = None,
+) -> dict:
     """
     Process conversation with Gemini, falling back to alternative model on failure.
 
     Tries gemini-2.5-flash first (latest stable), falls back to gemini-2.0-flash-exp if needed.
+    A model whose circuit breaker is open is skipped for its cool-down window.
+    With GEMINI_HEDGE_ENABLED, the first fallback is also fired when the primary is
+    slower than its HEDGE_PERCENTILE latency, and the first success wins.
 
     Args:
         text: The conversation text to process
+        prompt_template: Prompt wrapped around the text
+        models: Model chain to use, primary first (default: DEFAULT_MODELS)
 
     Returns:
         Dictionary with journal entry data
+
+    Raises:
+        DeadlineExceededError: If the request deadline passes (no further
+            fallbacks are tried)
     """
+    models = list(models or DEFAULT_MODELS)
+    primary_model = models[0]
+
+    if not get_circuit_breaker(primary_model).allow_request():
+        _count("breaker_skips")
+        print(f"Primary model ({primary_model}) circuit open, using fallback")
+        return _process_fallback(text, prompt_template, models[1:], None)
+
+    if HEDGE_ENABLED and len(models) > 1:
+        return _process_hedged(text, prompt_template, models)
+
     try:
-        return process_with_gemini(text, model_name="gemini-2.5-flash")
+        result = _call_model(text, primary_model, prompt_template)
+        _count("primary_successes")
+        return result
+    except DeadlineExceededError:
+        raise
     except Exception as e:
-        print(f"Primary model (gemini-2.5-flash) failed, trying fallback: {e}")
-        try:
-            return process_with_gemini(text, model_name="gemini-2.0-flash-exp")
-        except Exception as fallback_error:
-            # Print available models for debugging
-            try:
-                available_models = [m.name for m in genai.list_models()]
-                print(f"Available Models: {available_models}")
-            except Exception:
-                print("Could not list available models")
-            raise Exception(f"Both models failed. Last error: {fallback_error}")
+        print(f"Primary model ({primary_model}) failed, trying fallback: {e}")
+        return _process_fallback(text, prompt_template, models[1:], e)
@@ -0,0 +1,321 @@
+"""
+Ingest Manifest Module
+
+Tracks which conversations of a ChatGPT export have already been processed, so a
+new export (which always contains the whole history) only sends new or changed
+conversations through the pipeline. Each processed conversation is stored by
+source_id with a fingerprint taken from its update_time and/or a hash of its
+content, in a local SQLite file or a DynamoDB table.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from src.export_reader import iter_conversations
+
+FINGERPRINT_MODES = ("update_time", "hash", "both")
+
+# Manifest configuration (overridable via environment)
+DEFAULT_MANIFEST_BACKEND = "sqlite"
+DEFAULT_MANIFEST_PATH = "/tmp/rijg_ingest_manifest.sqlite3"
+DEFAULT_MANIFEST_TABLE_NAME = "RIJG-IngestManifest"
+
+# update_time is cheap but only as good as the export's timestamps; hash also
+# catches edits that didn't bump it (conversations without update_time are
+# always hashed)
+DEFAULT_FINGERPRINT_MODE = os.environ.get("INGEST_FINGERPRINT_MODE", "update_time")
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def conversation_fingerprint(
+    conversation: Dict[str, Any], mode: Optional[str] = None
+) -> str:
+    """
+    Fingerprint a raw export conversation without parsing it.
+
+    Args:
+        conversation: Raw ChatGPT conversation dictionary
+        mode: One of FINGERPRINT_MODES (default: INGEST_FINGERPRINT_MODE)
+
+    Returns:
+        Fingerprint string; equal fingerprints mean the conversation is unchanged
+
+    Raises:
+        ValueError: If mode is not recognised
+    """
+    mode = mode or DEFAULT_FINGERPRINT_MODE
+    if mode not in FINGERPRINT_MODES:
+        raise ValueError(
+            f"Unknown fingerprint mode: {mode} (expected one of {FINGERPRINT_MODES})"
+        )
+
+    update_time = conversation.get("update_time")
+    parts = []
+    if mode in ("update_time", "both") and update_time is not None:
+        mapping = conversation.get("mapping") or {}
+        parts.append(f"u:{update_time!r}:{len(mapping)}")
+    if mode in ("hash", "both") or update_time is None:
+        parts.append("h:" + _content_hash(conversation))
+    return "|".join(parts)
+
+
+def _content_hash(conversation: Dict[str, Any]) -> str:
+    """Hash of the parts of a conversation that feed the journal entry."""
+    content = json.dumps(
+        [
+            conversation.get("title"),
+            conversation.get("create_time"),
+            conversation.get("current_node"),
+            conversation.get("mapping"),
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SQLiteManifest:
+    """Manifest in a local SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                source_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                processed_at REAL NOT NULL,
+                info TEXT
+            )
+            """)
+        self._conn.commit()
+
+    def fingerprints(self) -> Dict[str, str]:
+        """Return source_id -> fingerprint for every processed conversation."""
+        with self._lock:
+            return dict(
+                self._conn.execute("SELECT source_id, fingerprint FROM manifest")
+            )
+
+    def get(self, source_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, processed_at, info FROM manifest "
+                "WHERE source_id = ?",
+                (source_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "source_id": source_id,
+            "fingerprint": row[0],
+            "processed_at": row[1],
+            "info": json.loads(row[2]) if row[2] else None,
+        }
+
+    def record(
+        self, source_id: str, fingerprint: str, info: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Mark a conversation as processed at the given fingerprint."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest "
+                "(source_id, fingerprint, processed_at, info) VALUES (?, ?, ?, ?)",
+                (
+                    source_id,
+                    fingerprint,
+                    time.time(),
+                    json.dumps(info) if info else None,
+                ),
+            )
+            self._conn.commit()
+
+    def remove(self, source_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM manifest WHERE source_id = ?", (source_id,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+
+
+class DynamoDBManifest:
+    """Manifest in a DynamoDB table keyed by source_id."""
+
+    def __init__(
+        self,
+        table_name: str = DEFAULT_MANIFEST_TABLE_NAME,
+        dynamodb_resource: Any = None,
+    ):
+        if dynamodb_resource is None:
+            import boto3
+
+            dynamodb_resource = boto3.resource("dynamodb")
+        self.table = dynamodb_resource.Table(table_name)
+
+    def fingerprints(self) -> Dict[str, str]:
+        """Return source_id -> fingerprint, read with one paginated scan."""
+        result = {}
+        kwargs: Dict[str, Any] = {"ProjectionExpression": "source_id, fingerprint"}
+        while True:
+            response = self.table.scan(**kwargs)
+            for item in response.get("Items", []):
+                result[item["source_id"]] = item["fingerprint"]
+            if "LastEvaluatedKey" not in response:
+                return result
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def get(self, source_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"source_id": source_id}).get("Item")
+        if not item:
+            return None
+        return {
+            "source_id": source_id,
+            "fingerprint": item["fingerprint"],
+            "processed_at": float(item["processed_at"]),
+            "info": json.loads(item["info"]) if item.get("info") else None,
+        }
+
+    def record(
+        self, source_id: str, fingerprint: str, info: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Mark a conversation as processed at the given fingerprint."""
+        item = {
+            "source_id": source_id,
+            "fingerprint": fingerprint,
+            "processed_at": int(time.time()),
+        }
+        if info:
+            item["info"] = json.dumps(info)
+        self.table.put_item(Item=item)
+
+    def remove(self, source_id: str) -> None:
+        self.table.delete_item(Key={"source_id": source_id})
+
+    def __len__(self) -> int:
+        return len(self.fingerprints())
+
+
+def create_manifest(backend_name: Optional[str] = None) -> Any:
+    """
+    Create an ingest manifest from environment configuration.
+
+    Environment:
+        INGEST_MANIFEST_BACKEND: sqlite (default) or dynamodb
+        INGEST_MANIFEST_PATH: SQLite file path
+        INGEST_MANIFEST_TABLE_NAME: DynamoDB table name
+
+    Returns:
+        Manifest instance
+    """
+    backend_name = (
+        backend_name
+        or os.environ.get("INGEST_MANIFEST_BACKEND", DEFAULT_MANIFEST_BACKEND)
+    ).lower()
+
+    if backend_name == "sqlite":
+        return SQLiteManifest(
+            os.environ.get("INGEST_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        )
+    if backend_name == "dynamodb":
+        return DynamoDBManifest(
+            os.environ.get("INGEST_MANIFEST_TABLE_NAME", DEFAULT_MANIFEST_TABLE_NAME)
+        )
+    raise ValueError(f"Unknown INGEST_MANIFEST_BACKEND: {backend_name}")
+
+
+def scan_export(
+    source: Union[str, Path, IO[str]],
+    manifest: Any,
+    mode: Optional[str] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """
+    Yield the conversations of an export that are new or changed.
+
+    The manifest is read once up front, and conversations are only fingerprinted
+    (never parsed), so the scan costs little more than decoding the export.
+
+    Args:
+        source: Path to conversations.json or an open text file object
+        manifest: SQLiteManifest or DynamoDBManifest
+        mode: Fingerprint mode (see conversation_fingerprint)
+        stats: Optional dictionary updated with total/new/changed/unchanged counts
+
+    Yields:
+        Tuples of (status, raw conversation, fingerprint) with status NEW or CHANGED
+    """
+    known = manifest.fingerprints()
+    stats = stats if stats is not None else {}
+    for key in ("total", NEW, CHANGED, UNCHANGED):
+        stats.setdefault(key, 0)
+
+    for conversation in iter_conversations(source):
+        stats["total"] += 1
+        fingerprint = conversation_fingerprint(conversation, mode)
+        previous = known.get(conversation.get("id", "unknown"))
+        if previous == fingerprint:
+            stats[UNCHANGED] += 1
+            continue
+        status = NEW if previous is None else CHANGED
+        stats[status] += 1
+        yield status, conversation, fingerprint
+
+
+def ingest_delta(
+    source: Union[str, Path, IO[str]],
+    manifest: Any,
+    process: Callable[[Dict[str, Any]], Any],
+    mode: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Process only the new and changed conversations of an export.
+
+    A conversation is recorded in the manifest only after process returns, so
+    failures are retried on the next run.
+
+    Args:
+        source: Path to conversations.json or an open text file object
+        manifest: SQLiteManifest or DynamoDBManifest
+        process: Called with each new or changed raw conversation (for example
+            app.run_pipeline); raising marks the conversation failed
+        mode: Fingerprint mode (see conversation_fingerprint)
+
+    Returns:
+        Counts: total, new, changed, unchanged, processed and failed
+    """
+    stats: Dict[str, int] = {"processed": 0, "failed": 0}
+    for status, conversation, fingerprint in scan_export(source, manifest, mode, stats):
+        source_id = conversation.get("id", "unknown")
+        try:
+            process(conversation)
+        except Exception as e:
+            print(f"Failed to process {status} conversation {source_id}: {e}")
+            stats["failed"] += 1
+            continue
+        manifest.record(source_id, fingerprint, {"title": conversation.get("title")})
+        stats["processed"] += 1
+
+    print(
+        f"Ingested {stats['processed']} of {stats[NEW]} new and {stats[CHANGED]} "
+        f"changed conversations ({stats[UNCHANGED]} unchanged, "
+        f"{stats['failed']} failed)"
+    )
+    return stats
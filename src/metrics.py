@@ -0,0 +1,248 @@
+"""
+Metrics Module
+
+Per-request timing spans, counters and token usage, emitted as CloudWatch
+Embedded Metric Format (EMF) JSON. The active recorder lives in a context
+variable (like the request deadline), so any stage can record without threading
+an argument through each call; outside a metrics_scope recording is a no-op.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "RIJG")
+METRICS_SERVICE = os.environ.get("METRICS_SERVICE", "journal-generator")
+DEFAULT_METRICS_SINK = "stdout"
+DEFAULT_METRICS_PATH = "/tmp/rijg_metrics.jsonl"
+
+# EMF accepts at most 100 values per metric in one record
+MAX_VALUES_PER_METRIC = 100
+
+_current_recorder: contextvars.ContextVar = contextvars.ContextVar(
+    "rijg_metrics", default=None
+)
+
+
+class MetricsRecorder:
+    """
+    Metrics for one request: span durations, counters and properties.
+
+    Spans and counters recorded under the same name accumulate (spans keep each
+    duration, counters add up). Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, List[float]] = {}
+        self.units: Dict[str, str] = {}
+        self.counters: Dict[str, float] = {}
+        self.properties: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add_value(self, name: str, value: float, unit: str) -> None:
+        with self._lock:
+            self.values.setdefault(name, []).append(value)
+            self.units[name] = unit
+
+    def add_count(self, name: str, value: float, unit: str) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.units[name] = unit
+
+    def set_property(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.properties[name] = value
+
+    def to_emf(self, timestamp_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build the EMF record for this request.
+
+        Returns:
+            Dictionary with the _aws metadata, one key per metric (a list when a
+            span was recorded more than once) and the properties
+        """
+        with self._lock:
+            record: Dict[str, Any] = {"Service": METRICS_SERVICE}
+            record.update(self.properties)
+            for name, values in self.values.items():
+                values = [round(v, 3) for v in values[:MAX_VALUES_PER_METRIC]]
+                record[name] = values[0] if len(values) == 1 else values
+            record.update(self.counters)
+            metrics = [
+                {"Name": name, "Unit": self.units[name]}
+                for name in list(self.values) + list(self.counters)
+            ]
+
+        record["_aws"] = {
+            "Timestamp": timestamp_ms or int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Service"]],
+                    "Metrics": metrics,
+                }
+            ],
+        }
+        return record
+
+
+class StdoutMetricsSink:
+    """Print EMF records; in Lambda, CloudWatch Logs extracts the metrics."""
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        print(json.dumps(record, default=str))
+
+
+class FileMetricsSink:
+    """Append EMF records to a JSON Lines file (for local runs)."""
+
+    def __init__(self, path: str = DEFAULT_METRICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class MemoryMetricsSink:
+    """Keep EMF records in a list (for tests and benchmarks)."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+
+
+_metrics_sink: Optional[Any] = None
+_metrics_sink_configured = False
+_metrics_sink_lock = threading.Lock()
+
+
+def create_metrics_sink(sink_name: Optional[str] = None) -> Any:
+    """
+    Create a metrics sink from environment configuration.
+
+    Environment:
+        METRICS_SINK: stdout (default), file, memory or none
+        METRICS_PATH: JSON Lines file for the file sink
+
+    Returns:
+        Sink instance, or None if metrics are disabled
+    """
+    sink_name = (
+        sink_name or os.environ.get("METRICS_SINK", DEFAULT_METRICS_SINK)
+    ).lower()
+
+    if sink_name == "none":
+        return None
+    if sink_name == "stdout":
+        return StdoutMetricsSink()
+    if sink_name == "file":
+        return FileMetricsSink(os.environ.get("METRICS_PATH", DEFAULT_METRICS_PATH))
+    if sink_name == "memory":
+        return MemoryMetricsSink()
+    raise ValueError(f"Unknown METRICS_SINK: {sink_name}")
+
+
+def get_metrics_sink() -> Optional[Any]:
+    """Return the process-wide metrics sink, creating it on first use."""
+    global _metrics_sink, _metrics_sink_configured
+    if not _metrics_sink_configured:
+        with _metrics_sink_lock:
+            if not _metrics_sink_configured:
+                _metrics_sink = create_metrics_sink()
+                _metrics_sink_configured = True
+    return _metrics_sink
+
+
+def set_metrics_sink(sink: Optional[Any]) -> None:
+    """Replace the process-wide metrics sink (None disables metrics)."""
+    global _metrics_sink, _metrics_sink_configured
+    with _metrics_sink_lock:
+        _metrics_sink = sink
+        _metrics_sink_configured = True
+
+
+def current_recorder() -> Optional[MetricsRecorder]:
+    """Return the recorder of the request being processed, if any."""
+    return _current_recorder.get()
+
+
+@contextmanager
+def metrics_scope(**properties: Any) -> Iterator[Optional[MetricsRecorder]]:
+    """
+    Record metrics for the duration of the block and emit them at the end.
+
+    Nested scopes reuse the outer recorder. Emitting never raises: a failing
+    sink is logged and the request carries on.
+
+    Args:
+        **properties: Properties attached to the record (e.g. handler name)
+    """
+    sink = get_metrics_sink()
+    if sink is None or _current_recorder.get() is not None:
+        yield _current_recorder.get()
+        return
+
+    recorder = MetricsRecorder()
+    for name, value in properties.items():
+        recorder.set_property(name, value)
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+        try:
+            sink.emit(recorder.to_emf())
+        except Exception as e:
+            print(f"Metrics emit failed ({type(sink).__name__}): {e}")
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the block and record it as <name>_ms.
+
+    The duration is recorded even if the block raises.
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_value(
+            f"{name}_ms", (time.perf_counter() - start) * 1000, "Milliseconds"
+        )
+
+
+def record_value(name: str, value: float, unit: str = "Milliseconds") -> None:
+    """Record one measurement (e.g. a latency taken outside a span)."""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.add_value(name, value, unit)
+
+
+def count(name: str, value: float = 1, unit: str = "Count") -> None:
+    """Add value to the counter name for the current request."""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.add_count(name, value, unit)
+
+
+def set_property(name: str, value: Any) -> None:
+    """Attach a non-metric property (e.g. source_id) to the current record."""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.set_property(name, value)
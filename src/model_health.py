@@ -0,0 +1,173 @@
+"""
+Model Health Module
+
+Per-model circuit breakers and latency tracking for the Gemini model chain.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# Consecutive failures that open a model's circuit
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("GEMINI_BREAKER_FAILURES", "3"))
+
+# Seconds an open circuit skips the model before allowing a probe request
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("GEMINI_BREAKER_COOLDOWN", "60"))
+
+# Number of recent latencies kept per model
+LATENCY_WINDOW = 200
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Skips a model that keeps failing for a cool-down window.
+
+    closed -> open after failure_threshold consecutive failures; open -> half_open
+    once cooldown_seconds have passed, letting one probe request through; the
+    probe's outcome closes or re-opens the circuit.
+
+    Args:
+        name: Model name (for logging)
+        failure_threshold: Consecutive failures before opening
+        cooldown_seconds: Time the circuit stays open
+        clock: Monotonic time source (seconds)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = BREAKER_COOLDOWN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_count = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._cooldown_elapsed():
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to this model now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._cooldown_elapsed():
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"Circuit for {self.name} closed")
+            self._state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(
+                        f"Circuit for {self.name} opened after {self.failures} "
+                        f"failure(s); skipping for {self.cooldown_seconds:.0f}s"
+                    )
+                    self.opened_count += 1
+                self._state = OPEN
+                self._opened_at = self.clock()
+
+    def release(self) -> None:
+        """Forget an in-flight request without counting a success or failure."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _cooldown_elapsed(self) -> bool:
+        return self.clock() - self._opened_at >= self.cooldown_seconds
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies for one model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Return the pct-th percentile latency (nearest rank), or None with no samples.
+
+        Args:
+            pct: Percentile in (0, 100]
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, int(round(pct / 100 * len(samples))))
+        return samples[min(rank, len(samples)) - 1]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a model."""
+    with _registry_lock:
+        breaker = _breakers.get(model_name)
+        if breaker is None:
+            breaker = _breakers[model_name] = CircuitBreaker(model_name)
+        return breaker
+
+
+def get_latency_tracker(model_name: str) -> LatencyTracker:
+    """Return the process-wide latency tracker for a model."""
+    with _registry_lock:
+        tracker = _latencies.get(model_name)
+        if tracker is None:
+            tracker = _latencies[model_name] = LatencyTracker()
+        return tracker
+
+
+def breaker_states() -> Dict[str, str]:
+    """Return the current circuit state of every model seen so far."""
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.state for name, breaker in breakers.items()}
+
+
+def reset_model_health() -> None:
+    """Forget all breaker state and latency samples."""
+    with _registry_lock:
+        _breakers.clear()
+        _latencies.clear()
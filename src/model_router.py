@@ -0,0 +1,252 @@
+"""
+Model Router Module
+
+Pre-flight sizing for journal requests: estimates input tokens, picks a model tier
+from a configurable routing table, and rejects or chunks oversized inputs before
+any generation call is made.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from src.chunked_processor import CHUNK_THRESHOLD_TOKENS, map_reduce_journal
+from src.gemini_processor import (
+    DEFAULT_MODELS,
+    HEDGE_MIN_SAMPLES,
+    get_api_key,
+    get_model,
+    process_with_gemini_fallback,
+)
+from src.model_health import get_latency_tracker
+from src.result_cache import MemoryCacheBackend, make_cache_key
+from src.token_estimator import estimate_tokens
+
+ROUTING_MODES = ("single", "chunked")
+
+# Tiers in ascending max_tokens order; inputs above the last tier are rejected.
+# Optional keys: latency_target_seconds (demote models whose p95 is slower) and
+# segment_tokens (chunked tiers).
+DEFAULT_ROUTING_TABLE = [
+    {
+        "name": "short",
+        "max_tokens": 4000,
+        "mode": "single",
+        "models": list(DEFAULT_MODELS),
+        "latency_target_seconds": 10,
+    },
+    {
+        "name": "standard",
+        "max_tokens": CHUNK_THRESHOLD_TOKENS,
+        "mode": "single",
+        "models": list(DEFAULT_MODELS),
+    },
+    {
+        "name": "long",
+        "max_tokens": 1000000,
+        "mode": "chunked",
+        "models": list(DEFAULT_MODELS),
+    },
+]
+
+# Use the Gemini count_tokens API when the local estimate is near a tier boundary
+ROUTER_COUNT_TOKENS = os.environ.get("ROUTER_COUNT_TOKENS", "false") == "true"
+
+# Relative distance from a boundary within which count_tokens is consulted
+ROUTER_COUNT_MARGIN = float(os.environ.get("ROUTER_COUNT_MARGIN", "0.2"))
+
+# Recent count_tokens results, keyed by model and text
+_token_counts = MemoryCacheBackend(max_entries=256, ttl_seconds=None)
+_routing_table: Optional[List[Dict[str, Any]]] = None
+
+
+class RequestTooLargeError(ValueError):
+    """Raised when an input exceeds every tier of the routing table."""
+
+
+def load_routing_table(raw: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Load and validate the routing table.
+
+    Args:
+        raw: JSON list of tiers (default: MODEL_ROUTING_TABLE environment variable,
+            falling back to DEFAULT_ROUTING_TABLE)
+
+    Returns:
+        Tiers sorted by max_tokens
+
+    Raises:
+        ValueError: If the table is malformed
+    """
+    raw = raw if raw is not None else os.environ.get("MODEL_ROUTING_TABLE")
+    if not raw:
+        return DEFAULT_ROUTING_TABLE
+
+    try:
+        table = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"MODEL_ROUTING_TABLE is not valid JSON: {e}")
+    if not isinstance(table, list) or not table:
+        raise ValueError("MODEL_ROUTING_TABLE must be a non-empty list of tiers")
+
+    for tier in table:
+        if not isinstance(tier, dict):
+            raise ValueError("Each routing tier must be an object")
+        name = tier.get("name", "?")
+        if not isinstance(tier.get("max_tokens"), int) or tier["max_tokens"] < 1:
+            raise ValueError(f"Routing tier {name}: max_tokens must be a positive int")
+        if not isinstance(tier.get("models"), list) or not tier["models"]:
+            raise ValueError(f"Routing tier {name}: models must be a non-empty list")
+        if tier.setdefault("mode", "single") not in ROUTING_MODES:
+            raise ValueError(
+                f"Routing tier {name}: mode must be one of {ROUTING_MODES}"
+            )
+
+    return sorted(table, key=lambda tier: tier["max_tokens"])
+
+
+def get_routing_table() -> List[Dict[str, Any]]:
+    """Return the routing table, loading it on first use."""
+    global _routing_table
+    if _routing_table is None:
+        _routing_table = load_routing_table()
+    return _routing_table
+
+
+def routed_models(table: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """Every model the routing table can pick, in first-seen order."""
+    models: Dict[str, None] = {}
+    for tier in table or get_routing_table():
+        models.update(dict.fromkeys(tier["models"]))
+    return list(models)
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    """
+    Count tokens with the Gemini API, reusing recent results for the same text.
+
+    Args:
+        text: Text to count
+        model_name: Model whose tokenizer to use
+
+    Returns:
+        Token count reported by Gemini
+    """
+    key = make_cache_key("count_tokens", model_name, text)
+    cached = _token_counts.get(key)
+    if cached is not None:
+        return cached["total_tokens"]
+
+    model = get_model(model_name, get_api_key())
+    total = model.count_tokens(text).total_tokens
+    _token_counts.set(key, {"total_tokens": total})
+    return total
+
+
+def estimate_input_tokens(
+    text: str, table: Optional[List[Dict[str, Any]]] = None
+) -> int:
+    """
+    Estimate input tokens locally, asking count_tokens only near tier boundaries.
+
+    Args:
+        text: Prompt text
+        table: Routing table (default: get_routing_table())
+
+    Returns:
+        Estimated token count
+    """
+    estimated = estimate_tokens(text)
+    if not ROUTER_COUNT_TOKENS:
+        return estimated
+
+    table = table or get_routing_table()
+    near_boundary = any(
+        abs(estimated - tier["max_tokens"]) <= tier["max_tokens"] * ROUTER_COUNT_MARGIN
+        for tier in table
+    )
+    if not near_boundary:
+        return estimated
+
+    try:
+        return count_tokens(text, table[0]["models"][0])
+    except Exception as e:
+        print(f"count_tokens failed, using local estimate: {e}")
+        return estimated
+
+
+def route_request(
+    text: str, table: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Choose the tier, mode and model chain for a request without generating anything.
+
+    Args:
+        text: Prompt text
+        table: Routing table (default: get_routing_table())
+
+    Returns:
+        Dictionary with tier, mode, models, estimated_tokens and (for chunked
+        tiers) segment_tokens
+
+    Raises:
+        RequestTooLargeError: If the input is larger than the last tier allows
+    """
+    table = table or get_routing_table()
+    estimated = estimate_input_tokens(text, table)
+
+    for tier in table:
+        if estimated <= tier["max_tokens"]:
+            return {
+                "tier": tier.get("name", str(tier["max_tokens"])),
+                "mode": tier.get("mode", "single"),
+                "models": _order_by_latency(
+                    tier["models"], tier.get("latency_target_seconds")
+                ),
+                "estimated_tokens": estimated,
+                "segment_tokens": tier.get("segment_tokens"),
+            }
+
+    raise RequestTooLargeError(
+        f"Conversation is too long to process (~{estimated} tokens, "
+        f"limit {table[-1]['max_tokens']})"
+    )
+
+
+def _order_by_latency(models: List[str], target: Optional[float]) -> List[str]:
+    """Move models whose recent p95 latency misses the target behind the others."""
+    if not target:
+        return list(models)
+
+    def misses_target(model_name: str) -> bool:
+        tracker = get_latency_tracker(model_name)
+        if len(tracker) < HEDGE_MIN_SAMPLES:
+            return False
+        return tracker.percentile(95) > target
+
+    return sorted(models, key=misses_target)
+
+
+def process_with_routing(text: str) -> dict:
+    """
+    Route a request, then run the single-call or map-reduce path it was given.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Dictionary with journal entry data (RESPONSE_SCHEMA fields)
+
+    Raises:
+        RequestTooLargeError: If the input is over budget (before any API call)
+    """
+    route = route_request(text)
+    print(
+        f"Routing ~{route['estimated_tokens']} tokens to tier {route['tier']} "
+        f"({route['mode']}: {', '.join(route['models'])})"
+    )
+    if route["mode"] == "chunked":
+        return map_reduce_journal(
+            text, segment_tokens=route["segment_tokens"], models=route["models"]
+        )
+    return process_with_gemini_fallback(text, models=route["models"])
@@ -0,0 +1,351 @@
+"""
+Near-Duplicate Detection Module
+
+MinHash signatures over word shingles of a conversation's raw_text, indexed with
+locality-sensitive hashing (LSH) bands in SQLite. Retried prompts, forks and
+repeated questions can then be spotted before they cost a Gemini call: a lookup
+only reads the conversations that share a band bucket with the new one, so it
+stays in the milliseconds however many conversations are indexed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+# Estimated Jaccard similarity at or above which conversations are near-duplicates
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.85"))
+
+# Hash functions per signature; more is more accurate but slower to compute
+NEAR_DUP_NUM_PERM = int(os.environ.get("NEAR_DUP_NUM_PERM", "128"))
+
+# Words per shingle
+NEAR_DUP_SHINGLE_SIZE = int(os.environ.get("NEAR_DUP_SHINGLE_SIZE", "5"))
+
+DEFAULT_INDEX_PATH = "/tmp/rijg_near_duplicates.sqlite3"
+
+# Band layouts are chosen so a pair at the threshold shares a bucket with at
+# least this probability
+MIN_RECALL_AT_THRESHOLD = 0.99
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+
+Signature = Tuple[int, ...]
+
+
+def text_shingles(text: str, size: int = NEAR_DUP_SHINGLE_SIZE) -> List[int]:
+    """
+    Hash the distinct word shingles of a text to 32-bit integers.
+
+    Text is lower-cased and split into words, so formatting and punctuation
+    differences don't count. Texts shorter than size words give one shingle.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+    return [
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big"
+        )
+        for shingle in shingles
+    ]
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    """Fixed (a, b) coefficients, so signatures stay comparable across runs."""
+    permutations = []
+    counter = 0
+    while len(permutations) < num_perm:
+        digest = hashlib.blake2b(f"rijg-minhash-{counter}".encode(), digest_size=16)
+        a = int.from_bytes(digest.digest()[:8], "big") % _MERSENNE_PRIME
+        b = int.from_bytes(digest.digest()[8:], "big") % _MERSENNE_PRIME
+        counter += 1
+        if a:
+            permutations.append((a, b))
+    return permutations
+
+
+_permutation_cache: Dict[int, List[Tuple[int, int]]] = {}
+
+
+def minhash_signature(
+    text: str,
+    num_perm: int = NEAR_DUP_NUM_PERM,
+    shingle_size: int = NEAR_DUP_SHINGLE_SIZE,
+) -> Signature:
+    """
+    Compute the MinHash signature of a text.
+
+    Args:
+        text: Conversation raw_text (or any text)
+        num_perm: Signature length
+        shingle_size: Words per shingle
+
+    Returns:
+        Tuple of num_perm 32-bit values; the fraction of equal positions between
+        two signatures estimates the Jaccard similarity of their shingle sets
+    """
+    permutations = _permutation_cache.get(num_perm)
+    if permutations is None:
+        permutations = _permutation_cache.setdefault(num_perm, _permutations(num_perm))
+    hashes = text_shingles(text, shingle_size)
+    prime, mask = _MERSENNE_PRIME, _MAX_HASH
+    return tuple(
+        min([((a * h + b) % prime) & mask for h in hashes]) for a, b in permutations
+    )
+
+
+def estimate_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures of the same length."""
+    if len(first) != len(second):
+        raise ValueError("Signatures must have the same number of permutations")
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick the LSH layout (bands, rows per band) for a threshold.
+
+    Uses the most rows per band (fewest false candidates) for which a pair at
+    the threshold still collides in some band with MIN_RECALL_AT_THRESHOLD.
+
+    Returns:
+        Tuple of (bands, rows)
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        recall = 1 - (1 - threshold**rows) ** bands
+        if recall >= MIN_RECALL_AT_THRESHOLD:
+            return bands, rows
+    return num_perm, 1
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index in a SQLite file.
+
+    Each conversation is stored with its signature and one bucket row per LSH
+    band. The signature settings and band layout are saved with the index;
+    reopening it with a different signature length or shingle size raises
+    ValueError. Safe to use from several threads.
+
+    Args:
+        path: SQLite file (":memory:" for a throwaway index)
+        threshold: Similarity at or above which a match is reported
+        num_perm: Signature length
+        shingle_size: Words per shingle
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        threshold: float = NEAR_DUP_THRESHOLD,
+        num_perm: int = NEAR_DUP_NUM_PERM,
+        shingle_size: int = NEAR_DUP_SHINGLE_SIZE,
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS signatures (
+                source_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                info TEXT,
+                added_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                source_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_by_bucket ON buckets (bucket);
+            CREATE INDEX IF NOT EXISTS buckets_by_source ON buckets (source_id);
+            """)
+        self._check_settings()
+        self._conn.commit()
+
+    def signature(self, text: str) -> Signature:
+        """MinHash signature of text with this index's settings."""
+        return minhash_signature(text, self.num_perm, self.shingle_size)
+
+    def query(
+        self, text_or_signature: Union[str, Sequence[int]], limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Find indexed conversations similar to a text or signature.
+
+        Args:
+            text_or_signature: raw_text, or a signature from self.signature
+            limit: Maximum matches returned
+
+        Returns:
+            Matches at or above the threshold, most similar first, each with
+            source_id, similarity and info
+        """
+        signature = self._as_signature(text_or_signature)
+        with self._lock:
+            return self._query(signature, limit)
+
+    def add(
+        self,
+        source_id: str,
+        text_or_signature: Union[str, Sequence[int]],
+        info: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Index a conversation (replacing any earlier version of it)."""
+        signature = self._as_signature(text_or_signature)
+        with self._lock:
+            self._add(source_id, signature, info)
+            self._conn.commit()
+
+    def check_and_add(
+        self,
+        source_id: str,
+        text_or_signature: Union[str, Sequence[int]],
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the closest near-duplicate of a conversation, or index it.
+
+        The lookup and insert happen under one lock, so of two near-identical
+        conversations checked at the same time exactly one is indexed.
+
+        Returns:
+            The best match (source_id, similarity, info), or None if the
+            conversation was new and has been added
+        """
+        signature = self._as_signature(text_or_signature)
+        with self._lock:
+            matches = [
+                m for m in self._query(signature, 2) if m["source_id"] != source_id
+            ]
+            if matches:
+                return matches[0]
+            self._add(source_id, signature, info)
+            self._conn.commit()
+            return None
+
+    def remove(self, source_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM signatures WHERE source_id = ?", (source_id,)
+            )
+            self._conn.execute("DELETE FROM buckets WHERE source_id = ?", (source_id,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _as_signature(self, text_or_signature: Union[str, Sequence[int]]) -> Signature:
+        if isinstance(text_or_signature, str):
+            return self.signature(text_or_signature)
+        if len(text_or_signature) != self.num_perm:
+            raise ValueError(
+                f"Signature has {len(text_or_signature)} values, "
+                f"index uses {self.num_perm}"
+            )
+        return tuple(text_or_signature)
+
+    def _bucket_keys(self, signature: Signature) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            values = array("I", signature[band * self.rows : (band + 1) * self.rows])
+            digest = hashlib.blake2b(
+                values.tobytes(), digest_size=8, salt=band.to_bytes(8, "big")
+            ).digest()
+            keys.append(int.from_bytes(digest, "big", signed=True))
+        return keys
+
+    def _query(self, signature: Signature, limit: int) -> List[Dict[str, Any]]:
+        keys = self._bucket_keys(signature)
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            "SELECT s.source_id, s.signature, s.info FROM signatures s "
+            "WHERE s.source_id IN (SELECT source_id FROM buckets "
+            f"WHERE bucket IN ({placeholders}))",
+            keys,
+        ).fetchall()
+
+        matches = []
+        for source_id, blob, info in rows:
+            similarity = estimate_similarity(signature, array("I", blob))
+            if similarity >= self.threshold:
+                matches.append(
+                    {
+                        "source_id": source_id,
+                        "similarity": round(similarity, 4),
+                        "info": json.loads(info) if info else None,
+                    }
+                )
+        matches.sort(key=lambda m: (-m["similarity"], m["source_id"]))
+        return matches[:limit]
+
+    def _add(
+        self, source_id: str, signature: Signature, info: Optional[Dict[str, Any]]
+    ) -> None:
+        self._conn.execute("DELETE FROM buckets WHERE source_id = ?", (source_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO signatures (source_id, signature, info, added_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                source_id,
+                array("I", signature).tobytes(),
+                json.dumps(info) if info else None,
+                time.time(),
+            ),
+        )
+        self._conn.executemany(
+            "INSERT INTO buckets (bucket, source_id) VALUES (?, ?)",
+            [(key, source_id) for key in self._bucket_keys(signature)],
+        )
+
+    def _check_settings(self) -> None:
+        """Save the settings of a new index, or load and check an existing one's."""
+        stored = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if not stored:
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("num_perm", str(self.num_perm)),
+                    ("shingle_size", str(self.shingle_size)),
+                    ("bands", str(self.bands)),
+                    ("rows", str(self.rows)),
+                ],
+            )
+            return
+
+        if (stored["num_perm"], stored["shingle_size"]) != (
+            str(self.num_perm),
+            str(self.shingle_size),
+        ):
+            raise ValueError(
+                f"Near-duplicate index was built with num_perm={stored['num_perm']} "
+                f"and shingle_size={stored['shingle_size']}; use the same "
+                "NEAR_DUP_* settings or a new index file"
+            )
+        # The band layout is fixed when the index is built; a different
+        # threshold only changes which candidates are reported
+        self.bands, self.rows = int(stored["bands"]), int(stored["rows"])
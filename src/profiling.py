@@ -0,0 +1,234 @@
+"""
+Profiling Module
+
+Opt-in per-invocation profiling for lambda_handler: cProfile for hot functions
+and tracemalloc for allocation sites. Reports are tagged with the conversation's
+source_id and written to the log, a local directory or an S3 prefix. When
+profiling is off, the handler does one flag check and nothing is imported.
+"""
+
+import io
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+PROFILE_MODES = ("cpu", "memory", "both")
+
+# Profile every invocation: cpu, memory or both (empty disables)
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "").lower()
+
+# Honour a per-request X-Profile header / ?profile= parameter
+PROFILE_REQUEST_FLAG = os.environ.get("PROFILE_REQUEST_FLAG", "false") == "true"
+
+# Functions / allocation sites listed in a report
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "25"))
+
+# Where reports go: log, file (PROFILE_DIR) or s3 (PROFILE_BUCKET/PROFILE_PREFIX)
+PROFILE_OUTPUT = os.environ.get("PROFILE_OUTPUT", "log").lower()
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/rijg_profiles")
+PROFILE_BUCKET = os.environ.get("PROFILE_BUCKET", "")
+PROFILE_PREFIX = os.environ.get("PROFILE_PREFIX", "profiles/")
+
+# True when any invocation may be profiled; checked before anything else
+PROFILING_ENABLED = bool(PROFILE_MODE) or PROFILE_REQUEST_FLAG
+
+_SAFE_TAG = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def requested_profile_mode(event: Dict[str, Any]) -> Optional[str]:
+    """
+    Return the profiling mode for an invocation, or None.
+
+    PROFILE_MODE applies to every invocation; with PROFILE_REQUEST_FLAG=true a
+    request can also ask for a mode with an X-Profile header or a profile query
+    string parameter.
+
+    Args:
+        event: API Gateway event
+
+    Returns:
+        One of PROFILE_MODES, or None to run unprofiled
+    """
+    mode = PROFILE_MODE
+    if PROFILE_REQUEST_FLAG:
+        headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+        params = event.get("queryStringParameters") or {}
+        mode = (headers.get("x-profile") or params.get("profile") or mode).lower()
+    if not mode:
+        return None
+    if mode not in PROFILE_MODES:
+        print(f"Ignoring unknown profile mode: {mode}")
+        return None
+    return mode
+
+
+class ProfileSession:
+    """
+    Collects a cProfile and/or tracemalloc profile of one invocation.
+
+    cProfile only sees the thread that started the session, so work handed to
+    thread pools (batch items, chunk segments) shows up as waits; tracemalloc
+    covers every thread.
+
+    Args:
+        mode: One of PROFILE_MODES
+        top_n: Entries per report section
+    """
+
+    def __init__(self, mode: str, top_n: int = PROFILE_TOP_N):
+        self.mode = mode
+        self.top_n = top_n
+        self.profiler: Any = None
+        self.started_tracemalloc = False
+        self.wall_seconds = 0.0
+        self._start = 0.0
+
+    def start(self) -> None:
+        if self.mode in ("memory", "both"):
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracemalloc = True
+            tracemalloc.reset_peak()
+        if self.mode in ("cpu", "both"):
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError as e:
+                # Another profiler is already active in this thread
+                print(f"cProfile unavailable: {e}")
+                self.profiler = None
+        self._start = time.perf_counter()
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Stop profiling and build the report.
+
+        Returns:
+            Dictionary with mode, wall_ms, and cpu_stats (pstats text) and/or
+            memory (peak_mib and top allocation sites)
+        """
+        self.wall_seconds = time.perf_counter() - self._start
+        report: Dict[str, Any] = {
+            "mode": self.mode,
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+        }
+
+        if self.profiler is not None:
+            import pstats
+
+            self.profiler.disable()
+            out = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            report["cpu_stats"] = out.getvalue()
+
+        if self.mode in ("memory", "both"):
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+            report["memory"] = {
+                "peak_mib": round(peak / 2**20, 3),
+                "top_allocations": [
+                    str(stat) for stat in snapshot.statistics("lineno")[: self.top_n]
+                ],
+            }
+
+        return report
+
+
+def format_profile_report(report: Dict[str, Any]) -> str:
+    """Render a profile report as text for the log or a report file."""
+    lines = [
+        f"Profile for source_id={report.get('source_id') or 'unknown'} "
+        f"({report['mode']}, {report['wall_ms']:.1f} ms)"
+    ]
+    if "cpu_stats" in report:
+        lines += ["", "Hot functions (by cumulative time):", report["cpu_stats"]]
+    if "memory" in report:
+        memory = report["memory"]
+        lines += ["", f"Peak traced memory: {memory['peak_mib']:.3f} MiB"]
+        lines += ["Top allocation sites:"] + memory["top_allocations"]
+    return "\n".join(lines)
+
+
+def write_profile_report(
+    report: Dict[str, Any],
+    output: Optional[str] = None,
+    s3_client: Optional[Any] = None,
+) -> Optional[str]:
+    """
+    Send a profile report to its destination.
+
+    Args:
+        report: Report from ProfileSession.stop() with source_id added
+        output: log, file (under PROFILE_DIR) or s3 (under PROFILE_PREFIX)
+            (default: PROFILE_OUTPUT)
+        s3_client: boto3 S3 client (default: created on demand)
+
+    Returns:
+        Path or s3:// URI of the report, or None when logged
+    """
+    output = output or PROFILE_OUTPUT
+    text = format_profile_report(report)
+    if output == "log":
+        print(text)
+        return None
+
+    tag = _SAFE_TAG.sub("_", str(report.get("source_id") or "unknown"))
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{tag}-{report['mode']}.txt"
+
+    if output == "file":
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    if output == "s3":
+        if s3_client is None:
+            import boto3
+
+            s3_client = boto3.client("s3")
+        key = PROFILE_PREFIX + name
+        s3_client.put_object(Bucket=PROFILE_BUCKET, Key=key, Body=text.encode("utf-8"))
+        return f"s3://{PROFILE_BUCKET}/{key}"
+
+    raise ValueError(f"Unknown PROFILE_OUTPUT: {output}")
+
+
+@contextmanager
+def profiled(mode: str) -> Iterator[Dict[str, Any]]:
+    """
+    Profile the block; the caller fills in report["source_id"] before it ends.
+
+    The report is written when the block exits. Writing never raises, so a
+    profiling problem can't fail the invocation.
+
+    Args:
+        mode: One of PROFILE_MODES
+
+    Yields:
+        Report dictionary (source_id may be set inside the block)
+    """
+    session = ProfileSession(mode)
+    report: Dict[str, Any] = {"source_id": None}
+    session.start()
+    try:
+        yield report
+    finally:
+        try:
+            report.update(session.stop())
+            location = write_profile_report(report)
+            if location:
+                print(f"Profile written to {location}")
+        except Exception as e:
+            print(f"Profiling report failed: {e}")
@@ -0,0 +1,233 @@
+"""
+Rate Limiter Module
+
+Client-side adaptive rate limiting and retry backoff for Gemini calls. One limiter
+is shared by every thread in the process, so concurrent batch work slows down
+together when Gemini pushes back instead of every worker failing on its own.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Initial, minimum and maximum request rate (requests per second)
+RATE_LIMIT_QPS = float(os.environ.get("GEMINI_RATE_LIMIT_QPS", "5"))
+RATE_LIMIT_MIN_QPS = float(os.environ.get("GEMINI_RATE_LIMIT_MIN_QPS", "0.2"))
+RATE_LIMIT_MAX_QPS = float(os.environ.get("GEMINI_RATE_LIMIT_MAX_QPS", "20"))
+
+# Maximum burst of requests allowed at once
+RATE_LIMIT_BURST = float(os.environ.get("GEMINI_RATE_LIMIT_BURST", "5"))
+
+# Exponential backoff between retries (seconds)
+BACKOFF_BASE_SECONDS = float(os.environ.get("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.environ.get("GEMINI_BACKOFF_MAX_SECONDS", "30"))
+
+_RETRY_IN_PATTERN = re.compile(r"retry in ([0-9.]+)\s*s", re.IGNORECASE)
+_RETRY_DELAY_PATTERN = re.compile(
+    r"retry_delay\s*\{\s*seconds:\s*(\d+)(?:\s*nanos:\s*(\d+))?", re.IGNORECASE
+)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts with AIMD.
+
+    Each success raises the rate additively; each throttle halves it (down to
+    min_rate). A server retry hint pauses every caller until it has passed.
+
+    Args:
+        rate: Initial refill rate (tokens per second)
+        burst: Bucket capacity
+        min_rate: Lower bound for the rate
+        max_rate: Upper bound for the rate
+        increase: Additive increase per success (tokens per second)
+        decrease_factor: Multiplicative decrease on throttle
+        clock: Monotonic time source (seconds)
+        sleep: Sleep function
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_QPS,
+        burst: float = RATE_LIMIT_BURST,
+        min_rate: float = RATE_LIMIT_MIN_QPS,
+        max_rate: float = RATE_LIMIT_MAX_QPS,
+        increase: float = 0.1,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {"acquired": 0, "waited_seconds": 0.0, "throttles": 0}
+        self._tokens = burst
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a request may be sent.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True once a token was taken, False if timeout expired first
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats["acquired"] += 1
+                    self.stats["waited_seconds"] += waited
+                    return True
+                wait = max(
+                    self._paused_until - now,
+                    (1 - self._tokens) / self.rate,
+                )
+
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            self.sleep(wait)
+            waited += wait
+
+    def on_success(self) -> None:
+        """Additive increase after a successful call."""
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicative decrease after a rate limit error.
+
+        Args:
+            retry_after: Server retry hint in seconds; pauses all callers
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0)
+            self.stats["throttles"] += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    base: float = BACKOFF_BASE_SECONDS,
+    cap: float = BACKOFF_MAX_SECONDS,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """
+    Seconds to wait before retry number attempt + 1.
+
+    Uses exponential backoff with full jitter. A server retry hint is honoured
+    as a floor, with jitter added on top so waiting callers don't retry in step.
+
+    Args:
+        attempt: 0-based number of the attempt that just failed
+        retry_after: Server retry hint in seconds, if any
+        base: Backoff for the first retry
+        cap: Maximum backoff before the hint is applied
+        rng: Random source in [0, 1)
+
+    Returns:
+        Delay in seconds
+    """
+    if retry_after:
+        return retry_after + rng() * base
+    return rng() * min(cap, base * (2**attempt))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extract a server retry hint from a Google API error.
+
+    Looks at RetryInfo details, a Retry-After response header and the
+    "retry in Ns" wording used by Gemini quota errors.
+
+    Args:
+        error: Exception raised by the Gemini SDK
+
+    Returns:
+        Hinted delay in seconds, or None if the error carries no hint
+    """
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            if hasattr(retry_delay, "total_seconds"):
+                # proto-plus exposes Duration as datetime.timedelta
+                seconds = retry_delay.total_seconds()
+            else:
+                seconds = getattr(retry_delay, "seconds", 0) + (
+                    getattr(retry_delay, "nanos", 0) / 1e9
+                )
+            if seconds > 0:
+                return seconds
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    message = str(error)
+    match = _RETRY_DELAY_PATTERN.search(message)
+    if match:
+        return int(match.group(1)) + int(match.group(2) or 0) / 1e9
+    match = _RETRY_IN_PATTERN.search(message)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+_rate_limiter: Optional[AdaptiveRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process-wide Gemini rate limiter, creating it on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = AdaptiveRateLimiter()
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: Any) -> None:
+    """Replace the process-wide rate limiter (e.g. with different limits)."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
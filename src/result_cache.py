@@ -0,0 +1,368 @@
+"""
+Result Cache Module
+
+Content-addressed cache for Gemini journal outputs with pluggable backends
+(in-process LRU, local SQLite file, DynamoDB table) and single-flight sharing
+of identical in-flight requests.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from src.deadline import DeadlineExceededError, remaining_seconds
+
+# Cache configuration (overridable via environment)
+DEFAULT_CACHE_BACKEND = "memory"
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_SQLITE_PATH = "/tmp/rijg_gemini_cache.sqlite3"
+DEFAULT_TABLE_NAME = "RIJG-GeminiCache"
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a content-addressed cache key from JSON-serializable parts.
+
+    Args:
+        parts: Values that fully determine the result (text, model, config, ...)
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding of the parts
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with optional TTL. Survives warm Lambda invocations.
+
+    Values are copied in and out, so callers never share the cached object.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: dict) -> None:
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Local disk cache in a SQLite file with TTL and least-recently-used eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SQLITE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_cache (
+                cache_key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_gemini_cache_accessed "
+            "ON gemini_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM gemini_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute(
+                    "DELETE FROM gemini_cache WHERE cache_key = ?", (key,)
+                )
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE gemini_cache SET accessed_at = ? WHERE cache_key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: dict) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gemini_cache "
+                "(cache_key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._conn.execute(
+                "DELETE FROM gemini_cache WHERE expires_at IS NOT NULL "
+                "AND expires_at <= ?",
+                (now,),
+            )
+            self._conn.execute(
+                "DELETE FROM gemini_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM gemini_cache ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM gemini_cache").fetchone()[0]
+
+
+class DynamoDBCacheBackend:
+    """
+    Shared cache in a DynamoDB table keyed by cache_key.
+
+    Expiry relies on the table's TTL attribute (expires_at); since DynamoDB deletes
+    expired items lazily, reads also check expires_at. Size is bounded by TTL only.
+    """
+
+    def __init__(
+        self,
+        table_name: str = DEFAULT_TABLE_NAME,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        dynamodb_resource: Any = None,
+    ):
+        if dynamodb_resource is None:
+            import boto3
+
+            dynamodb_resource = boto3.resource("dynamodb")
+        self.table = dynamodb_resource.Table(table_name)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[dict]:
+        response = self.table.get_item(Key={"cache_key": key})
+        item = response.get("Item")
+        if not item:
+            return None
+        expires_at = item.get("expires_at")
+        if expires_at is not None and int(expires_at) <= time.time():
+            return None
+        return json.loads(item["value"])
+
+    def set(self, key: str, value: dict) -> None:
+        item = {"cache_key": key, "value": json.dumps(value)}
+        if self.ttl_seconds:
+            item["expires_at"] = int(time.time() + self.ttl_seconds)
+        self.table.put_item(Item=item)
+
+
+class ResultCache:
+    """
+    Cache front-end that shares one computation between identical in-flight calls.
+
+    Backend failures are logged and treated as misses so the cache can never
+    fail a request.
+    """
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "errors": 0}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key: Cache key (see make_cache_key)
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            The cached or freshly computed value
+
+        Raises:
+            DeadlineExceededError: If the request deadline passes while waiting
+                for an identical call in flight
+        """
+        cached = self._backend_get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not leader:
+            self._count("shared")
+            remaining = remaining_seconds()
+            try:
+                value = future.result(
+                    timeout=None if remaining is None else max(remaining, 0)
+                )
+            except FutureTimeoutError:
+                raise DeadlineExceededError(
+                    "Request deadline exceeded waiting for an identical request"
+                )
+            return copy.deepcopy(value)
+
+        self._count("misses")
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._backend_set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached value for key, or None (without computing anything)."""
+        cached = self._backend_get(key)
+        self._count("hits" if cached is not None else "misses")
+        return cached
+
+    def set(self, key: str, value: dict) -> None:
+        """Store a value computed outside get_or_compute (e.g. a streamed entry)."""
+        self._backend_set(key, value)
+
+    def _backend_get(self, key: str) -> Optional[dict]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"Cache read failed ({type(self.backend).__name__}): {e}")
+            self._count("errors")
+            return None
+
+    def _backend_set(self, key: str, value: dict) -> None:
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            print(f"Cache write failed ({type(self.backend).__name__}): {e}")
+            self._count("errors")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_configured = False
+_result_cache_lock = threading.Lock()
+
+
+def create_cache_backend(backend_name: Optional[str] = None) -> Any:
+    """
+    Create a cache backend from environment configuration.
+
+    Environment:
+        GEMINI_CACHE_BACKEND: memory (default), sqlite, dynamodb or none
+        GEMINI_CACHE_TTL_SECONDS: Entry lifetime (0 disables expiry)
+        GEMINI_CACHE_MAX_ENTRIES: Size bound for memory and sqlite backends
+        GEMINI_CACHE_PATH: SQLite file path
+        GEMINI_CACHE_TABLE_NAME: DynamoDB table name
+
+    Returns:
+        Backend instance, or None if caching is disabled
+    """
+    backend_name = (
+        backend_name or os.environ.get("GEMINI_CACHE_BACKEND", DEFAULT_CACHE_BACKEND)
+    ).lower()
+    ttl_seconds = (
+        float(os.environ.get("GEMINI_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)) or None
+    )
+    max_entries = int(os.environ.get("GEMINI_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+
+    if backend_name == "none":
+        return None
+    if backend_name == "memory":
+        return MemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend_name == "sqlite":
+        return SQLiteCacheBackend(
+            path=os.environ.get("GEMINI_CACHE_PATH", DEFAULT_SQLITE_PATH),
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+        )
+    if backend_name == "dynamodb":
+        return DynamoDBCacheBackend(
+            table_name=os.environ.get("GEMINI_CACHE_TABLE_NAME", DEFAULT_TABLE_NAME),
+            ttl_seconds=ttl_seconds,
+        )
+    raise ValueError(f"Unknown GEMINI_CACHE_BACKEND: {backend_name}")
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Return the process-wide result cache, creating it on first use.
+
+    Returns:
+        ResultCache instance, or None if caching is disabled
+    """
+    global _result_cache, _result_cache_configured
+    if not _result_cache_configured:
+        with _result_cache_lock:
+            if not _result_cache_configured:
+                backend = create_cache_backend()
+                _result_cache = ResultCache(backend) if backend is not None else None
+                _result_cache_configured = True
+    return _result_cache
+
+
+def set_result_cache(cache: Optional[ResultCache]) -> None:
+    """Replace the process-wide result cache (None disables caching)."""
+    global _result_cache, _result_cache_configured
+    with _result_cache_lock:
+        _result_cache = cache
+        _result_cache_configured = True
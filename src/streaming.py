@@ -0,0 +1,435 @@
+"""
+Streaming Module
+
+Streams journal entries: consumes the Gemini response incrementally, parses the
+JSON fields as they arrive, and renders the Obsidian markdown head (front-matter
+and title), body and tail as soon as each part is known.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.deadline import DeadlineExceededError, check_deadline
+from src.gemini_processor import (
+    DEFAULT_MODELS,
+    GENERATION_CONFIG,
+    PROMPT_TEMPLATE,
+    SYSTEM_INSTRUCTION,
+    generate_with_retries,
+    get_api_key,
+    is_availability_error,
+    get_model,
+    parse_journal_response,
+    record_token_usage,
+)
+from src.metrics import record_value
+from src.model_health import get_circuit_breaker
+from src.result_cache import get_result_cache, make_cache_key
+from src.template_engine import render_journal_entry_parts
+
+# Field streamed piece by piece; the others are only used once complete
+STREAM_FIELD = "rewritten_entry_body"
+
+# Fields the markdown head needs before it can be sent
+HEAD_FIELDS = ("title", "topic", "tags")
+
+# The SDK can't pin property order in a response schema (Gemini orders schema
+# properties alphabetically, which would put the body first), so streaming
+# requests ask for JSON in the prompt and validate the fields afterwards.
+STREAM_GENERATION_CONFIG = {
+    key: value for key, value in GENERATION_CONFIG.items() if key != "response_schema"
+}
+
+STREAM_PROMPT_TEMPLATE = PROMPT_TEMPLATE + """
+Respond with a single JSON object with exactly these keys, in this order:
+"title" (string), "topic" (string), "tags" (array of strings),
+"rewritten_entry_body" (string, markdown).
+"""
+
+_decoder = json.JSONDecoder(strict=False)
+_WHITESPACE = " \t\n\r"
+
+
+class JournalStreamParser:
+    """
+    Incremental parser for a flat JSON object arriving in arbitrary chunks.
+
+    feed() returns events as soon as they are known:
+        ("delta", name, text)  - decoded text appended to a streamed string field
+        ("field", name, value) - a field's complete value
+
+    Args:
+        stream_fields: String fields to emit deltas for
+    """
+
+    def __init__(self, stream_fields: Sequence[str] = (STREAM_FIELD,)):
+        self.stream_fields = set(stream_fields)
+        self.values: Dict[str, Any] = {}
+        self._state = "start"
+        self._key = ""
+        self._raw: List[str] = []
+        self._escape = False
+        self._in_string = False
+        self._depth = 0
+        self._streamed: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        """
+        Consume the next chunk of JSON text.
+
+        Returns:
+            Events completed by this chunk
+
+        Raises:
+            ValueError: If the text is not a JSON object
+        """
+        events: List[Tuple[str, str, Any]] = []
+        for char in chunk:
+            self._step(char, events)
+        if self._state == "stream_string":
+            self._flush_delta(events)
+        return events
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Return all parsed fields once the object is complete.
+
+        Raises:
+            ValueError: If the object ended early
+        """
+        if not self.done:
+            raise ValueError("Incomplete JSON object in streamed response")
+        return self.values
+
+    def _step(self, char: str, events: List[Tuple[str, str, Any]]) -> None:
+        state = self._state
+
+        if state == "start":
+            if char == "{":
+                self._state = "key_or_end"
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected '{{' at start of response, found {char!r}")
+
+        elif state == "key_or_end":
+            if char == '"':
+                self._state = "key"
+                self._raw = []
+            elif char == "}":
+                self._state = "done"
+            elif char not in _WHITESPACE + ",":
+                raise ValueError(f"Expected a key in response, found {char!r}")
+
+        elif state == "key":
+            if self._escape:
+                self._escape = False
+                self._raw.append(char)
+            elif char == "\\":
+                self._escape = True
+                self._raw.append(char)
+            elif char == '"':
+                self._key = _decoder.decode('"' + "".join(self._raw) + '"')
+                self._state = "colon"
+            else:
+                self._raw.append(char)
+
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected ':' in response, found {char!r}")
+
+        elif state == "value":
+            if char in _WHITESPACE:
+                return
+            self._raw = []
+            if char == '"' and self._key in self.stream_fields:
+                self._state = "stream_string"
+                self._streamed = []
+                return
+            self._state = "other"
+            self._raw.append(char)
+            self._in_string = char == '"'
+            self._depth = 1 if char in "[{" else 0
+
+        elif state == "stream_string":
+            if self._escape:
+                self._escape = False
+                self._raw.append(char)
+            elif char == "\\":
+                self._escape = True
+                self._raw.append(char)
+            elif char == '"':
+                self._flush_delta(events, final=True)
+                value = "".join(self._streamed)
+                self.values[self._key] = value
+                events.append(("field", self._key, value))
+                self._state = "after_value"
+            else:
+                self._raw.append(char)
+
+        elif state == "other":
+            self._step_other(char, events)
+
+        elif state == "after_value":
+            if char == ",":
+                self._state = "key_or_end"
+            elif char == "}":
+                self._state = "done"
+            elif char not in _WHITESPACE:
+                raise ValueError(f"Expected ',' or '}}' in response, found {char!r}")
+
+    def _step_other(self, char: str, events: List[Tuple[str, str, Any]]) -> None:
+        """Collect a non-streamed value (string, array, object or scalar)."""
+        if self._in_string:
+            self._raw.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._finish_other(events)
+            return
+
+        if self._depth == 0 and self._raw[0] != '"' and char in ",}" + _WHITESPACE:
+            # End of a bare scalar (number, true, false, null)
+            self._finish_other(events)
+            self._step(char, events)
+            return
+
+        self._raw.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish_other(events)
+
+    def _finish_other(self, events: List[Tuple[str, str, Any]]) -> None:
+        try:
+            value = _decoder.decode("".join(self._raw))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid value for {self._key!r} in response: {e}")
+        self.values[self._key] = value
+        events.append(("field", self._key, value))
+        self._state = "after_value"
+
+    def _flush_delta(
+        self, events: List[Tuple[str, str, Any]], final: bool = False
+    ) -> None:
+        """Decode the buffered raw string text, holding back incomplete escapes."""
+        raw = "".join(self._raw)
+        keep = 0 if final else _incomplete_escape_length(raw, self._escape)
+        ready, held = (raw[:-keep], raw[-keep:]) if keep else (raw, "")
+        self._raw = [held] if held else []
+        if ready:
+            text = _decoder.decode('"' + ready + '"')
+            self._streamed.append(text)
+            events.append(("delta", self._key, text))
+
+
+def _incomplete_escape_length(raw: str, pending_backslash: bool) -> int:
+    """
+    Length of the trailing raw text that can't be decoded yet.
+
+    That is a lone backslash, a partial \\uXXXX escape, or a complete high
+    surrogate escape whose low surrogate hasn't arrived.
+    """
+    keep = 1 if pending_backslash else 0
+    if not keep:
+        index = raw.rfind("\\u", max(0, len(raw) - 5))
+        if index != -1 and _is_escape_start(raw, index):
+            keep = len(raw) - index
+
+    ready = raw[: len(raw) - keep]
+    head = ready[-6:]
+    if (
+        len(head) == 6
+        and head[:2] == "\\u"
+        and head[2] in "dD"
+        and head[3] in "89abAB"
+        and _is_escape_start(ready, len(ready) - 6)
+    ):
+        keep += 6
+    return keep
+
+
+def _is_escape_start(raw: str, index: int) -> bool:
+    """True if the backslash at raw[index] starts an escape (isn't itself escaped)."""
+    count = 0
+    while index >= 0 and raw[index] == "\\":
+        count += 1
+        index -= 1
+    return count % 2 == 1
+
+
+def stream_journal_entry(
+    text: str, models: Optional[Sequence[str]] = None
+) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Generate a journal entry with a streamed Gemini response.
+
+    Models are tried in order until one starts producing output; once output
+    has been emitted, errors propagate. Results are cached like the
+    non-streamed path, keyed by the model that produced them, and a cache hit
+    is emitted immediately.
+
+    Args:
+        text: Conversation text
+        models: Model chain (default: DEFAULT_MODELS)
+
+    Yields:
+        Parser events ("delta", name, text) and ("field", name, value), then
+        ("entry", "", result) with the validated journal entry
+
+    Raises:
+        DeadlineExceededError: If the request deadline passes
+        Exception: If every model failed before producing output
+    """
+    models = list(models or DEFAULT_MODELS)
+    cache = get_result_cache()
+    api_key: Optional[str] = None
+    prompt = STREAM_PROMPT_TEMPLATE.format(text=text)
+    last_error: Optional[Exception] = None
+
+    for model_name in models:
+        # Cached under the model that answered, so a fallback's entry is
+        # never served as the primary model's
+        cache_key = make_cache_key(
+            text,
+            model_name,
+            SYSTEM_INSTRUCTION,
+            STREAM_GENERATION_CONFIG,
+            STREAM_PROMPT_TEMPLATE,
+        )
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached is not None:
+            for name in HEAD_FIELDS + (STREAM_FIELD,):
+                yield ("field", name, cached[name])
+            yield ("entry", "", cached)
+            return
+
+        if api_key is None:
+            api_key = get_api_key()
+        check_deadline(f"streaming with {model_name}")
+        breaker = get_circuit_breaker(model_name)
+        if not breaker.allow_request():
+            print(f"Model ({model_name}) circuit open, skipping stream")
+            continue
+
+        parser = JournalStreamParser()
+        started = False
+        start = time.perf_counter()
+        try:
+            model = get_model(
+                model_name, api_key, STREAM_GENERATION_CONFIG, SYSTEM_INSTRUCTION
+            )
+            response = generate_with_retries(model, prompt, stream=True)
+            for chunk in response:
+                events = parser.feed(_chunk_text(chunk))
+                if events:
+                    if not started:
+                        elapsed_ms = (time.perf_counter() - start) * 1000
+                        record_value("gemini_first_output_ms", elapsed_ms)
+                    started = True
+                    yield from events
+            record_token_usage(response)
+            result = parse_journal_response(json.dumps(parser.close()))
+        except DeadlineExceededError:
+            breaker.release()
+            raise
+        except GeneratorExit:
+            # The client went away mid-stream
+            breaker.release()
+            raise
+        except Exception as e:
+            if is_availability_error(e):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            if started:
+                raise Exception(f"Gemini API error: stream interrupted: {e}")
+            print(f"Streaming with {model_name} failed before output: {e}")
+            last_error = e
+            continue
+
+        breaker.record_success()
+        if cache is not None:
+            cache.set(cache_key, result)
+        yield ("entry", "", result)
+        return
+
+    if last_error is None:
+        raise Exception("Both models failed. All model circuits are open")
+    raise Exception(f"Both models failed. Last error: {last_error}")
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed chunk; chunks without parts (e.g. the final one) are empty."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class JournalStreamRenderer:
+    """
+    Turns parser events into markdown chunks.
+
+    The head is sent once title, topic and tags are known; body text is sent as
+    it arrives (buffered until the head is out); the tail closes the entry.
+
+    Args:
+        parsed_data: Output of parse_conversation (date, time, source_id, transcript)
+    """
+
+    def __init__(self, parsed_data: Dict[str, Any]):
+        self.data = dict(parsed_data)
+        self._tail: Optional[str] = None
+        self._pending_body: List[str] = []
+        self._body_streamed = False
+
+    def feed(self, event: Tuple[str, str, Any]) -> Iterator[str]:
+        kind, name, value = event
+
+        if kind == "field" and name in HEAD_FIELDS:
+            self.data[name] = value
+            if self._tail is None and all(f in self.data for f in HEAD_FIELDS):
+                head, self._tail = render_journal_entry_parts(self.data)
+                yield head
+                if self._pending_body:
+                    yield "".join(self._pending_body)
+                    self._pending_body = []
+
+        elif kind == "delta" and name == STREAM_FIELD:
+            self._body_streamed = True
+            if self._tail is None:
+                self._pending_body.append(value)
+            else:
+                yield value
+
+        elif kind == "field" and name == STREAM_FIELD:
+            if self._tail is None:
+                self._pending_body = [value]
+            elif not self._body_streamed:
+                # Body completed without deltas after the head (a cached entry)
+                yield value
+            self._body_streamed = True
+
+        elif kind == "entry":
+            if self._tail is None:
+                self.data.update(value)
+                head, self._tail = render_journal_entry_parts(self.data)
+                yield head + value[STREAM_FIELD]
+            elif self._pending_body:
+                yield "".join(self._pending_body)
+                self._pending_body = []
+            yield self._tail
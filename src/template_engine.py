@@ -5,8 +5,57 @@ Loads and renders Jinja2 templates for Obsidian journal entries.
 """
 
 import os
-from typing import Dict, Any
-from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+TEMPLATE_NAME = "obsidian_journal.md"
+
+# Placeholder for the entry body when rendering the parts around it
+BODY_SENTINEL = "\x00RIJG_ENTRY_BODY\x00"
+
+# Compiled template, built on first use and reused across warm invocations
+_template: Optional[Any] = None
+_template_lock = threading.Lock()
+
+
+def get_template() -> Any:
+    """
+    Load and compile the journal template once per container.
+
+    jinja2 is imported here rather than at module import to keep cold starts fast.
+
+    Returns:
+        Compiled jinja2 Template
+
+    Raises:
+        TemplateNotFound: If the template file cannot be found
+    """
+    global _template
+    if _template is not None:
+        return _template
+
+    from jinja2 import Environment, FileSystemLoader
+
+    with _template_lock:
+        if _template is None:
+            # Get the directory containing this module
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+
+            # Templates directory is adjacent to src/
+            templates_dir = os.path.join(os.path.dirname(current_dir), "templates")
+
+            # Create Jinja2 environment with FileSystemLoader
+            env = Environment(
+                loader=FileSystemLoader(templates_dir),
+                trim_blocks=True,
+                lstrip_blocks=True,
+                keep_trailing_newline=True,
+            )
+
+            # Load the template
+            _template = env.get_template(TEMPLATE_NAME)
+
+    return _template
 
 
 def render_journal_entry(data: dict) -> str:
@@ -31,23 +80,10 @@ def render_journal_entry(data: dict) -> str:
         TemplateNotFound: If the template file cannot be found
         Exception: For other template rendering errors
     """
-    try:
-        # Get the directory containing this module
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Templates directory is adjacent to src/
-        templates_dir = os.path.join(os.path.dirname(current_dir), "templates")
-
-        # Create Jinja2 environment with FileSystemLoader
-        env = Environment(
-            loader=FileSystemLoader(templates_dir),
-            trim_blocks=True,
-            lstrip_blocks=True,
-            keep_trailing_newline=True,
-        )
+    from jinja2 import TemplateNotFound
 
-        # Load the template
-        template = env.get_template("obsidian_journal.md")
+    try:
+        template = get_template()
 
         # Render with provided data
         rendered = template.render(**data)
@@ -109,3 +145,29 @@ def render_journal_entry_safe(data: dict) -> str:
     """
     validate_template_data(data)
     return render_journal_entry(data)
+
+
+def render_journal_entry_parts(data: dict) -> Tuple[str, str]:
+    """
+    Render the markdown before and after the entry body, for streaming.
+
+    The template is rendered once with a sentinel in place of
+    rewritten_entry_body and split there, so head + body + tail equals the
+    full render_journal_entry output.
+
+    Args:
+        data: Template data dictionary (rewritten_entry_body is ignored)
+
+    Returns:
+        Tuple of (head, tail)
+
+    Raises:
+        ValueError: If data validation fails
+        Exception: For rendering errors
+    """
+    data = {**data, "rewritten_entry_body": BODY_SENTINEL}
+    validate_template_data(data)
+    head, sentinel, tail = render_journal_entry(data).partition(BODY_SENTINEL)
+    if not sentinel:
+        raise Exception("Error rendering template: entry body placeholder not found")
+    return head, tail
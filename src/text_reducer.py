@@ -0,0 +1,236 @@
+"""
+Text Reducer Module
+
+Shrinks the conversation text sent to Gemini before the API call: drops non-text
+message parts, collapses repeated blocks, elides long code/log blocks to their
+head and tail, and caps each message. The transcript is never reduced.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.conversation_parser import RAW_TEXT_LABELS, Message
+from src.token_estimator import CHARS_PER_TOKEN, estimate_tokens
+
+# Stages in the order they run
+STAGES = ("drop_non_text", "dedupe_blocks", "elide_blocks", "message_cap")
+
+# Reduction configuration (overridable via environment or the config argument)
+DEFAULT_REDUCER_CONFIG = {
+    # Set TEXT_REDUCER_ENABLED=false to send raw_text unchanged
+    "enabled": os.environ.get("TEXT_REDUCER_ENABLED", "true").lower() == "true",
+    # Comma-separated subset of STAGES to run
+    "stages": [
+        stage.strip()
+        for stage in os.environ.get("TEXT_REDUCER_STAGES", ",".join(STAGES)).split(",")
+        if stage.strip()
+    ],
+    # Blocks shorter than this are never treated as duplicates
+    "min_duplicate_chars": int(
+        os.environ.get("TEXT_REDUCER_MIN_DUPLICATE_CHARS", "200")
+    ),
+    # Code/log blocks longer than this many lines are elided
+    "max_block_lines": int(os.environ.get("TEXT_REDUCER_MAX_BLOCK_LINES", "40")),
+    # Lines kept from the start and end of an elided block
+    "head_lines": int(os.environ.get("TEXT_REDUCER_HEAD_LINES", "15")),
+    "tail_lines": int(os.environ.get("TEXT_REDUCER_TAIL_LINES", "10")),
+    # Maximum characters kept per message (0 disables the cap)
+    "max_message_chars": int(os.environ.get("TEXT_REDUCER_MAX_MESSAGE_CHARS", "20000")),
+}
+
+DUPLICATE_MARKER = "[Repeated block omitted]"
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# Lines that look like pasted logs or stack traces
+_LOG_LINE = re.compile(
+    r"^\s*(\d{4}-\d{2}-\d{2}|\[?\d{2}:\d{2}:\d{2}|at |File \"|Traceback|"
+    r"(DEBUG|INFO|WARN|WARNING|ERROR|CRITICAL|TRACE)\b)"
+)
+
+
+def reduce_messages(
+    messages: List[Message], config: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the reduced prompt text for a conversation.
+
+    The output uses the same "User: " / "Assistant: " layout as raw_text, so the
+    chunked processor can still split it at message boundaries.
+
+    Args:
+        messages: Message records from parse_conversation_messages
+        config: Overrides for DEFAULT_REDUCER_CONFIG
+
+    Returns:
+        Tuple of (reduced text, report) where report holds original_tokens,
+        reduced_tokens and per-stage tokens_saved
+
+    Raises:
+        ValueError: If config names an unknown stage
+    """
+    config = {**DEFAULT_REDUCER_CONFIG, **(config or {})}
+    stages = config["stages"] if config["enabled"] else []
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown text reducer stage(s): {', '.join(unknown)}")
+
+    entries = [
+        (msg.author_role, msg.text)
+        for msg in messages
+        if msg.author_role in RAW_TEXT_LABELS
+    ]
+    original_tokens = _estimate(entries)
+    tokens_saved = {}
+
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        before = _estimate(entries)
+        if stage == "drop_non_text":
+            entries = [
+                (msg.author_role, msg.text_only)
+                for msg in messages
+                if msg.author_role in RAW_TEXT_LABELS and msg.text_only
+            ]
+        elif stage == "dedupe_blocks":
+            entries = _dedupe_blocks(entries, config["min_duplicate_chars"])
+        elif stage == "elide_blocks":
+            entries = [(role, _elide_blocks(text, config)) for role, text in entries]
+        elif stage == "message_cap" and config["max_message_chars"] > 0:
+            entries = [
+                (role, _cap_message(text, config["max_message_chars"]))
+                for role, text in entries
+            ]
+        tokens_saved[stage] = before - _estimate(entries)
+
+    text = "\n\n".join(RAW_TEXT_LABELS[role] + text for role, text in entries)
+    report = {
+        "original_tokens": original_tokens,
+        "reduced_tokens": estimate_tokens(text),
+        "tokens_saved": tokens_saved,
+    }
+    return text, report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Return a one-line summary of a reduce_messages report for logging."""
+    stages = ", ".join(
+        f"{stage} -{saved}" for stage, saved in report["tokens_saved"].items()
+    )
+    return f"~{report['original_tokens']} -> ~{report['reduced_tokens']} tokens" + (
+        f" ({stages})" if stages else ""
+    )
+
+
+def _estimate(entries: List[Tuple[str, str]]) -> int:
+    """Estimate tokens of the rendered entries without building the string."""
+    chars = sum(len(RAW_TEXT_LABELS[role]) + len(text) for role, text in entries)
+    chars += 2 * max(0, len(entries) - 1)
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_blocks(text: str) -> List[str]:
+    """Split message text into paragraphs, keeping fenced code blocks whole."""
+    blocks = []
+    current: List[str] = []
+    in_fence = False
+
+    for line in text.split("\n"):
+        if _FENCE.match(line):
+            if not in_fence and current:
+                blocks.append("\n".join(current))
+                current = []
+            current.append(line)
+            in_fence = not in_fence
+            if not in_fence:
+                blocks.append("\n".join(current))
+                current = []
+        elif not in_fence and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+        else:
+            current.append(line)
+
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _dedupe_blocks(
+    entries: List[Tuple[str, str]], min_chars: int
+) -> List[Tuple[str, str]]:
+    """Replace blocks already seen earlier in the conversation with a marker."""
+    seen = set()
+    result = []
+
+    for role, text in entries:
+        if len(text) < min_chars:
+            result.append((role, text))
+            continue
+        blocks = []
+        changed = False
+        for block in _split_blocks(text):
+            if len(block) >= min_chars:
+                key = " ".join(block.split())
+                if key in seen:
+                    blocks.append(DUPLICATE_MARKER)
+                    changed = True
+                    continue
+                seen.add(key)
+            blocks.append(block)
+        result.append((role, "\n\n".join(blocks) if changed else text))
+
+    return result
+
+
+def _elide_blocks(text: str, config: Dict[str, Any]) -> str:
+    """Shorten fenced code blocks and log-like paragraphs to their head and tail."""
+    max_lines = config["max_block_lines"]
+    if text.count("\n") < max_lines:
+        return text
+
+    blocks = []
+    changed = False
+    for block in _split_blocks(text):
+        lines = block.split("\n")
+        if len(lines) > max_lines and (_FENCE.match(lines[0]) or _is_log(lines)):
+            blocks.append(
+                _elide_lines(lines, config["head_lines"], config["tail_lines"])
+            )
+            changed = True
+        else:
+            blocks.append(block)
+    return "\n\n".join(blocks) if changed else text
+
+
+def _is_log(lines: List[str]) -> bool:
+    """True if most lines look like log output or a stack trace."""
+    matches = sum(1 for line in lines if _LOG_LINE.match(line))
+    return matches * 2 >= len(lines)
+
+
+def _elide_lines(lines: List[str], head: int, tail: int) -> str:
+    """Keep head and tail lines (and closing fence) around an omission marker."""
+    closing = []
+    if _FENCE.match(lines[0]) and len(lines) > 1 and _FENCE.match(lines[-1]):
+        closing = [lines[-1]]
+        lines = lines[:-1]
+    omitted = len(lines) - head - tail
+    if omitted <= 0:
+        return "\n".join(lines + closing)
+    kept = lines[:head] + [f"... [{omitted} lines omitted] ..."]
+    if tail:
+        kept += lines[-tail:]
+    return "\n".join(kept + closing)
+
+
+def _cap_message(text: str, max_chars: int) -> str:
+    """Truncate a message to max_chars, keeping its start and end."""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n[... {omitted} characters omitted ...]\n{text[-tail:]}"
@@ -0,0 +1,34 @@
+"""
+Token Estimator Module
+
+Cheap local token estimates for sizing Gemini prompts without an API call.
+"""
+
+# Average characters per token for English prose and code in Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count (rounded up)
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokens_to_chars(tokens: int) -> int:
+    """
+    Convert a token budget into an approximate character budget.
+
+    Args:
+        tokens: Token budget
+
+    Returns:
+        Equivalent number of characters
+    """
+    return tokens * CHARS_PER_TOKEN
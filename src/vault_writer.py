@@ -0,0 +1,328 @@
+"""
+Vault Writer Module
+
+Writes rendered journal entries straight into an Obsidian vault and keeps its
+tag and daily index pages (MOCs) up to date. Entries are filed by date, every
+file is written atomically, and a persistent SQLite index maps tags and dates to
+entries, so adding entries only regenerates the pages for the tags and dates
+they touch instead of rescanning the vault. Generated pages live in their own
+folder (VAULT_PAGES_DIR), so the vault's own daily notes and tag notes are
+never overwritten or deleted.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Vault layout (relative to the vault root, overridable via environment)
+VAULT_ENTRIES_DIR = os.environ.get("VAULT_ENTRIES_DIR", "Journal")
+
+# Generated index pages; everything under this folder is owned by the writer
+VAULT_PAGES_DIR = os.environ.get("VAULT_PAGES_DIR", "RIJG")
+VAULT_DAILY_DIR = os.path.join(VAULT_PAGES_DIR, "Daily")
+VAULT_TAGS_DIR = os.path.join(VAULT_PAGES_DIR, "Tags")
+
+# Index database, relative to the vault root
+VAULT_INDEX_PATH = os.path.join(".rijg", "index.sqlite3")
+
+UNDATED = "undated"
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|#^\[\]\x00-\x1f]+')
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Write text to path so readers see either the old or the new file, never a
+    partial one (temporary file in the same directory, fsync, then rename).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def safe_name(text: str, max_length: int = 80) -> str:
+    """Turn a title or tag into a file name Obsidian can link to."""
+    name = _UNSAFE_NAME.sub("-", text).strip(" .-")
+    return name[:max_length].rstrip(" .-") or "untitled"
+
+
+def tag_page_name(tag: str) -> str:
+    """
+    File name (without .md) of a tag's page, unique per tag.
+
+    Tags that safe_name would change (e.g. "a/b", which would collide with
+    "a-b") or that have upper-case letters (which collide on case-insensitive
+    file systems) get a short hash of the tag appended.
+    """
+    name = safe_name(tag)
+    if name == tag and tag == tag.lower():
+        return name
+    digest = hashlib.blake2b(tag.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{name} ({digest})"
+
+
+def _entry_id(source_id: str) -> str:
+    """
+    The full source_id as used in entry file names, unique per source_id.
+
+    An id that safe_name would change gets a short hash of the id appended, as
+    in tag_page_name, so two ids can never share a file.
+    """
+    name = safe_name(source_id, max_length=max(len(source_id), 1))
+    if name == source_id:
+        return name
+    digest = hashlib.blake2b(source_id.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{name}-{digest}"
+
+
+class VaultWriter:
+    """
+    Files journal entries into a vault and maintains its tag and date pages.
+
+    Entries go to <entries_dir>/YYYY/MM/YYYY-MM-DD <title> (<id>).md, tag
+    pages to <pages_dir>/Tags and daily pages to <pages_dir>/Daily. Writing an
+    entry again with the same source_id replaces it (and removes the old file if
+    its title or date changed). Safe to use from several threads.
+
+    Args:
+        vault_dir: Vault root directory
+        index_path: SQLite index (default: <vault_dir>/.rijg/index.sqlite3)
+    """
+
+    def __init__(self, vault_dir: str, index_path: Optional[str] = None):
+        self.vault_dir = Path(vault_dir)
+        index_file = (
+            Path(index_path) if index_path else self.vault_dir / VAULT_INDEX_PATH
+        )
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(index_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                source_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                title TEXT,
+                date TEXT NOT NULL,
+                tags TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_by_date ON entries (date);
+            CREATE TABLE IF NOT EXISTS entry_tags (
+                tag TEXT NOT NULL,
+                source_id TEXT NOT NULL,
+                PRIMARY KEY (tag, source_id)
+            );
+            CREATE INDEX IF NOT EXISTS entry_tags_by_source ON entry_tags (source_id);
+            """)
+        self._conn.commit()
+
+    def entry_path(self, metadata: Dict[str, Any]) -> Path:
+        """Vault-relative path of the file for an entry."""
+        date = metadata.get("date") or UNDATED
+        folder = Path(VAULT_ENTRIES_DIR)
+        if re.match(r"^\d{4}-\d{2}-\d{2}$", date):
+            folder = folder / date[:4] / date[5:7]
+        else:
+            folder = folder / UNDATED
+        title = safe_name(metadata.get("title") or "Untitled")
+        entry_id = _entry_id(str(metadata["source_id"]))
+        return folder / f"{date} {title} ({entry_id}).md"
+
+    def write_entry(self, markdown: str, metadata: Dict[str, Any]) -> Path:
+        """Write one entry; see write_entries."""
+        return self.write_entries([(markdown, metadata)])[0]
+
+    def write_entries(
+        self, entries: Iterable[Tuple[str, Dict[str, Any]]]
+    ) -> List[Path]:
+        """
+        Write entries into the vault and refresh the pages they affect.
+
+        Args:
+            entries: (markdown, metadata) pairs; metadata needs source_id and
+                should have title, date and tags (as in run_pipeline's metadata)
+
+        Returns:
+            Absolute paths of the entry files, in input order
+        """
+        paths = []
+        with self._lock:
+            dirty_tags: Set[str] = set()
+            dirty_dates: Set[str] = set()
+            try:
+                for markdown, metadata in entries:
+                    paths.append(
+                        self._write_entry(markdown, metadata, dirty_tags, dirty_dates)
+                    )
+            finally:
+                # Entries written before a failure are kept and indexed
+                self._conn.commit()
+                self._refresh_pages(dirty_tags, dirty_dates)
+        return paths
+
+    def remove_entry(self, source_id: str) -> bool:
+        """Delete an entry's file and update its tag and date pages."""
+        with self._lock:
+            previous = self._get(source_id)
+            if previous is None:
+                return False
+            (self.vault_dir / previous["path"]).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM entries WHERE source_id = ?", (source_id,))
+            self._conn.execute(
+                "DELETE FROM entry_tags WHERE source_id = ?", (source_id,)
+            )
+            self._conn.commit()
+            self._refresh_pages(set(previous["tags"]), {previous["date"]})
+        return True
+
+    def entries_for_tag(self, tag: str) -> List[Dict[str, Any]]:
+        """Index rows for a tag, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.source_id, e.path, e.title, e.date FROM entries e "
+                "JOIN entry_tags t ON t.source_id = e.source_id "
+                "WHERE t.tag = ? ORDER BY e.date DESC, e.title",
+                (tag,),
+            )
+            return [_row(row) for row in rows]
+
+    def entries_for_date(self, date: str) -> List[Dict[str, Any]]:
+        """Index rows for a date, by title."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_id, path, title, date FROM entries "
+                "WHERE date = ? ORDER BY title",
+                (date,),
+            )
+            return [_row(row) for row in rows]
+
+    def rebuild_pages(self) -> int:
+        """
+        Regenerate every tag and date page from the index (e.g. after the page
+        layout changed). Entry files are not read.
+
+        Returns:
+            Number of pages written
+        """
+        with self._lock:
+            tags = {row[0] for row in self._conn.execute("SELECT tag FROM entry_tags")}
+            dates = {row[0] for row in self._conn.execute("SELECT date FROM entries")}
+            return self._refresh_pages(tags, dates)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _get(self, source_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT path, date, tags FROM entries WHERE source_id = ?", (source_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"path": row[0], "date": row[1], "tags": json.loads(row[2])}
+
+    def _write_entry(
+        self,
+        markdown: str,
+        metadata: Dict[str, Any],
+        dirty_tags: Set[str],
+        dirty_dates: Set[str],
+    ) -> Path:
+        source_id = str(metadata["source_id"])
+        date = metadata.get("date") or UNDATED
+        tags = sorted({str(tag) for tag in metadata.get("tags") or []})
+        relative = self.entry_path(metadata)
+
+        atomic_write_text(self.vault_dir / relative, markdown)
+
+        previous = self._get(source_id)
+        if previous is not None:
+            if previous["path"] != relative.as_posix():
+                (self.vault_dir / previous["path"]).unlink(missing_ok=True)
+            dirty_tags.update(previous["tags"])
+            dirty_dates.add(previous["date"])
+            self._conn.execute(
+                "DELETE FROM entry_tags WHERE source_id = ?", (source_id,)
+            )
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (source_id, path, title, date, tags) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                source_id,
+                relative.as_posix(),
+                metadata.get("title"),
+                date,
+                json.dumps(tags),
+            ),
+        )
+        self._conn.executemany(
+            "INSERT INTO entry_tags (tag, source_id) VALUES (?, ?)",
+            [(tag, source_id) for tag in tags],
+        )
+        dirty_tags.update(tags)
+        dirty_dates.add(date)
+        return self.vault_dir / relative
+
+    def _refresh_pages(self, tags: Set[str], dates: Set[str]) -> int:
+        written = 0
+        for tag in sorted(tags):
+            written += self._write_page(
+                Path(VAULT_TAGS_DIR) / f"{tag_page_name(tag)}.md",
+                f"# #{tag}",
+                self.entries_for_tag(tag),
+                show_date=True,
+            )
+        for date in sorted(dates):
+            written += self._write_page(
+                Path(VAULT_DAILY_DIR) / f"{safe_name(date)}.md",
+                f"# {date}",
+                self.entries_for_date(date),
+                show_date=False,
+            )
+        return written
+
+    def _write_page(
+        self,
+        relative: Path,
+        heading: str,
+        entries: List[Dict[str, Any]],
+        show_date: bool,
+    ) -> int:
+        path = self.vault_dir / relative
+        if not entries:
+            path.unlink(missing_ok=True)
+            return 0
+
+        lines = [heading, ""]
+        for entry in entries:
+            link = entry["path"][: -len(".md")]
+            label = (entry["title"] or "Untitled").replace("|", "-")
+            prefix = f"{entry['date']} · " if show_date else ""
+            lines.append(f"- {prefix}[[{link}|{label}]]")
+        atomic_write_text(path, "\n".join(lines) + "\n")
+        return 1
+
+
+def _row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    return {"source_id": row[0], "path": row[1], "title": row[2], "date": row[3]}
@@ -0,0 +1,61 @@
+"""
+Benchmark: conversation tree traversal by branch mode
+
+Parses synthetic conversations with regenerated side branches and reports parse
+time and raw_text size for each branch mode ("all" is the previous behaviour).
+
+Usage:
+    python tests/bench_branch_traversal.py
+    python tests/bench_branch_traversal.py --messages 5000 --branch-probability 0.5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversation_parser import BRANCH_MODES, parse_conversation
+from tests.bench_support import make_conversation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark branch traversal")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--branch-probability", type=float, default=0.3)
+    parser.add_argument("--branch-count", type=int, default=2)
+    parser.add_argument("--branch-depth", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conversation = make_conversation(
+        messages=args.messages,
+        branch_probability=args.branch_probability,
+        branch_count=args.branch_count,
+        branch_depth=args.branch_depth,
+    )
+
+    print("=" * 80)
+    print(
+        f"BRANCH TRAVERSAL: {args.messages} active messages, "
+        f"{len(conversation['mapping'])} nodes"
+    )
+    print("=" * 80)
+
+    for mode in BRANCH_MODES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = parse_conversation(conversation, branch_mode=mode)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{mode:<8} median {statistics.median(timings):8.2f} ms | "
+            f"raw_text {len(result['raw_text']):>9,} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: credit leases vs. per-request atomic deduction
+
+Sends requests for a single power user through check_and_deduct_credits against a
+local DynamoDB stand-in (moto) and reports DynamoDB write calls and the latency the
+credit step adds per request, with and without credit leases.
+
+Usage:
+    python tests/bench_credit_lease.py
+    python tests/bench_credit_lease.py --requests 500 --lease-size 25
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.pop("AWS_SAM_LOCAL", None)
+
+import boto3
+from moto import mock_aws
+
+import src.app as app
+from src.credit_lease import CreditLeaseManager
+
+WRITE_OPERATIONS = {"UpdateItem", "PutItem"}
+
+
+def run(table, requests, lease_size):
+    """Run requests for one user; return (write calls, latencies in ms)."""
+    table.put_item(Item={"user_id": "power-user", "credit_balance": requests * 2})
+
+    calls = []
+    handler = lambda model, **kwargs: calls.append(model.name)
+    table.meta.client.meta.events.register("before-call.dynamodb", handler)
+
+    app.lease_manager = None
+    if lease_size > 1:
+        app.lease_manager = CreditLeaseManager(
+            table,
+            lease_size=lease_size,
+            free_credits=app.DEFAULT_FREE_CREDITS,
+            fallback_deduct=app.deduct_credits,
+        )
+    app.CREDIT_LEASE_SIZE = lease_size
+
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(requests):
+            start = time.perf_counter()
+            assert app.check_and_deduct_credits("power-user")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    if app.lease_manager is not None:
+        app.lease_manager.return_all()
+
+    table.meta.client.meta.events.unregister("before-call.dynamodb", handler)
+    writes = sum(1 for name in calls if name in WRITE_OPERATIONS)
+    return writes, latencies
+
+
+def report(label, requests, writes, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<22} writes {writes:>5} ({writes / requests:.2f}/request) | "
+        f"mean {statistics.mean(latencies):6.3f} ms | p95 {p95:6.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark credit leases")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--lease-size", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"CREDIT CHECK - {args.requests} REQUESTS FROM ONE USER (moto stand-in)")
+    print("=" * 80)
+
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        table = dynamodb.create_table(
+            TableName="RIJG-UserCredits",
+            KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        app.credits_table = table
+
+        writes, latencies = run(table, args.requests, lease_size=0)
+        report("Atomic deduction", args.requests, writes, latencies)
+
+        lease_writes, lease_latencies = run(table, args.requests, args.lease_size)
+        report(
+            f"Lease (K={args.lease_size})", args.requests, lease_writes, lease_latencies
+        )
+
+    print()
+    print(f"Write units reduced {writes / max(lease_writes, 1):.1f}x")
+    print(
+        "Note: moto answers in-process; real DynamoDB adds network latency to every "
+        "write, so the latency gap grows in production."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: delta scan of a large export against the ingest manifest
+
+Builds a synthetic export, records every conversation in a SQLite manifest,
+changes a few of them and times scan_export over the whole file, once per
+fingerprint mode.
+
+Usage:
+    python tests/bench_ingest_delta.py
+    python tests/bench_ingest_delta.py --conversations 10000 --messages 40 --changed 50
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ingest_manifest import (  # noqa: E402
+    FINGERPRINT_MODES,
+    SQLiteManifest,
+    conversation_fingerprint,
+    scan_export,
+)
+from tests.bench_support import make_conversation  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest delta scan")
+    parser.add_argument("--conversations", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--changed", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        print(f"Building {args.conversations} conversations...")
+        conversations = [
+            make_conversation(
+                messages=args.messages, seed=i, conversation_id=f"conv-{i}"
+            )
+            for i in range(args.conversations)
+        ]
+        export_path = tmp_path / "conversations.json"
+        export_path.write_text(json.dumps(conversations), encoding="utf-8")
+        size_mib = export_path.stat().st_size / 2**20
+        print(f"Export: {size_mib:.1f} MiB")
+
+        for mode in FINGERPRINT_MODES:
+            manifest = SQLiteManifest(str(tmp_path / f"manifest-{mode}.sqlite3"))
+            for conversation in conversations[args.changed :]:
+                manifest.record(
+                    conversation["id"], conversation_fingerprint(conversation, mode)
+                )
+
+            stats = {}
+            start = time.perf_counter()
+            delta = list(scan_export(export_path, manifest, mode, stats))
+            elapsed = time.perf_counter() - start
+
+            assert len(delta) == args.changed
+            print(
+                f"{mode:>12}: {elapsed:.2f} s "
+                f"({stats['total']} scanned, {len(delta)} to process)"
+            )
+
+
+if __name__ == "__main__":
+    main()
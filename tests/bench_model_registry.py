@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: per-invocation Gemini client setup cost
+
+Compares the old per-request setup (genai.configure + new GenerativeModel + the
+gRPC client the first generate_content call creates) with the container-wide
+model registry in src.gemini_processor. Runs offline - no API calls are made.
+
+Usage:
+    python tests/bench_model_registry.py
+    python tests/bench_model_registry.py --iterations 500
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from src.gemini_processor import (
+    GENERATION_CONFIG,
+    SYSTEM_INSTRUCTION,
+    get_model,
+    reset_model_registry,
+)
+
+API_KEY = "benchmark-key"
+MODEL_NAME = "gemini-2.5-flash"
+
+
+def _bind_client(model):
+    """Create the gRPC client the way generate_content does on first use."""
+    if model._client is None:
+        model._client = genai_client.get_default_generative_client()
+    return model
+
+
+def setup_per_request():
+    """Setup as done before the registry: everything rebuilt on every request."""
+    genai.configure(api_key=API_KEY)
+    model = genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        system_instruction=SYSTEM_INSTRUCTION,
+        generation_config=GENERATION_CONFIG,
+    )
+    return _bind_client(model)
+
+
+def setup_with_registry():
+    """Setup through the registry: built once per container, then reused."""
+    return _bind_client(get_model(MODEL_NAME, API_KEY))
+
+
+def measure(fn, iterations):
+    """Return per-call timings in microseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<28} mean {statistics.mean(timings):>10.1f} us | "
+        f"median {statistics.median(timings):>10.1f} us | "
+        f"max {max(timings):>10.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Gemini client setup")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("GEMINI CLIENT SETUP - PER INVOCATION")
+    print("=" * 80)
+
+    before = measure(setup_per_request, args.iterations)
+
+    reset_model_registry()
+    cold = measure(setup_with_registry, 1)
+    warm = measure(setup_with_registry, args.iterations)
+
+    report("Before (per request)", before)
+    report("Registry (cold container)", cold)
+    report("Registry (warm invocation)", warm)
+    print()
+    print(
+        f"Warm invocation speedup: "
+        f"{statistics.mean(before) / statistics.mean(warm):.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: near-duplicate lookups against a large index
+
+Fills an index with random signatures (standing in for already-processed
+conversations), then times signature computation for conversation-sized texts
+and lookups of new conversations, half of them near-duplicates of indexed ones.
+
+Usage:
+    python tests/bench_near_duplicates.py
+    python tests/bench_near_duplicates.py --indexed 50000 --queries 200 --words 2000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.near_duplicates import NearDuplicateIndex  # noqa: E402
+
+
+def random_text(rng, words):
+    return " ".join(f"word{rng.randrange(20000)}" for _ in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate lookups")
+    parser.add_argument("--indexed", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDuplicateIndex(str(Path(tmp) / "index.sqlite3"))
+        print(f"Layout: {index.bands} bands x {index.rows} rows")
+
+        start = time.perf_counter()
+        for i in range(args.indexed):
+            signature = [rng.getrandbits(32) for _ in range(index.num_perm)]
+            index.add(f"seed-{i}", signature)
+        print(f"Indexed {len(index)} signatures in {time.perf_counter() - start:.1f} s")
+
+        texts = [random_text(rng, args.words) for _ in range(args.queries // 2)]
+        signature_ms = []
+        for i, text in enumerate(texts):
+            start = time.perf_counter()
+            signature = index.signature(text)
+            signature_ms.append((time.perf_counter() - start) * 1000)
+            index.add(f"text-{i}", signature)
+
+        queries = [text + " one more line" for text in texts]
+        queries += [random_text(rng, args.words) for _ in range(args.queries // 2)]
+        signatures = [index.signature(text) for text in queries]
+
+        lookup_ms = []
+        found = 0
+        for signature in signatures:
+            start = time.perf_counter()
+            found += bool(index.query(signature))
+            lookup_ms.append((time.perf_counter() - start) * 1000)
+
+        print(
+            f"Signature ({args.words} words): "
+            f"p50 {statistics.median(signature_ms):.1f} ms"
+        )
+        print(
+            f"Lookup against {len(index)}: p50 {statistics.median(lookup_ms):.2f} ms, "
+            f"max {max(lookup_ms):.2f} ms ({found}/{len(queries)} near-duplicates)"
+        )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
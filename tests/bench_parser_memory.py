@@ -0,0 +1,118 @@
+"""
+Benchmark: parser peak memory and time, compact single pass vs. previous version
+
+Parses a synthetic 10k-message conversation with the current parser and with a
+copy of the previous implementation (per-message dicts rendered in two passes),
+reporting median time and tracemalloc peak for each.
+
+Usage:
+    python tests/bench_parser_memory.py
+    python tests/bench_parser_memory.py --messages 20000 --words 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversation_parser import _extract_messages_from_mapping, _render_messages
+from tests.bench_support import make_conversation
+
+
+def legacy_parse(conversation):
+    """Previous message extraction and rendering: dicts, sort, two passes."""
+    messages = []
+    for node_id, node_data in conversation["mapping"].items():
+        message = node_data.get("message")
+        if not message or not message.get("content"):
+            continue
+        parts = message["content"].get("parts", [])
+        if not parts or not any(parts):
+            continue
+        text = "\n".join(str(part) for part in parts if part)
+        if not text.strip():
+            continue
+        messages.append(
+            {
+                "id": message.get("id", node_id),
+                "author_role": message.get("author", {}).get("role", "unknown"),
+                "create_time": message.get("create_time", 0),
+                "text": text.strip(),
+            }
+        )
+    messages.sort(key=lambda m: m["create_time"] or 0)
+
+    raw_parts = []
+    for msg in messages:
+        if msg["author_role"] == "user":
+            raw_parts.append(f"User: {msg['text']}")
+        elif msg["author_role"] == "assistant":
+            raw_parts.append(f"Assistant: {msg['text']}")
+    transcript_parts = []
+    for msg in messages:
+        if msg["author_role"] == "user":
+            transcript_parts.append(f"**User:** {msg['text']}")
+        elif msg["author_role"] == "assistant":
+            transcript_parts.append(f"**Assistant:** {msg['text']}")
+    return "\n\n".join(raw_parts), "\n\n".join(transcript_parts)
+
+
+def current_parse(conversation):
+    """Current extraction ("all" mode, for a like-for-like comparison) and rendering."""
+    messages = _extract_messages_from_mapping(
+        conversation["mapping"], branch_mode="all"
+    )
+    return _render_messages(messages)
+
+
+def measure(parse, conversation, repeat):
+    """Return (median ms, peak traced MB, outputs) for one implementation."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = parse(conversation)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    outputs = parse(conversation)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024 / 1024, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser memory")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conversation = make_conversation(
+        messages=args.messages, branch_probability=0, words_per_message=args.words
+    )
+
+    print("=" * 80)
+    print(f"PARSER MEMORY: {args.messages} messages, {args.words} words each")
+    print("=" * 80)
+
+    legacy_ms, legacy_mb, legacy_out = measure(legacy_parse, conversation, args.repeat)
+    current_ms, current_mb, current_out = measure(
+        current_parse, conversation, args.repeat
+    )
+    assert legacy_out == current_out, "Outputs differ"
+
+    print(f"{'previous':<10} median {legacy_ms:8.2f} ms | peak {legacy_mb:7.2f} MB")
+    print(f"{'current':<10} median {current_ms:8.2f} ms | peak {current_mb:7.2f} MB")
+    print(
+        f"Change: time {current_ms / legacy_ms - 1:+.0%}, "
+        f"peak memory {current_mb / legacy_mb - 1:+.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
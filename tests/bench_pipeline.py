@@ -0,0 +1,394 @@
+"""
+Benchmark suite: lambda_handler end to end against a deterministic Gemini stub
+
+Runs synthetic conversations through lambda_handler with the Gemini SDK replaced
+by tests/gemini_stub.py, so it needs no API key or network and measures our own
+overhead. For each scenario it reports per-stage timings (parse, reduce, LLM,
+merge, render), sequential and batch throughput, and peak memory, and can save
+them as baselines or compare a run against saved baselines.
+
+Stage timings wrap the functions run_pipeline calls; "merge" is the pipeline time
+not spent in the other stages (the data merge plus logging and glue code).
+
+Usage:
+    python tests/bench_pipeline.py
+    python tests/bench_pipeline.py --scenario short --latency 0.2 --error-rate 0.1
+    python tests/bench_pipeline.py --compare              # exit 1 on regressions
+    python tests/bench_pipeline.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import src.app as app
+from src.model_health import reset_model_health
+from src.rate_limiter import AdaptiveRateLimiter, set_rate_limiter
+from src.result_cache import set_result_cache
+from tests.bench_support import make_conversation
+from tests.gemini_stub import ERROR_KINDS, GeminiStub, installed_gemini_stub
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_baselines.json"
+
+STAGES = ("parse", "reduce", "llm", "merge", "render")
+
+# Conversation shapes; "long" is large enough to take the map-reduce route
+SCENARIOS = {
+    "short": {
+        "messages": 20,
+        "words_per_message": 30,
+        "branch_probability": 0.0,
+        "conversations": 30,
+    },
+    "branched": {
+        "messages": 400,
+        "words_per_message": 40,
+        "branch_probability": 0.3,
+        "conversations": 10,
+    },
+    "long": {
+        "messages": 1500,
+        "words_per_message": 60,
+        "branch_probability": 0.1,
+        "conversations": 3,
+    },
+}
+
+# Relative change beyond which a metric counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Timing differences smaller than this are treated as noise
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+class StageTimer:
+    """
+    Wraps the functions run_pipeline calls in src.app and records their times.
+
+    Calls must be sequential: stage times go to the most recent pipeline call.
+    """
+
+    WRAPPED = {
+        "pipeline": "run_pipeline",
+        "parse": "parse_conversation_messages",
+        "reduce": "reduce_messages",
+        "llm": "process_with_routing",
+        "render": "render_journal_entry_safe",
+    }
+
+    def __init__(self):
+        self.calls: List[Dict[str, float]] = []
+        self._originals: Dict[str, Any] = {}
+
+    def __enter__(self) -> "StageTimer":
+        for stage, attr in self.WRAPPED.items():
+            original = getattr(app, attr)
+            self._originals[attr] = original
+            setattr(app, attr, self._timed(stage, original))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for attr, original in self._originals.items():
+            setattr(app, attr, original)
+
+    def _timed(self, stage: str, fn: Any) -> Any:
+        def run(*args: Any, **kwargs: Any) -> Any:
+            if stage == "pipeline":
+                self.calls.append({})
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.calls[-1][stage] = time.perf_counter() - start
+
+        return run
+
+    def stage_times(self) -> Dict[str, List[float]]:
+        """
+        Stage times in seconds; merge is the pipeline residual of complete calls.
+
+        Failed calls contribute the stages they reached.
+        """
+        times: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        for call in self.calls:
+            for stage, seconds in call.items():
+                if stage in times:
+                    times[stage].append(seconds)
+            if all(stage in call for stage in STAGES if stage != "merge"):
+                measured = sum(call[stage] for stage in STAGES if stage != "merge")
+                times["merge"].append(call["pipeline"] - measured)
+        return times
+
+
+def make_stub(args: argparse.Namespace) -> GeminiStub:
+    return GeminiStub(
+        latency_seconds=args.latency,
+        latency_per_1k_tokens=args.latency_per_1k_tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_kind=args.error_kind,
+        seed=args.seed,
+    )
+
+
+def reset_state(qps: float) -> None:
+    """Fresh breakers, cache and limiter so runs don't affect each other."""
+    reset_model_health()
+    set_result_cache(None)
+    set_rate_limiter(AdaptiveRateLimiter(rate=qps, burst=qps, max_rate=qps))
+
+
+def build_events(shape: Dict[str, Any], seed: int) -> List[Dict[str, Any]]:
+    events = []
+    for i in range(shape["conversations"]):
+        conversation = make_conversation(
+            messages=shape["messages"],
+            words_per_message=shape["words_per_message"],
+            branch_probability=shape["branch_probability"],
+            seed=seed + i,
+            conversation_id=f"bench-{i}",
+        )
+        events.append({"body": json.dumps({"conversation": conversation})})
+    return events
+
+
+def run_scenario(
+    name: str,
+    stub: GeminiStub,
+    qps: float = 1000.0,
+    batch_concurrency: int = 8,
+    shape: Optional[Dict[str, Any]] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Benchmark one scenario (credits are mocked, so set AWS_SAM_LOCAL=true).
+
+    Args:
+        name: Scenario name (key of SCENARIOS unless shape is given)
+        stub: Gemini stub to install
+        qps: Rate limit for the stubbed Gemini calls
+        batch_concurrency: max_concurrency for the batch throughput run
+        shape: Conversation shape (default: SCENARIOS[name])
+        seed: Seed for the synthetic conversations
+
+    Returns:
+        Metrics: stage p50/p95 in ms, throughput, batch throughput, peak memory,
+        error counts and stub call count
+    """
+    shape = shape or SCENARIOS[name]
+    events = build_events(shape, seed)
+    conversations = [json.loads(e["body"])["conversation"] for e in events]
+
+    with installed_gemini_stub(stub), contextlib.redirect_stdout(io.StringIO()):
+        # Warm-up (imports, compiled template) outside the measurements
+        reset_state(qps)
+        app.lambda_handler(events[0], None)
+
+        reset_state(qps)
+        failures = 0
+        with StageTimer() as timer:
+            start = time.perf_counter()
+            for event in events:
+                if app.lambda_handler(event, None)["statusCode"] != 200:
+                    failures += 1
+            elapsed = time.perf_counter() - start
+
+        reset_state(qps)
+        start = time.perf_counter()
+        results = app.process_batch(conversations, max_concurrency=batch_concurrency)
+        batch_elapsed = time.perf_counter() - start
+        batch_failures = sum(1 for result in results if not result["success"])
+
+        reset_state(qps)
+        tracemalloc.start()
+        app.lambda_handler(events[-1], None)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    stages = {}
+    for stage, samples in timer.stage_times().items():
+        if not samples:
+            continue
+        samples_ms = sorted(s * 1000 for s in samples)
+        stages[stage] = {
+            "p50_ms": round(statistics.median(samples_ms), 3),
+            "p95_ms": round(samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)], 3),
+        }
+
+    return {
+        "conversations": len(events),
+        "stages": stages,
+        "throughput_per_s": round(len(events) / elapsed, 2),
+        "batch_throughput_per_s": round(len(events) / batch_elapsed, 2),
+        "peak_memory_mib": round(peak / 2**20, 2),
+        "failures": failures,
+        "batch_failures": batch_failures,
+        "stub_calls": stub.stats["calls"],
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[str]:
+    """
+    Compare one scenario's metrics with its baseline.
+
+    Stage times and peak memory regress when they grow, throughputs when they
+    shrink, by more than tolerance (stage times also by more than min_delta_ms).
+
+    Returns:
+        Descriptions of the regressed metrics (empty if none)
+    """
+    regressions = []
+
+    for stage, values in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("p50_ms")
+        after = values["p50_ms"]
+        if before is None:
+            continue
+        if after - before > min_delta_ms and after > before * (1 + tolerance):
+            regressions.append(f"{stage} p50 {before:.3f} -> {after:.3f} ms")
+
+    for metric in ("throughput_per_s", "batch_throughput_per_s"):
+        before, after = baseline.get(metric), current[metric]
+        if before and after < before * (1 - tolerance):
+            regressions.append(f"{metric} {before} -> {after}")
+
+    before, after = baseline.get("peak_memory_mib"), current["peak_memory_mib"]
+    if before and after > before * (1 + tolerance):
+        regressions.append(f"peak_memory_mib {before} -> {after}")
+
+    return regressions
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("scenarios", {})
+
+
+def save_baselines(
+    results: Dict[str, Any], settings: Dict[str, Any], path: Path = BASELINE_PATH
+) -> None:
+    """Merge results into the baseline file (other scenarios are kept)."""
+    scenarios = load_baselines(path)
+    scenarios.update(results)
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "saved": time.strftime("%Y-%m-%d"),
+            "settings": settings,
+        },
+        "scenarios": scenarios,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def report(name: str, metrics: Dict[str, Any]) -> None:
+    print(f"\n{name} ({metrics['conversations']} conversations)")
+    for stage, values in metrics["stages"].items():
+        print(
+            f"  {stage:<8} p50 {values['p50_ms']:9.3f} ms | "
+            f"p95 {values['p95_ms']:9.3f} ms"
+        )
+    print(
+        f"  throughput {metrics['throughput_per_s']:.2f}/s sequential, "
+        f"{metrics['batch_throughput_per_s']:.2f}/s batch | "
+        f"peak memory {metrics['peak_memory_mib']:.2f} MiB | "
+        f"failures {metrics['failures']} (batch {metrics['batch_failures']}) | "
+        f"stub calls {metrics['stub_calls']}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-kind", choices=sorted(ERROR_KINDS), default="invalid")
+    parser.add_argument("--qps", type=float, default=1000.0)
+    parser.add_argument("--batch-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--baseline-file", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    # Mock credits; only the pipeline is measured
+    os.environ["AWS_SAM_LOCAL"] = "true"
+
+    settings = {
+        key: getattr(args, key)
+        for key in (
+            "latency",
+            "latency_per_1k_tokens",
+            "jitter",
+            "error_rate",
+            "error_kind",
+            "qps",
+            "batch_concurrency",
+            "seed",
+        )
+    }
+    print(f"Gemini stub settings: {settings}")
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        results[name] = run_scenario(
+            name,
+            make_stub(args),
+            qps=args.qps,
+            batch_concurrency=args.batch_concurrency,
+            seed=args.seed,
+        )
+        report(name, results[name])
+
+    if args.save_baseline:
+        save_baselines(results, settings, args.baseline_file)
+        print(f"\nSaved baselines to {args.baseline_file}")
+
+    if args.compare:
+        baselines = load_baselines(args.baseline_file)
+        regressed = False
+        print()
+        for name, metrics in results.items():
+            if name not in baselines:
+                print(f"{name}: no baseline")
+                continue
+            regressions = compare(
+                metrics, baselines[name], args.tolerance, args.min_delta_ms
+            )
+            regressed = regressed or bool(regressions)
+            print(f"{name}: " + ("; ".join(regressions) or "no regressions"))
+        return 1 if regressed else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
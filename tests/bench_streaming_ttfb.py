@@ -0,0 +1,146 @@
+"""
+Benchmark: time-to-first-byte with and without streaming
+
+Runs a conversation through lambda_handler (full response) and stream_handler
+(streamed Markdown) against a stubbed Gemini model that produces its JSON in
+chunks with a fixed delay between them, and reports time to the first byte of
+Markdown and to the complete entry for each.
+
+Usage:
+    python tests/bench_streaming_ttfb.py
+    python tests/bench_streaming_ttfb.py --chunks 200 --chunk-delay 0.05 --runs 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ["AWS_SAM_LOCAL"] = "true"
+os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+
+import src.app as app
+import src.gemini_processor as gemini_processor
+import src.streaming as streaming
+from src.result_cache import set_result_cache
+from tests.bench_support import make_conversation
+
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def make_entry(body_words):
+    return {
+        "title": "Benchmarking Streamed Journal Entries",
+        "topic": "Performance",
+        "tags": ["benchmark", "streaming", "latency"],
+        "rewritten_entry_body": " ".join(f"word{i}" for i in range(body_words)),
+    }
+
+
+def split(text, parts):
+    size = max(1, -(-len(text) // parts))
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def install_stub(entry, chunks, chunk_delay):
+    """Replace the Gemini call with a model that emits entry over chunks."""
+    raw = json.dumps(entry)
+    pieces = split(raw, chunks)
+
+    def stream_chunks():
+        for piece in pieces:
+            time.sleep(chunk_delay)
+            yield StubChunk(piece)
+
+    def fake_generate(model, prompt, stream=False):
+        if stream:
+            return stream_chunks()
+        # A non-streamed call returns once the whole response has been generated
+        time.sleep(chunk_delay * len(pieces))
+        return StubResponse(raw)
+
+    def fake_get_model(*args, **kwargs):
+        return None
+
+    for module in (gemini_processor, streaming):
+        module.generate_with_retries = fake_generate
+        module.get_model = fake_get_model
+    gemini_processor.HEDGE_ENABLED = False
+    set_result_cache(None)
+
+
+def time_full(event):
+    start = time.perf_counter()
+    response = app.lambda_handler(event, None)
+    elapsed = time.perf_counter() - start
+    assert response["statusCode"] == 200, response["body"]
+    return elapsed, elapsed
+
+
+def time_streamed(event):
+    start = time.perf_counter()
+    response = app.stream_handler(event, None)
+    assert response["statusCode"] == 200, response["body"]
+    first = None
+    for chunk in response["body"]:
+        if first is None and chunk:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def report(label, results):
+    ttfb = [r[0] * 1000 for r in results]
+    total = [r[1] * 1000 for r in results]
+    print(
+        f"{label:<10} TTFB {statistics.median(ttfb):8.1f} ms | "
+        f"complete {statistics.median(total):8.1f} ms"
+    )
+    return statistics.median(ttfb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming TTFB")
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--body-words", type=int, default=600)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    install_stub(make_entry(args.body_words), args.chunks, args.chunk_delay)
+    conversation = make_conversation(messages=args.messages, seed=7)
+    event = {"body": json.dumps({"conversation": conversation})}
+
+    print(
+        f"Stub model: {args.chunks} chunks, {args.chunk_delay * 1000:.0f} ms apart "
+        f"(~{args.chunks * args.chunk_delay:.1f} s per response), median of "
+        f"{args.runs} runs"
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = [time_full(event) for _ in range(args.runs)]
+        streamed = [time_streamed(event) for _ in range(args.runs)]
+
+    full_ttfb = report("full", full)
+    streamed_ttfb = report("streamed", streamed)
+    print(f"TTFB reduced {full_ttfb / streamed_ttfb:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Synthetic ChatGPT exports for benchmarks.
+
+Builds conversation dictionaries in the export's tree-structured 'mapping' format,
+including regenerated/edited side branches, so benchmarks don't need a real export.
+"""
+
+import random
+from typing import Any, Dict, Optional
+
+WORDS = (
+    "the journal model reflect idea today plan work feel project code test data "
+    "question answer because maybe think write better python lambda cloud memory"
+).split()
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    """Return a pseudo-sentence of the given number of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_conversation(
+    messages: int = 200,
+    branch_probability: float = 0.3,
+    branch_count: int = 2,
+    branch_depth: int = 4,
+    words_per_message: int = 40,
+    seed: Optional[int] = 0,
+    conversation_id: str = "synthetic",
+) -> Dict[str, Any]:
+    """
+    Build a synthetic conversation with an active branch and abandoned side branches.
+
+    The active branch alternates user and assistant messages. At each assistant
+    message, with branch_probability, branch_count regenerated siblings are added,
+    each starting a side branch of branch_depth messages. The active child is
+    always listed last, as in real exports, and current_node is the active leaf.
+
+    Args:
+        messages: Number of messages on the active branch
+        branch_probability: Chance of side branches at each assistant message
+        branch_count: Side branches added per branching point
+        branch_depth: Messages per side branch
+        words_per_message: Words of text per message
+        seed: Random seed (None for nondeterministic output)
+        conversation_id: Value for the conversation's id field
+
+    Returns:
+        ChatGPT conversation dictionary
+    """
+    rng = random.Random(seed)
+    mapping: Dict[str, Any] = {}
+    clock = [1700000000.0]
+
+    def add_node(node_id, parent, role):
+        clock[0] += 1
+        mapping[node_id] = {
+            "id": node_id,
+            "parent": parent,
+            "children": [],
+            "message": {
+                "id": node_id,
+                "author": {"role": role},
+                "create_time": clock[0],
+                "content": {
+                    "content_type": "text",
+                    "parts": [make_text(rng, words_per_message)],
+                },
+            },
+        }
+        if parent is not None:
+            mapping[parent]["children"].append(node_id)
+
+    mapping["root"] = {"id": "root", "parent": None, "children": [], "message": None}
+    parent = "root"
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        if role == "assistant" and rng.random() < branch_probability:
+            for b in range(branch_count):
+                side_parent = parent
+                for d in range(branch_depth):
+                    side_id = f"side-{i}-{b}-{d}"
+                    add_node(
+                        side_id, side_parent, "assistant" if d % 2 == 0 else "user"
+                    )
+                    side_parent = side_id
+        node_id = f"msg-{i}"
+        add_node(node_id, parent, role)
+        parent = node_id
+
+    return {
+        "id": conversation_id,
+        "title": f"Synthetic conversation ({messages} messages)",
+        "create_time": 1700000000.0,
+        "update_time": clock[0],
+        "current_node": parent,
+        "mapping": mapping,
+    }
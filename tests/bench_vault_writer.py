@@ -0,0 +1,77 @@
+"""
+Benchmark: adding entries to a large vault
+
+Fills a vault with synthetic entries (spread over dates and a pool of tags),
+then times adding a handful more, which only rewrites the pages for the tags
+and dates those entries touch.
+
+Usage:
+    python tests/bench_vault_writer.py
+    python tests/bench_vault_writer.py --notes 20000 --add 10 --tags 500
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.vault_writer import VaultWriter  # noqa: E402
+
+
+def synthetic_entries(count, tag_count, seed, prefix):
+    rng = random.Random(seed)
+    start = date(2022, 1, 1)
+    for i in range(count):
+        day = (start + timedelta(days=rng.randrange(1000))).isoformat()
+        tags = rng.sample([f"tag-{t}" for t in range(tag_count)], 4)
+        metadata = {
+            "source_id": f"{prefix}-{i:06d}",
+            "title": f"Synthetic entry {prefix} {i}",
+            "date": day,
+            "tags": tags,
+        }
+        yield f"# {metadata['title']}\n\n" + "word " * 400, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental vault writes")
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--add", type=int, default=10)
+    parser.add_argument("--tags", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault = VaultWriter(tmp)
+
+        start = time.perf_counter()
+        vault.write_entries(synthetic_entries(args.notes, args.tags, 0, "base"))
+        print(
+            f"Filled vault with {len(vault)} notes in {time.perf_counter() - start:.1f} s"
+        )
+
+        start = time.perf_counter()
+        vault.write_entries(synthetic_entries(args.add, args.tags, 1, "new"))
+        elapsed = time.perf_counter() - start
+        print(f"Added {args.add} notes (one batch) in {elapsed * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        for markdown, metadata in synthetic_entries(args.add, args.tags, 2, "one"):
+            vault.write_entry(markdown, metadata)
+        elapsed = time.perf_counter() - start
+        print(f"Added {args.add} notes (one at a time) in {elapsed * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        pages = vault.rebuild_pages()
+        elapsed = time.perf_counter() - start
+        print(f"Full rebuild for comparison: {pages} pages in {elapsed * 1000:.0f} ms")
+        vault.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Shared pytest configuration.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# boto3 needs a region to build clients; tests never talk to real AWS
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+@pytest.fixture
+def credits_table(monkeypatch):
+    """Credits table in a local DynamoDB stand-in (moto), wired into src.app."""
+    import boto3
+    from moto import mock_aws
+    from moto.dynamodb.models import DynamoDBBackend
+
+    import src.app as app
+
+    monkeypatch.delenv("AWS_SAM_LOCAL", raising=False)
+
+    # DynamoDB applies writes to a single item atomically; moto does not lock,
+    # so serialize its update_item to give the stand-in the same semantics.
+    lock = threading.Lock()
+    original_update_item = DynamoDBBackend.update_item
+
+    def serialized_update_item(self, *args, **kwargs):
+        with lock:
+            return original_update_item(self, *args, **kwargs)
+
+    monkeypatch.setattr(DynamoDBBackend, "update_item", serialized_update_item)
+
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="RIJG-UserCredits",
+            KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        monkeypatch.setattr(app, "credits_table", table)
+        yield table
+
+
+@pytest.fixture
+def gemini_stub(monkeypatch):
+    """
+    Offline pipeline: a default GeminiStub in place of the SDK, no result cache,
+    fresh model health, no retry backoff and local mode (no credit checks).
+
+    Tests that need a differently configured stub can nest
+    installed_gemini_stub inside; the fixture's stub is restored afterwards.
+    """
+    import src.gemini_processor as gemini_processor
+    import src.result_cache as result_cache
+    from src.model_health import reset_model_health
+    from tests.gemini_stub import GeminiStub, installed_gemini_stub
+
+    monkeypatch.setenv("AWS_SAM_LOCAL", "true")
+    monkeypatch.setattr(gemini_processor, "backoff_delay", lambda *args: 0)
+    # Disable the result cache for this test only (monkeypatch restores it)
+    monkeypatch.setattr(result_cache, "_result_cache", None)
+    monkeypatch.setattr(result_cache, "_result_cache_configured", True)
+    reset_model_health()
+    with installed_gemini_stub(GeminiStub()) as stub:
+        yield stub
+    reset_model_health()
@@ -0,0 +1,216 @@
+"""
+Deterministic stand-in for the Gemini SDK, for offline benchmarks and tests.
+
+GeminiStub takes the place of the google.generativeai module inside
+src.gemini_processor, so everything above the SDK (model registry, rate limiter,
+retries, breakers, fallback, chunking) runs as in production while
+genai.GenerativeModel calls return canned journal entries after a configurable
+latency, with optional error injection.
+
+Usage:
+    stub = GeminiStub(latency_seconds=0.05, error_rate=0.1, seed=1)
+    with installed_gemini_stub(stub):
+        app.lambda_handler(event, None)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import src.gemini_processor as gemini_processor
+from src.token_estimator import estimate_tokens
+
+# Injectable errors and the google.api_core exception each one raises
+ERROR_KINDS = {
+    "unavailable": "ServiceUnavailable",  # transient, retried with backoff
+    "rate_limit": "ResourceExhausted",  # throttle, slows the rate limiter
+    "invalid": "InvalidArgument",  # not retryable, moves to the fallback model
+}
+
+WORDS = (
+    "today I realized the design was simpler than I thought and decided to "
+    "write down what I learned about the system and the next steps"
+).split()
+
+
+class StubChunk:
+    """One piece of a streamed response."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubUsage:
+    """usage_metadata with the SDK's token count attributes."""
+
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class StubResponse:
+    """Non-streamed response with the SDK's .text and .usage_metadata."""
+
+    def __init__(self, text: str, usage: StubUsage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class StubCountTokens:
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+class GeminiStub:
+    """
+    Fake google.generativeai module with configurable latency and failures.
+
+    Responses and injected errors depend only on the seed, model and prompt (and
+    how many times that prompt was sent to that model), so runs are repeatable
+    even when calls happen concurrently.
+
+    Args:
+        latency_seconds: Fixed latency per generate_content call
+        latency_per_1k_tokens: Extra latency per 1000 prompt tokens
+        jitter: Random latency spread as a fraction of the latency (0-1)
+        error_rate: Probability that a call raises error_kind
+        error_kind: One of ERROR_KINDS
+        error_models: Models errors are injected for (default: all)
+        response_words: Words in each generated entry body
+        stream_chunks: Chunks a streamed response is split into
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        latency_per_1k_tokens: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_kind: str = "unavailable",
+        error_models: Optional[set] = None,
+        response_words: int = 300,
+        stream_chunks: int = 20,
+        seed: int = 0,
+    ):
+        if error_kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind: {error_kind}")
+        self.latency_seconds = latency_seconds
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.error_models = error_models
+        self.response_words = response_words
+        self.stream_chunks = stream_chunks
+        self.seed = seed
+        self.stats = {"calls": 0, "errors": 0, "prompt_tokens": 0}
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # google.generativeai module interface
+
+    def configure(self, api_key: Optional[str] = None, **kwargs: Any) -> None:
+        pass
+
+    def list_models(self) -> list:
+        return []
+
+    def GenerativeModel(self, model_name: str, **kwargs: Any) -> "StubModel":
+        return StubModel(self, model_name)
+
+    # Stub behaviour
+
+    def _rng(self, model_name: str, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{model_name}\x00{prompt}".encode()).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.stats["calls"] += 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def generate(self, model_name: str, prompt: str, stream: bool) -> Any:
+        rng = self._rng(model_name, prompt)
+        tokens = estimate_tokens(prompt)
+        latency = self.latency_seconds + self.latency_per_1k_tokens * tokens / 1000
+        latency *= 1 + self.jitter * (2 * rng.random() - 1)
+        with self._lock:
+            self.stats["prompt_tokens"] += tokens
+
+        if (
+            self.error_models is None or model_name in self.error_models
+        ) and rng.random() < self.error_rate:
+            time.sleep(latency / 2)
+            with self._lock:
+                self.stats["errors"] += 1
+            error_class = getattr(
+                gemini_processor.exceptions, ERROR_KINDS[self.error_kind]
+            )
+            raise error_class(f"Injected {self.error_kind} error from {model_name}")
+
+        text = json.dumps(self._entry(rng))
+        if not stream:
+            time.sleep(latency)
+            return StubResponse(text, StubUsage(tokens, estimate_tokens(text)))
+        return self._stream(text, latency)
+
+    def _stream(self, text: str, latency: float) -> Iterator[StubChunk]:
+        size = max(1, -(-len(text) // self.stream_chunks))
+        pieces = [text[i : i + size] for i in range(0, len(text), size)]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            yield StubChunk(piece)
+
+    def _entry(self, rng: random.Random) -> Dict[str, Any]:
+        body = " ".join(rng.choice(WORDS) for _ in range(self.response_words))
+        return {
+            "title": " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+            "topic": rng.choice(WORDS),
+            "tags": sorted({rng.choice(WORDS) for _ in range(3)}),
+            "rewritten_entry_body": f"I **{body}**.",
+        }
+
+
+class StubModel:
+    """Fake genai.GenerativeModel bound to a GeminiStub."""
+
+    def __init__(self, stub: GeminiStub, model_name: str):
+        self.stub = stub
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any) -> Any:
+        return self.stub.generate(self.model_name, prompt, stream)
+
+    def count_tokens(self, text: str) -> StubCountTokens:
+        return StubCountTokens(estimate_tokens(text))
+
+
+@contextmanager
+def installed_gemini_stub(stub: GeminiStub) -> Iterator[GeminiStub]:
+    """
+    Route src.gemini_processor's SDK calls to stub for the duration of the block.
+
+    The real google.api_core exceptions are kept, so retry and fallback logic
+    classifies injected errors exactly as it would live ones.
+    """
+    from google.api_core import exceptions as api_exceptions
+
+    saved = (gemini_processor.genai, gemini_processor.exceptions)
+    saved_key = os.environ.get("GEMINI_API_KEY")
+    gemini_processor.genai = stub
+    gemini_processor.exceptions = api_exceptions
+    os.environ["GEMINI_API_KEY"] = saved_key or "stub-key"
+    gemini_processor.reset_model_registry()
+    try:
+        yield stub
+    finally:
+        gemini_processor.reset_model_registry()
+        gemini_processor.genai, gemini_processor.exceptions = saved
+        if saved_key is None:
+            os.environ.pop("GEMINI_API_KEY", None)
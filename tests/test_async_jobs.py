@@ -0,0 +1,208 @@
+"""
+Tests for the async submit/poll job mode (local and AWS stand-in backends).
+"""
+
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import src.app as app
+import src.async_jobs as async_jobs
+
+CONVERSATION = {
+    "title": "Async Test",
+    "id": "conv-async",
+    "create_time": 1738124226.0,
+    "current_node": "b",
+    "mapping": {
+        "a": {
+            "parent": None,
+            "children": ["b"],
+            "message": {"author": {"role": "user"}, "content": {"parts": ["Hi"]}},
+        },
+        "b": {
+            "parent": "a",
+            "children": [],
+            "message": {"author": {"role": "assistant"}, "content": {"parts": ["Hey"]}},
+        },
+    },
+}
+ENTRY = {
+    "title": "Async Entry",
+    "topic": "Testing",
+    "tags": ["async"],
+    "rewritten_entry_body": "I realized **queues** decouple latency.",
+}
+
+
+@pytest.fixture
+def gemini_calls(monkeypatch):
+    calls = []
+
+    def fake_process(text):
+        calls.append(text)
+        if "FAIL" in text:
+            raise Exception("simulated Gemini failure")
+        return ENTRY
+
+    monkeypatch.setattr(app, "process_with_routing", fake_process)
+    return calls
+
+
+@pytest.fixture
+def credits(monkeypatch):
+    ledger = {"deducted": 0, "refunded": 0}
+
+    def deduct(user_id, amount=1):
+        ledger["deducted"] += amount
+        return True
+
+    def refund(user_id, amount=1):
+        ledger["refunded"] += amount
+        return True
+
+    monkeypatch.setattr(app, "check_and_deduct_credits", deduct)
+    monkeypatch.setattr(app, "refund_credits", refund)
+    return ledger
+
+
+@pytest.fixture
+def local_backend(tmp_path):
+    async_jobs.set_job_backend(async_jobs.LocalJobBackend(str(tmp_path)))
+    yield
+    async_jobs.set_job_backend(None)
+
+
+def _submit(conversation=CONVERSATION, user_id="async-user"):
+    body = {"user_id": user_id, "conversation": conversation}
+    return app.jobs_handler({"httpMethod": "POST", "body": json.dumps(body)}, None)
+
+
+def _poll(job_id, user_id="async-user"):
+    event = {
+        "httpMethod": "GET",
+        "pathParameters": {"job_id": job_id},
+        "queryStringParameters": {"user_id": user_id},
+    }
+    response = app.jobs_handler(event, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_submit_poll_and_worker_end_to_end(local_backend, gemini_calls, credits):
+    response = _submit()
+    assert response["statusCode"] == 202
+    job_id = json.loads(response["body"])["job_id"]
+    assert gemini_calls == []
+
+    status, job = _poll(job_id)
+    assert status == 200
+    assert job["status"] == "queued"
+
+    assert app.run_local_worker() == 1
+
+    status, job = _poll(job_id)
+    assert status == 200
+    assert job["status"] == "succeeded"
+    assert "queues" in job["result"]["markdown_content"]
+    assert job["metadata"]["title"] == "Async Entry"
+    assert credits == {"deducted": 1, "refunded": 0}
+
+
+def test_duplicate_delivery_does_not_rerun(local_backend, gemini_calls, credits):
+    job_id = json.loads(_submit()["body"])["job_id"]
+    record = {"messageId": "m1", "body": json.dumps({"job_id": job_id})}
+
+    app.worker_handler({"Records": [record]}, None)
+    result = app.worker_handler({"Records": [record]}, None)
+
+    assert result == {"batchItemFailures": []}
+    assert len(gemini_calls) == 1
+
+
+def test_job_running_elsewhere_is_retried_until_stale(
+    local_backend, gemini_calls, credits, monkeypatch
+):
+    job_id = json.loads(_submit()["body"])["job_id"]
+    record = {"messageId": "m1", "body": json.dumps({"job_id": job_id})}
+    assert async_jobs.get_job_backend().claim_job(job_id, async_jobs.time.time())
+
+    result = app.worker_handler({"Records": [record]}, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+    assert gemini_calls == []
+
+    # The first worker died; once its claim is stale the redelivery runs the job
+    monkeypatch.setattr(async_jobs, "JOB_STALE_SECONDS", -1)
+    assert app.worker_handler({"Records": [record]}, None) == {"batchItemFailures": []}
+    assert _poll(job_id)[1]["status"] == "succeeded"
+
+
+def test_failed_job_is_recorded_and_refunded(local_backend, gemini_calls, credits):
+    conversation = json.loads(json.dumps(CONVERSATION))
+    conversation["mapping"]["a"]["message"]["content"]["parts"] = ["FAIL please"]
+    job_id = json.loads(_submit(conversation)["body"])["job_id"]
+
+    app.run_local_worker()
+
+    status, job = _poll(job_id)
+    assert job["status"] == "failed"
+    assert "simulated Gemini failure" in job["error"]
+    assert credits["refunded"] == 1
+
+
+def test_other_users_and_unknown_jobs_are_not_found(local_backend, credits):
+    job_id = json.loads(_submit()["body"])["job_id"]
+
+    assert _poll(job_id, user_id="someone-else")[0] == 404
+    assert _poll("missing")[0] == 404
+
+
+def test_invalid_submission_is_rejected_without_charge(local_backend, credits):
+    response = app.jobs_handler({"httpMethod": "POST", "body": '{"foo": 1}'}, None)
+
+    assert response["statusCode"] == 400
+    assert credits["deducted"] == 0
+
+
+def test_aws_backend_round_trip(gemini_calls, credits):
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName="RIJG-Jobs",
+            KeySchema=[{"AttributeName": "job_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "job_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="rijg-jobs")
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        queue_url = sqs.create_queue(QueueName="rijg-jobs")["QueueUrl"]
+
+        async_jobs.set_job_backend(
+            async_jobs.AWSJobBackend(
+                table_name="RIJG-Jobs",
+                bucket_name="rijg-jobs",
+                queue_url=queue_url,
+                dynamodb_resource=dynamodb,
+                s3_client=s3,
+                sqs_client=sqs,
+            )
+        )
+        try:
+            job_id = json.loads(_submit()["body"])["job_id"]
+            messages = sqs.receive_message(QueueUrl=queue_url)["Messages"]
+            records = [
+                {"messageId": m["MessageId"], "body": m["Body"]} for m in messages
+            ]
+
+            assert app.worker_handler({"Records": records}, None) == {
+                "batchItemFailures": []
+            }
+            status, job = _poll(job_id)
+        finally:
+            async_jobs.set_job_backend(None)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["metadata"]["tags"] == ["async"]
@@ -0,0 +1,148 @@
+"""
+Tests for batch requests to lambda_handler.
+"""
+
+import json
+import time
+
+import pytest
+
+import src.app as app
+from src.model_router import RequestTooLargeError
+
+SAMPLE_CONVERSATION = {
+    "title": "Batch Test",
+    "id": "conv-1",
+    "create_time": 1738124226.0,
+    "mapping": {
+        "a": {
+            "message": {
+                "id": "a",
+                "author": {"role": "user"},
+                "create_time": 1,
+                "content": {"parts": ["Hello there"]},
+            }
+        },
+        "b": {
+            "message": {
+                "id": "b",
+                "author": {"role": "assistant"},
+                "create_time": 2,
+                "content": {"parts": ["General Kenobi"]},
+            }
+        },
+    },
+}
+
+GEMINI_LATENCY = 0.2
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    calls = []
+
+    def fake_process(text):
+        calls.append(text)
+        time.sleep(GEMINI_LATENCY)
+        if "FAIL" in text:
+            raise Exception("simulated Gemini failure")
+        if "HUGE" in text:
+            raise RequestTooLargeError("Conversation is too long to process")
+        return {
+            "title": "Entry",
+            "topic": "Testing",
+            "tags": ["test"],
+            "rewritten_entry_body": "I realized **batching** helps.",
+        }
+
+    monkeypatch.setattr(app, "process_with_routing", fake_process)
+    return calls
+
+
+@pytest.fixture
+def credit_calls(monkeypatch):
+    calls = []
+
+    def fake_deduct(user_id, amount=1):
+        calls.append((user_id, amount))
+        return True
+
+    monkeypatch.setattr(app, "check_and_deduct_credits", fake_deduct)
+    return calls
+
+
+def _batch_event(conversations, **extra):
+    return {
+        "body": json.dumps(
+            {"user_id": "batch-user", "conversations": conversations, **extra}
+        )
+    }
+
+
+def test_batch_runs_concurrently_and_deducts_once(fake_gemini, credit_calls):
+    conversations = [dict(SAMPLE_CONVERSATION, id=f"conv-{i}") for i in range(20)]
+
+    start = time.perf_counter()
+    response = app.lambda_handler(_batch_event(conversations, max_concurrency=20), None)
+    elapsed = time.perf_counter() - start
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["succeeded"] == 20
+    assert [r["metadata"]["source_id"] for r in body["results"]] == [
+        f"conv-{i}" for i in range(20)
+    ]
+    assert credit_calls == [("batch-user", 20)]
+    # Far below the 4s a sequential run would take
+    assert elapsed < GEMINI_LATENCY * 5
+
+
+def test_batch_reports_per_item_errors(fake_gemini, credit_calls):
+    failing = json.loads(json.dumps(SAMPLE_CONVERSATION).replace("Hello", "FAIL"))
+    response = app.lambda_handler(
+        _batch_event([SAMPLE_CONVERSATION, failing, "not a dict"]), None
+    )
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["succeeded"] == 1
+    assert [r["success"] for r in body["results"]] == [True, False, False]
+    assert body["results"][1]["error"] == "Processing failed"
+    assert body["results"][2]["error"] == "Invalid input"
+
+
+def test_batch_refunds_oversized_items(fake_gemini, credit_calls, monkeypatch):
+    refunds = []
+    monkeypatch.setattr(
+        app,
+        "refund_credits",
+        lambda user_id, amount=1: refunds.append((user_id, amount)) or True,
+    )
+    huge = json.loads(json.dumps(SAMPLE_CONVERSATION).replace("Hello", "HUGE"))
+    response = app.lambda_handler(_batch_event([SAMPLE_CONVERSATION, huge, huge]), None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert [r["success"] for r in body["results"]] == [True, False, False]
+    assert body["results"][1]["error"] == "Request too large"
+    assert body["refunded"] == 2
+    assert credit_calls == [("batch-user", 3)]
+    assert refunds == [("batch-user", 2)]
+
+
+def test_batch_insufficient_credits(fake_gemini, monkeypatch):
+    monkeypatch.setattr(
+        app, "check_and_deduct_credits", lambda user_id, amount=1: False
+    )
+
+    response = app.lambda_handler(_batch_event([SAMPLE_CONVERSATION]), None)
+
+    assert response["statusCode"] == 402
+    assert fake_gemini == []
+
+
+def test_batch_rejects_invalid_shape(fake_gemini, credit_calls):
+    response = app.lambda_handler(_batch_event([]), None)
+
+    assert response["statusCode"] == 400
+    assert credit_calls == []
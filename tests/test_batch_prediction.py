@@ -0,0 +1,165 @@
+"""
+Tests for the Gemini batch prediction bulk mode.
+"""
+
+import json
+
+import pytest
+
+from src.batch_prediction import (
+    ENTRIES_FILE,
+    REQUESTS_FILE,
+    BatchJobError,
+    LocalBatchBackend,
+    ingest_batch,
+    iter_batch_results,
+    main,
+    prepare_batch,
+    submit_batch,
+    wait_for_batch,
+)
+from src.gemini_processor import PROMPT_TEMPLATE, SYSTEM_INSTRUCTION
+from tests.bench_support import make_conversation
+
+
+@pytest.fixture(autouse=True)
+def stub(gemini_stub):
+    return gemini_stub
+
+
+@pytest.fixture
+def batch_dir(tmp_path):
+    conversations = [
+        make_conversation(messages=4, seed=i, conversation_id=f"conv-{i}")
+        for i in range(3)
+    ]
+    path = tmp_path / "batch"
+    assert prepare_batch(conversations, path) == 3
+    return path
+
+
+def journal_result(key, **fields):
+    entry = {
+        "title": f"Title {key}",
+        "topic": "Testing",
+        "tags": ["python"],
+        "rewritten_entry_body": "I realized **something**.",
+        **fields,
+    }
+    text = json.dumps(entry)
+    return {
+        "key": key,
+        "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]},
+    }
+
+
+def write_results(batch_dir, results):
+    path = batch_dir / "results.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in results), encoding="utf-8")
+    return path
+
+
+def test_request_file_matches_the_synchronous_prompt(batch_dir):
+    lines = (batch_dir / REQUESTS_FILE).read_text(encoding="utf-8").splitlines()
+    request = json.loads(lines[0])
+
+    assert request["key"] == "conv-0"
+    body = request["request"]
+    assert body["system_instruction"]["parts"][0]["text"] == SYSTEM_INSTRUCTION
+    prompt = body["contents"][0]["parts"][0]["text"]
+    assert prompt.startswith(PROMPT_TEMPLATE.split("{text}")[0])
+    schema = body["generation_config"]["response_schema"]
+    assert schema["type"] == "OBJECT"
+    assert schema["properties"]["tags"]["items"]["type"] == "STRING"
+    entry = json.loads((batch_dir / ENTRIES_FILE).read_text().splitlines()[0])
+    assert entry["source_id"] == "conv-0" and "messages" not in entry
+
+
+def test_local_backend_runs_the_whole_flow_offline(batch_dir, tmp_path, stub):
+    backend = LocalBatchBackend(str(tmp_path / "jobs"))
+
+    submit_batch(batch_dir, backend, "gemini-2.5-flash")
+    wait_for_batch(batch_dir, backend, poll_seconds=0)
+
+    written = {}
+    stats = ingest_batch(
+        batch_dir, lambda md, meta: written.update({meta["source_id"]: md})
+    )
+
+    assert stub.stats["calls"] == 3
+    assert stats == {"succeeded": 3, "failed": 0}
+    assert all(md.startswith("---") for md in written.values())
+    assert "conv-2" in written["conv-2"]
+
+
+def test_invalid_missing_and_failed_results_are_reported(batch_dir):
+    results = write_results(
+        batch_dir,
+        [
+            journal_result("conv-2"),
+            {"key": "conv-0", "error": {"code": 429, "message": "quota"}},
+            journal_result("conv-0"),
+            {"key": "unknown", "response": {}},
+        ],
+    )
+    results_by_key = {r["source_id"]: r for r in iter_batch_results(batch_dir, results)}
+
+    assert results_by_key["conv-2"]["success"]
+    assert results_by_key["conv-2"]["metadata"]["title"] == "Title conv-2"
+    assert "quota" in results_by_key["conv-0"]["message"]
+    assert results_by_key["conv-1"]["error"] == "Missing result"
+    assert "unknown" not in results_by_key
+
+
+def test_malformed_result_lines_fail_their_request_only(batch_dir):
+    path = write_results(batch_dir, [journal_result("conv-0")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(journal_result("conv-1"))[:60] + "\n")
+        f.write("not json\n")
+        f.write(json.dumps(journal_result("conv-2")) + "\n")
+
+    results_by_key = {r["source_id"]: r for r in iter_batch_results(batch_dir, path)}
+
+    assert results_by_key["conv-0"]["success"]
+    assert results_by_key["conv-1"]["error"] == "Invalid result"
+    assert results_by_key["conv-2"]["success"]
+    assert len(results_by_key) == 3
+
+
+def test_incomplete_entries_fail_validation(batch_dir):
+    bad = journal_result("conv-0")
+    bad["response"]["candidates"][0]["content"]["parts"][0]["text"] = '{"title": "x"}'
+    results = write_results(batch_dir, [bad])
+
+    first = next(iter_batch_results(batch_dir, results))
+    assert not first["success"]
+    assert "Missing required field" in first["message"]
+
+
+def test_failed_jobs_raise(batch_dir):
+    class FailingBackend:
+        def submit(self, requests_path, model_name):
+            return "job-1"
+
+        def poll(self, job_id):
+            return "FAILED"
+
+    backend = FailingBackend()
+    submit_batch(batch_dir, backend)
+    with pytest.raises(BatchJobError):
+        wait_for_batch(batch_dir, backend, poll_seconds=0)
+
+
+def test_prepare_limit_stops_reading_the_export(tmp_path, monkeypatch):
+    read = []
+
+    def conversations(path):
+        for i in range(5):
+            read.append(i)
+            yield make_conversation(messages=4, seed=i, conversation_id=f"conv-{i}")
+
+    monkeypatch.setattr("src.batch_prediction.iter_conversations", conversations)
+
+    assert main(["prepare", "export.json", str(tmp_path / "b"), "--limit", "2"]) == 0
+    assert read == [0, 1]
+    assert len((tmp_path / "b" / REQUESTS_FILE).read_text().splitlines()) == 2
@@ -0,0 +1,97 @@
+"""
+Tests for the offline benchmark suite and its Gemini stub.
+"""
+
+import json
+
+import pytest
+
+import src.app as app
+import src.gemini_processor as gemini_processor
+from src.model_health import reset_model_health
+from src.result_cache import set_result_cache
+from tests.bench_pipeline import STAGES, compare, run_scenario
+from tests.bench_support import make_conversation
+from tests.gemini_stub import GeminiStub, installed_gemini_stub
+
+TINY = {
+    "messages": 6,
+    "words_per_message": 10,
+    "branch_probability": 0.5,
+    "conversations": 3,
+}
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setenv("AWS_SAM_LOCAL", "true")
+    set_result_cache(None)
+    reset_model_health()
+    yield
+    reset_model_health()
+
+
+def test_stub_is_deterministic():
+    first = GeminiStub(seed=3).generate("m", "prompt", stream=False).text
+    second = GeminiStub(seed=3).generate("m", "prompt", stream=False).text
+    other = GeminiStub(seed=4).generate("m", "prompt", stream=False).text
+
+    assert first == second != other
+    assert set(json.loads(first)) == set(gemini_processor.RESPONSE_SCHEMA["required"])
+
+
+def test_stub_runs_the_real_handler():
+    event = {"body": json.dumps({"conversation": make_conversation(messages=6)})}
+
+    with installed_gemini_stub(GeminiStub()) as stub:
+        response = app.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["markdown_content"].startswith("---")
+    assert stub.stats["calls"] == 1
+
+
+def test_injected_errors_fall_back_to_the_next_model():
+    stub = GeminiStub(
+        error_rate=1.0,
+        error_kind="invalid",
+        error_models={gemini_processor.PRIMARY_MODEL},
+    )
+
+    with installed_gemini_stub(stub):
+        result = gemini_processor.process_with_gemini_fallback("some text")
+
+    assert result["title"]
+    assert stub.stats["errors"] == 1
+    assert stub.stats["calls"] == 2
+
+
+def test_run_scenario_reports_every_stage():
+    metrics = run_scenario("tiny", GeminiStub(), shape=TINY)
+
+    assert set(metrics["stages"]) == set(STAGES)
+    assert metrics["failures"] == metrics["batch_failures"] == 0
+    assert metrics["throughput_per_s"] > 0
+    assert metrics["peak_memory_mib"] > 0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {
+        "stages": {"parse": {"p50_ms": 10.0}, "render": {"p50_ms": 0.1}},
+        "throughput_per_s": 100.0,
+        "batch_throughput_per_s": 200.0,
+        "peak_memory_mib": 4.0,
+    }
+    current = {
+        "stages": {"parse": {"p50_ms": 15.0}, "render": {"p50_ms": 0.3}},
+        "throughput_per_s": 95.0,
+        "batch_throughput_per_s": 120.0,
+        "peak_memory_mib": 4.1,
+    }
+
+    regressions = compare(current, baseline, tolerance=0.25, min_delta_ms=1.0)
+
+    # render tripled but by less than min_delta_ms; throughput is within tolerance
+    assert len(regressions) == 2
+    assert regressions[0].startswith("parse p50")
+    assert regressions[1].startswith("batch_throughput_per_s")
@@ -0,0 +1,115 @@
+"""
+Tests for map-reduce journaling of long conversations.
+"""
+
+import threading
+import time
+
+import src.chunked_processor as chunked
+from src.result_cache import MemoryCacheBackend, ResultCache, set_result_cache
+from src.token_estimator import tokens_to_chars
+
+ENTRY = {
+    "title": "Entry",
+    "topic": "Long session",
+    "tags": ["long"],
+    "rewritten_entry_body": "I realized a lot.",
+}
+
+
+def _conversation(messages, size):
+    return "\n\n".join(
+        f"{'User' if i % 2 == 0 else 'Assistant'}: message {i} " + "x" * size
+        for i in range(messages)
+    )
+
+
+def test_split_respects_budget_and_message_boundaries():
+    text = _conversation(40, 300)
+
+    segments = chunked.split_at_message_boundaries(text, max_tokens=500)
+
+    assert len(segments) > 1
+    assert all(len(s) <= tokens_to_chars(500) for s in segments)
+    assert all(s.startswith(("User: ", "Assistant: ")) for s in segments)
+    assert "\n\n".join(segments) == text
+
+
+def test_oversized_message_is_split():
+    text = "User: " + "\n\n".join(["y" * 900] * 5)
+
+    segments = chunked.split_at_message_boundaries(text, max_tokens=250)
+
+    assert len(segments) == 5
+    assert all(len(s) <= 1000 for s in segments)
+
+
+def test_long_conversation_maps_in_parallel_then_reduces(monkeypatch):
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_summarize(segment, index, total, models):
+        with lock:
+            in_flight.append(index)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(index)
+        return f"notes {index}/{total}"
+
+    reduce_calls = []
+    monkeypatch.setattr(chunked, "summarize_segment", fake_summarize)
+    monkeypatch.setattr(
+        chunked,
+        "process_with_gemini_fallback",
+        lambda text, **kwargs: reduce_calls.append((text, kwargs)) or ENTRY,
+    )
+
+    result = chunked.map_reduce_journal(
+        _conversation(60, 400), segment_tokens=1000, max_parallel=3
+    )
+
+    assert result == ENTRY
+    assert max(peak) == 3
+    notes, kwargs = reduce_calls[0]
+    assert kwargs == {
+        "prompt_template": chunked.REDUCE_PROMPT_TEMPLATE,
+        "models": list(chunked.DEFAULT_MODELS),
+    }
+    total = notes.count("## Segment")
+    assert total > 3
+    assert notes.index("notes 1/") < notes.index(f"notes {total}/")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_segment_summary_is_cached_under_the_model_that_answered(monkeypatch):
+    calls = []
+
+    def fake_generate(model_name, prompt):
+        calls.append(model_name)
+        if model_name == "primary" and len(calls) == 1:
+            raise Exception("primary unavailable")
+        return FakeResponse(f"notes from {model_name}")
+
+    monkeypatch.setattr(chunked, "get_api_key", lambda: "key")
+    monkeypatch.setattr(chunked, "get_model", lambda name, *args: name)
+    monkeypatch.setattr(chunked, "generate_with_retries", fake_generate)
+    set_result_cache(ResultCache(MemoryCacheBackend()))
+    try:
+        models = ["primary", "secondary"]
+        first = chunked.summarize_segment("User: hi", 1, 1, models)
+        second = chunked.summarize_segment("User: hi", 1, 1, models)
+        third = chunked.summarize_segment("User: hi", 1, 1, models)
+    finally:
+        set_result_cache(None)
+
+    # The fallback's answer is not served as the primary model's; once the
+    # primary answers, its own result is cached
+    assert first == "notes from secondary"
+    assert second == third == "notes from primary"
+    assert calls == ["primary", "secondary", "primary"]
@@ -0,0 +1,76 @@
+"""
+Tests for the resumable bulk-processing CLI.
+"""
+
+import json
+
+import pytest
+
+from src.cli import CHECKPOINT_FILE, RESULTS_FILE, main, run_bulk
+from src.ingest_manifest import SQLiteManifest
+from src.model_health import reset_model_health
+from tests.bench_support import make_conversation
+from tests.gemini_stub import GeminiStub, installed_gemini_stub
+
+
+@pytest.fixture(autouse=True)
+def stub(gemini_stub):
+    return gemini_stub
+
+
+@pytest.fixture
+def export_path(tmp_path):
+    conversations = [
+        make_conversation(messages=4, seed=i, conversation_id=f"conv-{i}")
+        for i in range(4)
+    ]
+    path = tmp_path / "conversations.json"
+    path.write_text(json.dumps(conversations), encoding="utf-8")
+    return path
+
+
+def read_results(output):
+    with open(output / RESULTS_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_writes_entries_results_and_checkpoint(export_path, tmp_path, workers, stub):
+    output = tmp_path / "out"
+
+    stats = run_bulk(export_path, output, workers=workers, gemini_concurrency=2)
+
+    assert (stats["succeeded"], stats["failed"]) == (4, 0)
+    assert stub.stats["calls"] == 4
+    entry = (output / "entries" / "conv-0.md").read_text(encoding="utf-8")
+    assert entry.startswith("---")
+    assert {r["source_id"] for r in read_results(output)} == {
+        f"conv-{i}" for i in range(4)
+    }
+    assert len(SQLiteManifest(str(output / CHECKPOINT_FILE))) == 4
+
+
+def test_rerun_resumes_after_the_last_checkpoint(export_path, tmp_path, stub):
+    output = tmp_path / "out"
+
+    run_bulk(export_path, output, workers=0, limit=2)
+    stats = run_bulk(export_path, output, workers=0)
+
+    assert stub.stats["calls"] == 4
+    assert stats["unchanged"] == 2
+    resumed = {r["source_id"] for r in read_results(output)[2:]}
+    assert resumed == {"conv-2", "conv-3"}
+
+
+def test_failures_are_logged_and_retried(export_path, tmp_path):
+    output = tmp_path / "out"
+
+    with installed_gemini_stub(GeminiStub(error_rate=1.0, error_kind="invalid")):
+        stats = run_bulk(export_path, output, workers=0)
+    assert (stats["succeeded"], stats["failed"]) == (0, 4)
+    assert not any(r["success"] for r in read_results(output))
+
+    # A rerun is a new process, with closed circuits
+    reset_model_health()
+    assert main([str(export_path), "--output", str(output), "--workers", "0"]) == 0
+    assert len(list((output / "entries").glob("*.md"))) == 4
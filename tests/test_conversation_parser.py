@@ -0,0 +1,132 @@
+"""Tests for branch selection in conversation_parser."""
+
+import json
+
+import pytest
+
+from src.conversation_parser import parse_conversation, parse_conversation_messages
+from tests.bench_support import make_conversation
+
+
+def _node(node_id, parent, children, role, text, create_time):
+    return {
+        "id": node_id,
+        "parent": parent,
+        "children": children,
+        "message": {
+            "id": node_id,
+            "author": {"role": role},
+            "create_time": create_time,
+            "content": {"parts": [text]},
+        },
+    }
+
+
+def _branched_conversation(current_node="a2"):
+    # root -> u1 -> {a1 (abandoned) -> u2 -> a3, a2 (regenerated, active)}
+    return {
+        "title": "Branched",
+        "create_time": 1700000000,
+        "current_node": current_node,
+        "mapping": {
+            "root": {"id": "root", "parent": None, "children": ["u1"]},
+            "u1": _node("u1", "root", ["a1", "a2"], "user", "Question", 1),
+            "a1": _node("a1", "u1", ["u2"], "assistant", "First answer", 2),
+            "u2": _node("u2", "a1", ["a3"], "user", "Follow-up", 4),
+            "a3": _node("a3", "u2", [], "assistant", "Old reply", 5),
+            "a2": _node("a2", "u1", [], "assistant", "Regenerated answer", 3),
+        },
+    }
+
+
+def _texts(result):
+    return [block.split(": ", 1)[1] for block in result["raw_text"].split("\n\n")]
+
+
+def test_active_mode_follows_current_node():
+    result = parse_conversation(_branched_conversation(), branch_mode="active")
+
+    assert _texts(result) == ["Question", "Regenerated answer"]
+
+
+def test_active_mode_without_current_node_takes_latest_children():
+    conversation = _branched_conversation(current_node=None)
+
+    result = parse_conversation(conversation, branch_mode="active")
+
+    assert _texts(result) == ["Question", "Regenerated answer"]
+
+
+def test_longest_mode_picks_deepest_branch():
+    result = parse_conversation(_branched_conversation(), branch_mode="longest")
+
+    assert _texts(result) == ["Question", "First answer", "Follow-up", "Old reply"]
+
+
+def test_all_mode_keeps_every_message_in_time_order():
+    result = parse_conversation(_branched_conversation(), branch_mode="all")
+
+    assert _texts(result) == [
+        "Question",
+        "First answer",
+        "Regenerated answer",
+        "Follow-up",
+        "Old reply",
+    ]
+
+
+def test_unknown_branch_mode_raises():
+    with pytest.raises(ValueError):
+        parse_conversation(_branched_conversation(), branch_mode="newest")
+
+
+def test_parent_cycle_terminates():
+    conversation = _branched_conversation()
+    conversation["mapping"]["root"]["parent"] = "a2"
+
+    result = parse_conversation(conversation, branch_mode="active")
+
+    assert "Regenerated answer" in result["raw_text"]
+
+
+def test_synthetic_active_branch_excludes_side_branches():
+    conversation = make_conversation(messages=50, branch_probability=1.0)
+
+    result = parse_conversation(conversation)
+
+    assert result["raw_text"].count("\n\n") == 49
+
+
+def test_raw_text_and_transcript_share_message_order_and_skip_other_roles():
+    conversation = _branched_conversation()
+    conversation["mapping"]["u1"]["message"]["author"]["role"] = "system"
+    conversation["mapping"]["a2"]["children"] = ["u3"]
+    conversation["mapping"]["u3"] = _node("u3", "a2", [], "user", "Thanks", 6)
+    conversation["current_node"] = "u3"
+
+    result = parse_conversation(conversation)
+
+    assert result["raw_text"] == "Assistant: Regenerated answer\n\nUser: Thanks"
+    assert result["transcript"] == (
+        "**Assistant:** Regenerated answer\n\n**User:** Thanks"
+    )
+
+
+def test_mapping_without_tree_links_keeps_all_messages():
+    mapping = {
+        node_id: {"message": node["message"]}
+        for node_id, node in _branched_conversation()["mapping"].items()
+        if node_id in ("u1", "a2")
+    }
+
+    result = parse_conversation({"title": "Flat", "mapping": mapping})
+
+    assert _texts(result) == ["Question", "Regenerated answer"]
+
+
+def test_parsed_data_is_serializable_and_messages_come_separately():
+    parsed, messages = parse_conversation_messages(_branched_conversation())
+
+    assert parse_conversation(_branched_conversation()) == parsed
+    assert json.loads(json.dumps(parsed)) == parsed
+    assert [m.text for m in messages] == ["Question", "Regenerated answer"]
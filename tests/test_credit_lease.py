@@ -0,0 +1,167 @@
+"""
+Tests for credit leases against a local DynamoDB stand-in (moto).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import src.app as app
+from src.credit_lease import CreditLeaseManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _item(table, user_id):
+    return table.get_item(Key={"user_id": user_id})["Item"]
+
+
+def _manager(table, clock=None, **kwargs):
+    return CreditLeaseManager(
+        table,
+        free_credits=app.DEFAULT_FREE_CREDITS,
+        fallback_deduct=app.deduct_credits,
+        clock=clock or FakeClock(),
+        **kwargs,
+    )
+
+
+def test_requests_are_served_from_lease(credits_table):
+    credits_table.put_item(Item={"user_id": "power", "credit_balance": 10})
+    manager = _manager(credits_table, lease_size=3)
+
+    assert all(manager.acquire("power") for _ in range(5))
+
+    # Two leases reserved; the first was fully used and closed
+    assert manager.stats["reservations"] == 2
+    assert manager.stats["served_from_lease"] == 3
+    item = _item(credits_table, "power")
+    assert item["credit_balance"] == 4
+    assert item["leased_credits"] == 3
+
+    manager.return_all()
+    item = _item(credits_table, "power")
+    assert item["credit_balance"] == 5
+    assert item["leased_credits"] == 0
+
+
+def test_expired_lease_returns_unused_credits(credits_table):
+    clock = FakeClock()
+    manager = _manager(credits_table, clock=clock, lease_size=4, lease_ttl_seconds=60)
+
+    assert manager.acquire("new-user")
+    assert _item(credits_table, "new-user")["credit_balance"] == 1
+
+    clock.now += 61
+    manager.return_expired()
+
+    item = _item(credits_table, "new-user")
+    assert item["credit_balance"] == 4
+    assert item["leased_credits"] == 0
+
+
+def test_falls_back_to_exact_deduction_when_balance_is_low(credits_table):
+    credits_table.put_item(Item={"user_id": "low", "credit_balance": 2})
+    manager = _manager(credits_table, lease_size=10)
+
+    assert manager.acquire("low")
+    assert manager.acquire("low")
+    assert not manager.acquire("low")
+    assert manager.stats["reservations"] == 0
+    assert _item(credits_table, "low")["credit_balance"] == 0
+
+
+def test_container_death_leaves_lease_auditable(credits_table):
+    credits_table.put_item(Item={"user_id": "user", "credit_balance": 20})
+    manager = _manager(credits_table, lease_size=5)
+    manager.acquire("user")
+
+    # Container killed: no return_all() - the lease stays recorded on the item
+    item = _item(credits_table, "user")
+    assert item["credit_balance"] == 15
+    assert item["leased_credits"] == 5
+
+
+def test_concurrent_users_and_expiry_sweeps(credits_table):
+    clock = FakeClock()
+    manager = _manager(credits_table, clock=clock, lease_size=2, lease_ttl_seconds=0)
+    users = [f"user-{i}" for i in range(20)]
+    for user_id in users:
+        credits_table.put_item(Item={"user_id": user_id, "credit_balance": 50})
+
+    def work(user_id):
+        for _ in range(5):
+            assert manager.acquire(user_id)
+            manager.return_expired()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, users))
+    manager.return_all()
+
+    for user_id in users:
+        item = _item(credits_table, user_id)
+        assert item["credit_balance"] == 45
+        assert item["leased_credits"] == 0
+
+
+def test_lease_of_a_dead_container_is_reclaimed_once(credits_table):
+    credits_table.put_item(Item={"user_id": "user", "credit_balance": 6})
+    dead_clock, clock = FakeClock(), FakeClock()
+    options = dict(lease_size=4, lease_ttl_seconds=60, usage_flush_credits=1)
+    dead = _manager(credits_table, clock=dead_clock, **options)
+    live = _manager(credits_table, clock=clock, **options)
+    assert dead.acquire("user")
+
+    # Still within the lease's lifetime: nothing is reclaimed
+    assert live.acquire("user")
+    assert _item(credits_table, "user")["credit_balance"] == 1
+    assert live.stats["reclaims"] == 0
+
+    clock.now += 60 + 61
+    assert live.acquire("user")
+
+    # The dead lease's 3 unused credits went back to the balance, and the
+    # retried reservation took a new lease from it
+    item = _item(credits_table, "user")
+    assert live.stats["reclaims"] == 1
+    assert item["credit_balance"] == 0
+    assert item["leased_credits"] == 4
+    assert item["lease_epoch"] == 1
+
+    # The "dead" container wakes up: its reclaimed lease is dropped, not returned
+    dead.return_all()
+    live.return_all()
+    item = _item(credits_table, "user")
+    assert item["credit_balance"] == 3
+    assert item["leased_credits"] == 0
+    assert item["lease_unused"] == 0
+
+
+def test_killed_container_gets_unused_credits_back(credits_table):
+    credits_table.put_item(Item={"user_id": "user", "credit_balance": 10})
+    dead_clock, clock = FakeClock(), FakeClock()
+    options = dict(lease_size=10, lease_ttl_seconds=60, usage_flush_credits=2)
+    dead = _manager(credits_table, clock=dead_clock, **options)
+    live = _manager(credits_table, clock=clock, **options)
+
+    # Three requests served, two of them flushed, then the container is killed
+    assert all(dead.acquire("user") for _ in range(3))
+    assert dead.stats["usage_flushes"] == 1
+    assert _item(credits_table, "user")["lease_unused"] == 8
+
+    clock.now += 60 + 61
+    assert live.acquire("user")
+
+    # 8 unused credits are refunded; the reservation retry is still short, so
+    # the request is deducted exactly
+    item = _item(credits_table, "user")
+    assert live.stats["reclaims"] == 1
+    assert item["credit_balance"] == 7
+    assert item["leased_credits"] == 0
+
+    dead.return_all()
+    assert _item(credits_table, "user")["credit_balance"] == 7
@@ -0,0 +1,72 @@
+"""
+Tests for atomic credit deduction against a local DynamoDB stand-in (moto).
+"""
+
+import threading
+
+import pytest
+
+import src.app as app
+
+
+@pytest.fixture
+def dynamodb_calls(credits_table):
+    calls = []
+    credits_table.meta.client.meta.events.register(
+        "before-call.dynamodb", lambda model, **kwargs: calls.append(model.name)
+    )
+    return calls
+
+
+def _balance(table, user_id):
+    return table.get_item(Key={"user_id": user_id})["Item"]["credit_balance"]
+
+
+def test_new_user_gets_free_credits_in_one_call(credits_table, dynamodb_calls):
+    assert app.deduct_credits("new-user") == app.DEFAULT_FREE_CREDITS - 1
+    assert dynamodb_calls == ["UpdateItem"]
+
+
+def test_one_call_per_request(credits_table, dynamodb_calls):
+    credits_table.put_item(Item={"user_id": "user", "credit_balance": 100})
+    dynamodb_calls.clear()
+
+    for _ in range(50):
+        assert app.check_and_deduct_credits("user")
+
+    assert dynamodb_calls == ["UpdateItem"] * 50
+    assert _balance(credits_table, "user") == 50
+
+
+def test_insufficient_credits(credits_table):
+    credits_table.put_item(Item={"user_id": "broke", "credit_balance": 0})
+
+    assert app.deduct_credits("broke") is None
+    assert app.check_and_deduct_credits("broke") is False
+    assert _balance(credits_table, "broke") == 0
+
+
+def test_batch_amount_larger_than_free_credits(credits_table):
+    assert app.deduct_credits("new-user", amount=app.DEFAULT_FREE_CREDITS + 1) is None
+    assert "Item" not in credits_table.get_item(Key={"user_id": "new-user"})
+
+    credits_table.put_item(Item={"user_id": "rich", "credit_balance": 20})
+    assert app.deduct_credits("rich", amount=20) == 0
+
+
+def test_concurrent_requests_never_overspend(credits_table):
+    results = []
+    barrier = threading.Barrier(40)
+
+    def request():
+        barrier.wait()
+        results.append(app.check_and_deduct_credits("hammered"))
+
+    threads = [threading.Thread(target=request) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == app.DEFAULT_FREE_CREDITS
+    assert _balance(credits_table, "hammered") == 0
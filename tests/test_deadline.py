@@ -0,0 +1,151 @@
+"""
+Tests for deadline propagation from the Lambda context.
+"""
+
+import json
+import time
+
+import pytest
+
+import src.app as app
+import src.gemini_processor as gemini_processor
+from src.deadline import (
+    DEADLINE_RESERVE_SECONDS,
+    Deadline,
+    DeadlineExceededError,
+    check_deadline,
+    deadline_scope,
+)
+from src.model_health import CLOSED, get_circuit_breaker, reset_model_health
+from src.rate_limiter import set_rate_limiter
+
+CONVERSATION = {
+    "title": "Deadline Test",
+    "id": "conv-deadline",
+    "create_time": 1738124226.0,
+    "current_node": "b",
+    "mapping": {
+        "a": {
+            "parent": None,
+            "children": ["b"],
+            "message": {"author": {"role": "user"}, "content": {"parts": ["Hi"]}},
+        },
+        "b": {
+            "parent": "a",
+            "children": [],
+            "message": {"author": {"role": "assistant"}, "content": {"parts": ["Hey"]}},
+        },
+    },
+}
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.expires_at = time.monotonic() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.expires_at - time.monotonic()) * 1000)
+
+
+def _context_with_budget(seconds):
+    """Lambda context leaving `seconds` for the pipeline after the reserve."""
+    return FakeContext((seconds + DEADLINE_RESERVE_SECONDS) * 1000)
+
+
+def _slow_gemini(seconds):
+    def fake_process(text):
+        time.sleep(seconds)
+        check_deadline("next Gemini attempt")
+        return {
+            "title": "Entry",
+            "topic": "Testing",
+            "tags": [],
+            "rewritten_entry_body": "Body",
+        }
+
+    return fake_process
+
+
+def test_deadline_from_lambda_context():
+    deadline = Deadline.from_lambda_context(FakeContext(10000), reserve_seconds=2)
+
+    assert 7.5 < deadline.remaining() <= 8
+    assert Deadline.from_lambda_context(None) is None
+
+
+def test_retry_backoff_never_sleeps_past_deadline(monkeypatch):
+    gemini_processor.load_genai()
+    errors = gemini_processor.exceptions
+    sleeps = []
+    monkeypatch.setattr(gemini_processor.time, "sleep", sleeps.append)
+    monkeypatch.setattr(gemini_processor, "backoff_delay", lambda *args: 5.0)
+    set_rate_limiter(None)
+
+    class FlakyModel:
+        def generate_content(self, prompt, safety_settings=None, request_options=None):
+            self.timeout = request_options["timeout"]
+            raise errors.ServiceUnavailable("503")
+
+    model = FlakyModel()
+    with deadline_scope(Deadline(1.0)):
+        with pytest.raises(DeadlineExceededError):
+            gemini_processor.generate_with_retries(model, "prompt")
+
+    assert sleeps == []
+    assert 0 < model.timeout <= 1.0
+
+
+def test_deadline_stops_fallback_without_tripping_breaker(monkeypatch):
+    calls = []
+
+    def fake_process(text, model_name, prompt_template):
+        calls.append(model_name)
+        raise DeadlineExceededError("out of time")
+
+    monkeypatch.setattr(gemini_processor, "process_with_gemini", fake_process)
+    reset_model_health()
+
+    with pytest.raises(DeadlineExceededError):
+        gemini_processor.process_with_gemini_fallback("hi")
+
+    assert calls == [gemini_processor.PRIMARY_MODEL]
+    assert get_circuit_breaker(gemini_processor.PRIMARY_MODEL).failures == 0
+    assert get_circuit_breaker(gemini_processor.PRIMARY_MODEL).state == CLOSED
+    reset_model_health()
+
+
+def test_handler_returns_504_and_refunds_credit(credits_table, monkeypatch):
+    monkeypatch.setattr(app, "process_with_routing", _slow_gemini(0.3))
+    event = {"body": json.dumps({"user_id": "late", "conversation": CONVERSATION})}
+
+    start = time.monotonic()
+    response = app.lambda_handler(event, _context_with_budget(0.1))
+
+    assert time.monotonic() - start < 1
+    assert response["statusCode"] == 504
+    assert json.loads(response["body"])["refunded"] is True
+    item = credits_table.get_item(Key={"user_id": "late"})["Item"]
+    assert item["credit_balance"] == app.DEFAULT_FREE_CREDITS
+
+
+def test_handler_with_time_left_succeeds(credits_table, monkeypatch):
+    monkeypatch.setattr(app, "process_with_routing", _slow_gemini(0.01))
+    event = {"body": json.dumps({"user_id": "on-time", "conversation": CONVERSATION})}
+
+    response = app.lambda_handler(event, _context_with_budget(5))
+
+    assert response["statusCode"] == 200
+
+
+def test_batch_deadline_reaches_worker_threads(credits_table, monkeypatch):
+    monkeypatch.setattr(app, "process_with_routing", _slow_gemini(0.3))
+    body = {"user_id": "batch", "conversations": [CONVERSATION] * 3}
+
+    response = app.lambda_handler({"body": json.dumps(body)}, _context_with_budget(0.1))
+
+    payload = json.loads(response["body"])
+    assert response["statusCode"] == 504
+    assert payload["refunded"] == 3
+    assert {r["error"] for r in payload["results"]} == {"Deadline exceeded"}
+    item = credits_table.get_item(Key={"user_id": "batch"})["Item"]
+    assert item["credit_balance"] == app.DEFAULT_FREE_CREDITS
@@ -0,0 +1,50 @@
+"""
+Tests for the streaming conversations.json reader.
+"""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from src.export_reader import iter_conversations, iter_parsed_conversations
+
+SELECTION_PATH = Path(__file__).parent / "last_test_selection.json"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1024 * 1024])
+def test_stream_matches_json_load(chunk_size):
+    with open(SELECTION_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    streamed = list(iter_conversations(SELECTION_PATH, chunk_size=chunk_size))
+
+    assert streamed == expected
+
+
+def test_stream_is_lazy():
+    text = '[{"id": "a"}, {"id": "b"}, not json'
+    conversations = iter_conversations(io.StringIO(text), chunk_size=4)
+
+    assert next(conversations) == {"id": "a"}
+    assert next(conversations) == {"id": "b"}
+    with pytest.raises(ValueError):
+        next(conversations)
+
+
+def test_single_object_and_empty_array():
+    assert list(iter_conversations(io.StringIO('  {"id": "x"} '))) == [{"id": "x"}]
+    assert list(iter_conversations(io.StringIO(" [ ] "))) == []
+
+
+def test_unterminated_array_raises():
+    with pytest.raises(ValueError):
+        list(iter_conversations(io.StringIO('[{"id": "a"}'), chunk_size=3))
+
+
+def test_parsed_conversations():
+    parsed = list(iter_parsed_conversations(SELECTION_PATH))
+
+    assert len(parsed) == 10
+    assert all(p["raw_text"] for p in parsed)
@@ -0,0 +1,47 @@
+"""
+Tests for Gemini model reuse in the processor module.
+"""
+
+import src.gemini_processor as gemini_processor
+
+
+class _FakeGenai:
+    def __init__(self):
+        self.configure_calls = []
+        self.models_built = 0
+        self.list_calls = 0
+
+    def configure(self, api_key):
+        self.configure_calls.append(api_key)
+
+    def GenerativeModel(self, **kwargs):
+        self.models_built += 1
+        return object()
+
+    def list_models(self):
+        self.list_calls += 1
+        return []
+
+
+def test_models_are_reused_until_key_changes(monkeypatch):
+    fake = _FakeGenai()
+    monkeypatch.setattr(gemini_processor, "genai", fake)
+    gemini_processor.reset_model_registry()
+
+    first = gemini_processor.get_model("gemini-2.5-flash", "key-1")
+    assert gemini_processor.get_model("gemini-2.5-flash", "key-1") is first
+    gemini_processor.get_model("gemini-2.0-flash-exp", "key-1")
+    gemini_processor.get_model("gemini-2.5-flash", "key-1", {"temperature": 0})
+
+    assert fake.configure_calls == ["key-1"]
+    assert fake.models_built == 3
+
+    rotated = gemini_processor.get_model("gemini-2.5-flash", "key-2")
+    assert rotated is not first
+    assert fake.configure_calls == ["key-1", "key-2"]
+
+    gemini_processor.list_available_models()
+    gemini_processor.list_available_models()
+    assert fake.list_calls == 1
+
+    gemini_processor.reset_model_registry()
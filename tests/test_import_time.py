@@ -0,0 +1,80 @@
+"""
+Cold-start guard: importing src.app must stay cheap.
+
+Heavy SDKs (boto3, google.generativeai, jinja2) are loaded lazily on first use or
+by a warm-up event, so the handler module itself should import in milliseconds.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import src.app as app
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# Cumulative import time budget for src.app, in microseconds
+IMPORT_BUDGET_US = int(os.environ.get("RIJG_IMPORT_BUDGET_US", "150000"))
+
+HEAVY_MODULES = [
+    "boto3",
+    "botocore",
+    "google.generativeai",
+    "google.api_core",
+    "jinja2",
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S.*)$")
+
+
+def _run_python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_does_not_load_heavy_sdks():
+    result = _run_python(
+        "import json, sys, src.app; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+
+    assert json.loads(result.stdout) == []
+
+
+def test_import_time_budget():
+    result = _run_python("import src.app", "-X", "importtime")
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(3).strip() == "src.app":
+            cumulative = int(match.group(2))
+
+    assert cumulative is not None, "src.app missing from -X importtime output"
+    assert (
+        cumulative < IMPORT_BUDGET_US
+    ), f"import src.app took {cumulative}us (budget {IMPORT_BUDGET_US}us)"
+
+
+def test_warmup_event_preloads_without_credits(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("warm-up must not touch credits or Gemini")
+
+    monkeypatch.setattr(app, "check_and_deduct_credits", fail)
+    monkeypatch.setattr(app, "process_with_routing", fail)
+
+    response = app.lambda_handler({"warmup": True}, None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["warmed"] is True
+    assert set(body["loaded"]) == {"dynamodb", "gemini", "template"}
+    assert isinstance(body["loaded"]["template"], float)
@@ -0,0 +1,130 @@
+"""
+Tests for the incremental re-ingest manifest.
+"""
+
+import copy
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.ingest_manifest import (
+    DynamoDBManifest,
+    SQLiteManifest,
+    conversation_fingerprint,
+    ingest_delta,
+    scan_export,
+)
+from tests.bench_support import make_conversation
+
+
+def write_export(tmp_path, conversations, name="conversations.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(conversations), encoding="utf-8")
+    return path
+
+
+def export_of(count):
+    return [
+        make_conversation(messages=4, seed=i, conversation_id=f"conv-{i}")
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return SQLiteManifest(str(tmp_path / "manifest.sqlite3"))
+
+
+def test_fingerprint_tracks_update_time_and_content():
+    conversation = make_conversation(messages=4)
+    edited = copy.deepcopy(conversation)
+    node = next(n for n in edited["mapping"].values() if n["message"])
+    node["message"]["content"]["parts"] = ["edited"]
+
+    assert conversation_fingerprint(conversation, "update_time") == (
+        conversation_fingerprint(edited, "update_time")
+    )
+    assert conversation_fingerprint(conversation, "hash") != (
+        conversation_fingerprint(edited, "hash")
+    )
+
+    bumped = dict(conversation, update_time=conversation["update_time"] + 1)
+    assert conversation_fingerprint(conversation) != conversation_fingerprint(bumped)
+
+
+def test_missing_update_time_falls_back_to_hash():
+    conversation = make_conversation(messages=4)
+    del conversation["update_time"]
+
+    assert conversation_fingerprint(conversation, "update_time").startswith("h:")
+    with pytest.raises(ValueError):
+        conversation_fingerprint(conversation, "sometimes")
+
+
+def test_second_ingest_only_processes_new_and_changed(tmp_path, manifest):
+    conversations = export_of(5)
+    processed = []
+
+    first = ingest_delta(
+        write_export(tmp_path, conversations), manifest, processed.append
+    )
+    assert first["new"] == first["processed"] == 5
+    assert len(manifest) == 5
+
+    conversations[1]["update_time"] += 60
+    conversations.append(
+        make_conversation(messages=4, seed=99, conversation_id="conv-new")
+    )
+    processed.clear()
+
+    second = ingest_delta(
+        write_export(tmp_path, conversations), manifest, processed.append
+    )
+    assert [c["id"] for c in processed] == ["conv-1", "conv-new"]
+    assert (second["new"], second["changed"], second["unchanged"]) == (1, 1, 4)
+
+
+def test_failed_conversations_are_retried_next_run(tmp_path, manifest):
+    path = write_export(tmp_path, export_of(3))
+
+    def flaky(conversation):
+        if conversation["id"] == "conv-2":
+            raise RuntimeError("Gemini unavailable")
+
+    stats = ingest_delta(path, manifest, flaky)
+    assert (stats["processed"], stats["failed"]) == (2, 1)
+    assert manifest.get("conv-2") is None
+
+    statuses = [(status, c["id"]) for status, c, _ in scan_export(path, manifest)]
+    assert statuses == [("new", "conv-2")]
+
+
+def test_manifest_persists_across_connections(tmp_path):
+    path = str(tmp_path / "manifest.sqlite3")
+    SQLiteManifest(path).record("conv-1", "u:1", {"title": "One"})
+
+    entry = SQLiteManifest(path).get("conv-1")
+    assert entry["fingerprint"] == "u:1"
+    assert entry["info"] == {"title": "One"}
+
+
+@mock_aws
+def test_dynamodb_manifest(tmp_path):
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    dynamodb.create_table(
+        TableName="RIJG-IngestManifest",
+        KeySchema=[{"AttributeName": "source_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "source_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    manifest = DynamoDBManifest(dynamodb_resource=dynamodb)
+    path = write_export(tmp_path, export_of(3))
+
+    ingest_delta(path, manifest, lambda conversation: None)
+
+    assert len(manifest) == 3
+    assert list(scan_export(path, manifest)) == []
+    manifest.remove("conv-0")
+    assert manifest.get("conv-0") is None
@@ -31,10 +31,11 @@ os.environ["USER_CREDITS_TABLE_NAME"] = "RIJG-UserCredits"
 
 # Import after setting environment variables
 from src.app import lambda_handler
+from src.export_reader import iter_conversations
 
 
-def load_all_conversations():
-    """Load all conversations from the conversations.json file."""
+def get_conversations_path():
+    """Return the path to the conversations.json export."""
     data_path = (
         Path(__file__).parent.parent
         / "data"
@@ -45,14 +46,33 @@ def load_all_conversations():
     if not data_path.exists():
         raise FileNotFoundError(f"Test data not found at: {data_path}")
 
-    with open(data_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    return data_path
 
-    # Ensure we have a list of conversations
-    if not isinstance(data, list):
-        data = [data]
 
-    return data
+def sample_conversations(sample_size):
+    """
+    Randomly select conversations while streaming the export.
+
+    Uses reservoir sampling so only the selected conversations are kept in memory.
+
+    Returns:
+        Tuple of (selected conversations, total number of conversations)
+    """
+    selected = []
+    total = 0
+
+    for total, conversation in enumerate(
+        iter_conversations(get_conversations_path()), 1
+    ):
+        if len(selected) < sample_size:
+            selected.append(conversation)
+        else:
+            slot = random.randrange(total)
+            if slot < sample_size:
+                selected[slot] = conversation
+
+    random.shuffle(selected)
+    return selected, total
 
 
 def save_test_selection(conversations):
@@ -171,18 +191,17 @@ def main():
         # Normal mode - random selection
         print("Loading conversations...")
         try:
-            all_conversations = load_all_conversations()
-            print(f"✓ Loaded {len(all_conversations)} total conversations")
+            selected_conversations, total_conversations = sample_conversations(10)
+            print(f"✓ Streamed {total_conversations} total conversations")
         except FileNotFoundError as e:
             print(f"ERROR: {e}")
             return
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             print(f"ERROR: Invalid JSON in conversations.json: {e}")
             return
 
         # Select 10 random conversations (or all if less than 10)
-        sample_size = min(10, len(all_conversations))
-        selected_conversations = random.sample(all_conversations, sample_size)
+        sample_size = len(selected_conversations)
 
         # Save the selection for potential rerun
         save_test_selection(selected_conversations)
@@ -248,7 +267,7 @@ def main():
             f.write(f"**Test Type:** Random Sample\n\n")
         f.write(f"**Sample Size:** {sample_size}\n\n")
         if not is_rerun:
-            f.write(f"**Total Conversations in Dataset:** {len(all_conversations)}\n\n")
+            f.write(f"**Total Conversations in Dataset:** {total_conversations}\n\n")
         f.write(f"**Successful:** {successful}\n\n")
         f.write(f"**Failed:** {failed}\n\n")
         f.write(f"**Success Rate:** {(successful/sample_size*100):.1f}%\n\n")
@@ -0,0 +1,122 @@
+"""
+Tests for per-request EMF metrics.
+"""
+
+import json
+
+import pytest
+
+import src.app as app
+import src.gemini_processor as gemini_processor
+from src.metrics import (
+    MemoryMetricsSink,
+    count,
+    metrics_scope,
+    set_metrics_sink,
+    span,
+)
+from src.model_router import get_routing_table
+from tests.bench_support import make_conversation
+from tests.gemini_stub import GeminiStub, installed_gemini_stub
+
+
+@pytest.fixture
+def sink(gemini_stub):
+    sink = MemoryMetricsSink()
+    set_metrics_sink(sink)
+    yield sink
+    set_metrics_sink(None)
+
+
+def event_for(*seeds):
+    conversations = [make_conversation(messages=6, seed=seed) for seed in seeds]
+    if len(conversations) == 1:
+        return {"body": json.dumps({"conversation": conversations[0]})}
+    return {"body": json.dumps({"conversations": conversations})}
+
+
+def test_recording_outside_a_scope_is_a_no_op(sink):
+    with span("parse"):
+        count("gemini_attempts")
+    assert sink.records == []
+
+
+def test_scope_emits_embedded_metric_format(sink):
+    with metrics_scope(handler="test"):
+        with span("parse"):
+            pass
+        count("gemini_attempts")
+        count("gemini_attempts")
+        count("markdown_bytes", 120, "Bytes")
+
+    (record,) = sink.records
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    units = {metric["Name"]: metric["Unit"] for metric in directive["Metrics"]}
+
+    assert record["handler"] == "test"
+    assert record["gemini_attempts"] == 2
+    assert record["parse_ms"] >= 0
+    assert units == {
+        "parse_ms": "Milliseconds",
+        "gemini_attempts": "Count",
+        "markdown_bytes": "Bytes",
+    }
+    assert all(name in record for name in units)
+    assert ["Service"] in directive["Dimensions"] and "Service" in record
+
+
+def test_lambda_handler_emits_stage_timings_and_usage(sink):
+    response = app.lambda_handler(event_for(1), None)
+
+    assert response["statusCode"] == 200
+    (record,) = sink.records
+    for stage in ("handler", "parse", "reduce", "llm", "merge", "render"):
+        assert record[f"{stage}_ms"] >= 0
+    assert record["gemini_attempts"] == 1
+    assert record["gemini_primary_successes"] == 1
+    assert record["gemini_input_tokens"] > 0
+    assert record["gemini_output_tokens"] > 0
+    assert record["markdown_bytes"] > 0
+    assert record["status_code"] == 200
+    assert record["source_id"] == "synthetic"
+
+
+def test_retries_and_fallbacks_are_counted(sink):
+    # Small conversations go to the short tier; fail its first model
+    first_model = get_routing_table()[0]["models"][0]
+    stub = GeminiStub(
+        error_rate=1.0,
+        error_kind="unavailable",
+        error_models={first_model},
+    )
+
+    with installed_gemini_stub(stub):
+        response = app.lambda_handler(event_for(1), None)
+
+    assert response["statusCode"] == 200
+    (record,) = sink.records
+    attempts = gemini_processor.MAX_ATTEMPTS
+    assert record["gemini_attempts"] == attempts + 1
+    assert record["gemini_retries"] == attempts - 1
+    assert record["gemini_errors"] == attempts
+    assert record["gemini_fallback_successes"] == 1
+    assert len(record["gemini_attempt_ms"]) == attempts + 1
+
+
+def test_batch_items_record_into_the_request_scope(sink):
+    response = app.lambda_handler(event_for(1, 2, 3), None)
+
+    assert response["statusCode"] == 200
+    (record,) = sink.records
+    assert len(record["parse_ms"]) == 3
+    assert record["gemini_attempts"] == 3
+
+
+def test_failing_sink_does_not_fail_the_request(sink, monkeypatch):
+    def broken_emit(record):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sink, "emit", broken_emit)
+    response = app.lambda_handler(event_for(1), None)
+
+    assert response["statusCode"] == 200
@@ -0,0 +1,169 @@
+"""
+Tests for circuit breakers and hedged requests in the model chain.
+"""
+
+import time
+
+import pytest
+
+import src.gemini_processor as gemini_processor
+from src.model_health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    LatencyTracker,
+    reset_model_health,
+)
+
+PRIMARY = gemini_processor.PRIMARY_MODEL
+FALLBACK = gemini_processor.FALLBACK_MODEL
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """Fake process_with_gemini with per-model latency and failure switches."""
+    behaviour = {
+        PRIMARY: {"delay": 0, "fail": False},
+        FALLBACK: {"delay": 0, "fail": False},
+    }
+    calls = []
+
+    def fake_process(text, model_name, prompt_template):
+        calls.append(model_name)
+        time.sleep(behaviour[model_name]["delay"])
+        if behaviour[model_name]["fail"]:
+            raise ConnectionError(f"{model_name} down")
+        return {"model": model_name}
+
+    monkeypatch.setattr(gemini_processor, "process_with_gemini", fake_process)
+    monkeypatch.setattr(gemini_processor, "list_available_models", lambda: [])
+    reset_model_health()
+    gemini_processor.reset_model_chain_stats()
+    yield behaviour, calls
+    reset_model_health()
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("m", failure_threshold=2, cooldown_seconds=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker()
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+
+    assert tracker.percentile(95) == 0.095
+    assert LatencyTracker().percentile(95) is None
+
+
+def test_failing_primary_is_skipped_while_circuit_is_open(models):
+    behaviour, calls = models
+    behaviour[PRIMARY]["fail"] = True
+
+    for _ in range(gemini_processor.get_circuit_breaker(PRIMARY).failure_threshold):
+        assert (
+            gemini_processor.process_with_gemini_fallback("text")["model"] == FALLBACK
+        )
+    calls.clear()
+
+    assert gemini_processor.process_with_gemini_fallback("text")["model"] == FALLBACK
+    assert calls == [FALLBACK]
+
+    stats = gemini_processor.get_model_chain_stats()
+    assert stats["breakers"][PRIMARY] == OPEN
+    assert stats["breaker_skips"] == 1
+
+
+def test_configuration_errors_do_not_open_the_circuit(models, monkeypatch):
+    behaviour, calls = models
+
+    def missing_key(text, model_name, prompt_template):
+        calls.append(model_name)
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+
+    monkeypatch.setattr(gemini_processor, "process_with_gemini", missing_key)
+    for _ in range(gemini_processor.get_circuit_breaker(PRIMARY).failure_threshold):
+        with pytest.raises(Exception, match="Both models failed"):
+            gemini_processor.process_with_gemini_fallback("text")
+
+    stats = gemini_processor.get_model_chain_stats()
+    assert stats["breakers"] == {PRIMARY: CLOSED, FALLBACK: CLOSED}
+    assert stats["breaker_skips"] == 0
+
+
+def test_both_models_failing(models):
+    behaviour, _ = models
+    behaviour[PRIMARY]["fail"] = True
+    behaviour[FALLBACK]["fail"] = True
+
+    with pytest.raises(Exception, match="Both models failed"):
+        gemini_processor.process_with_gemini_fallback("text")
+
+
+def test_hedge_fires_fallback_for_slow_primary(models, monkeypatch):
+    behaviour, calls = models
+    behaviour[PRIMARY]["delay"] = 0.5
+    monkeypatch.setattr(gemini_processor, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(gemini_processor, "HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+
+    start = time.perf_counter()
+    result = gemini_processor.process_with_gemini_fallback("text")
+    elapsed = time.perf_counter() - start
+
+    assert result["model"] == FALLBACK
+    assert elapsed < 0.3
+    stats = gemini_processor.get_model_chain_stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_fallback_wins"] == 1
+
+
+def test_fast_primary_is_not_hedged(models, monkeypatch):
+    behaviour, calls = models
+    monkeypatch.setattr(gemini_processor, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(gemini_processor, "HEDGE_DEFAULT_DELAY_SECONDS", 0.5)
+
+    assert gemini_processor.process_with_gemini_fallback("text")["model"] == PRIMARY
+    assert calls == [PRIMARY]
+    assert gemini_processor.get_model_chain_stats()["hedges"] == 0
+
+
+def test_custom_model_chain_tries_each_model_in_order(models):
+    behaviour, calls = models
+    behaviour["third"] = {"delay": 0, "fail": False}
+    behaviour[PRIMARY]["fail"] = True
+    behaviour[FALLBACK]["fail"] = True
+
+    result = gemini_processor.process_with_gemini_fallback(
+        "hi", models=[PRIMARY, FALLBACK, "third"]
+    )
+
+    assert result == {"model": "third"}
+    assert calls == [PRIMARY, FALLBACK, "third"]
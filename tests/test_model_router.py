@@ -0,0 +1,142 @@
+"""Tests for model_router."""
+
+import json
+
+import pytest
+
+import src.app as app
+import src.model_router as router
+from src.gemini_processor import DEFAULT_MODELS
+from src.model_health import get_latency_tracker, reset_model_health
+
+TABLE = [
+    {"name": "short", "max_tokens": 100, "models": ["fast", "main"]},
+    {"name": "standard", "max_tokens": 1000, "models": ["main", "backup"]},
+    {"name": "long", "max_tokens": 5000, "mode": "chunked", "models": ["main"]},
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_health():
+    reset_model_health()
+    yield
+    reset_model_health()
+
+
+@pytest.mark.parametrize(
+    "chars,tier,mode",
+    [(40, "short", "single"), (2000, "standard", "single"), (8000, "long", "chunked")],
+)
+def test_routes_by_estimated_size(chars, tier, mode):
+    route = router.route_request("x" * chars, TABLE)
+
+    assert route["tier"] == tier
+    assert route["mode"] == mode
+
+
+def test_over_budget_is_rejected_before_any_call(monkeypatch):
+    monkeypatch.setattr(router, "process_with_gemini_fallback", None)
+    monkeypatch.setattr(router, "map_reduce_journal", None)
+    monkeypatch.setattr(router, "get_routing_table", lambda: TABLE)
+
+    with pytest.raises(router.RequestTooLargeError, match="too long"):
+        router.process_with_routing("x" * 30000)
+
+
+def test_handler_refunds_oversized_input(monkeypatch):
+    monkeypatch.delenv("AWS_SAM_LOCAL", raising=False)
+    monkeypatch.setattr(router, "get_routing_table", lambda: TABLE)
+    monkeypatch.setattr(router, "process_with_gemini_fallback", None)
+    monkeypatch.setattr(router, "map_reduce_journal", None)
+    ledger = []
+    monkeypatch.setattr(
+        app, "check_and_deduct_credits", lambda user_id: ledger.append(-1) or True
+    )
+    monkeypatch.setattr(app, "refund_credits", lambda user_id: ledger.append(1) or True)
+    conversation = {
+        "title": "Too long",
+        "id": "conv-long",
+        "create_time": 1738124226.0,
+        "mapping": {
+            "a": {
+                "parent": None,
+                "children": [],
+                "message": {
+                    "author": {"role": "user"},
+                    "content": {"parts": ["word " * 30000]},
+                },
+            }
+        },
+    }
+
+    response = app.lambda_handler({"body": json.dumps(conversation)}, None)
+
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["refunded"] is True
+    assert sum(ledger) == 0
+
+
+def test_process_with_routing_dispatches_by_mode(monkeypatch):
+    calls = []
+    monkeypatch.setattr(router, "get_routing_table", lambda: TABLE)
+    monkeypatch.setattr(
+        router,
+        "process_with_gemini_fallback",
+        lambda text, models: calls.append(("single", models)) or {},
+    )
+    monkeypatch.setattr(
+        router,
+        "map_reduce_journal",
+        lambda text, segment_tokens, models: calls.append(("chunked", models)) or {},
+    )
+
+    router.process_with_routing("x" * 40)
+    router.process_with_routing("x" * 8000)
+
+    assert calls == [("single", ["fast", "main"]), ("chunked", ["main"])]
+
+
+def test_slow_model_is_demoted_for_latency_target():
+    table = [dict(TABLE[0], latency_target_seconds=1.0)]
+    tracker = get_latency_tracker("fast")
+    for _ in range(router.HEDGE_MIN_SAMPLES):
+        tracker.record(3.0)
+
+    assert router.route_request("hi", table)["models"] == ["main", "fast"]
+
+
+def test_count_tokens_used_near_boundary_and_cached(monkeypatch):
+    counted = []
+
+    class FakeModel:
+        def count_tokens(self, text):
+            counted.append(text)
+            return type("Count", (), {"total_tokens": 120})()
+
+    monkeypatch.setattr(router, "ROUTER_COUNT_TOKENS", True)
+    monkeypatch.setattr(router, "get_api_key", lambda: "key")
+    monkeypatch.setattr(router, "get_model", lambda name, key: FakeModel())
+
+    text = "y" * 380  # ~95 tokens locally, 120 by count_tokens
+    assert router.route_request(text, TABLE)["tier"] == "standard"
+    assert router.route_request(text, TABLE)["tier"] == "standard"
+    assert len(counted) == 1
+    assert router.route_request("z" * 2000, TABLE)["estimated_tokens"] == 500
+    assert len(counted) == 1
+
+
+def test_default_table_keeps_the_default_models():
+    assert router.routed_models(router.DEFAULT_ROUTING_TABLE) == list(DEFAULT_MODELS)
+    assert router.routed_models(TABLE) == ["fast", "main", "backup"]
+
+
+def test_load_routing_table_from_json():
+    table = router.load_routing_table(
+        '[{"name": "b", "max_tokens": 50, "models": ["m2"]},'
+        ' {"name": "a", "max_tokens": 10, "models": ["m1"]}]'
+    )
+
+    assert [tier["name"] for tier in table] == ["a", "b"]
+    assert table[0]["mode"] == "single"
+    with pytest.raises(ValueError):
+        router.load_routing_table('[{"max_tokens": 10, "models": []}]')
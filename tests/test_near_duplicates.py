@@ -0,0 +1,156 @@
+"""
+Tests for MinHash/LSH near-duplicate detection.
+"""
+
+import json
+import random
+
+import pytest
+
+import src.cli as cli
+from src.cli import run_bulk
+from src.conversation_parser import parse_conversation
+from src.near_duplicates import (
+    NearDuplicateIndex,
+    choose_bands,
+    estimate_similarity,
+    minhash_signature,
+)
+from tests.bench_support import make_conversation
+
+
+def words(count, seed):
+    rng = random.Random(seed)
+    return [f"word{rng.randrange(5000)}" for _ in range(count)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite3"), threshold=0.8)
+    yield index
+    index.close()
+
+
+def test_signature_similarity_tracks_shared_text():
+    base = words(800, seed=1)
+    edited = base[:760] + words(40, seed=2)
+
+    same = estimate_similarity(
+        minhash_signature(" ".join(base)), minhash_signature(" ".join(base))
+    )
+    close = estimate_similarity(
+        minhash_signature(" ".join(base)), minhash_signature(" ".join(edited))
+    )
+    unrelated = estimate_similarity(
+        minhash_signature(" ".join(base)), minhash_signature(" ".join(words(800, 3)))
+    )
+
+    assert same == 1.0
+    assert 0.75 < close < 1.0
+    assert unrelated < 0.1
+
+
+def test_formatting_differences_are_ignored():
+    assert minhash_signature("User: Hello,   World!\n") == minhash_signature(
+        "user hello world"
+    )
+
+
+def test_band_layout_keeps_recall_at_the_threshold():
+    bands, rows = choose_bands(128, 0.85)
+    assert bands * rows <= 128
+    assert 1 - (1 - 0.85**rows) ** bands >= 0.99
+
+
+def test_check_and_add_links_retried_conversations(index):
+    original = " ".join(words(500, seed=1))
+    retried = original + " thanks"
+
+    assert index.check_and_add("a", original, {"title": "Original"}) is None
+    match = index.check_and_add("b", retried)
+
+    assert match["source_id"] == "a"
+    assert match["info"] == {"title": "Original"}
+    assert match["similarity"] >= 0.8
+    assert len(index) == 1
+    assert index.check_and_add("c", " ".join(words(500, seed=9))) is None
+    assert index.check_and_add("a", original) is None
+
+
+def test_index_is_persistent_and_checks_its_settings(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    text = " ".join(words(300, seed=1))
+    NearDuplicateIndex(path).add("a", text)
+
+    reopened = NearDuplicateIndex(path, threshold=0.95)
+    assert [m["source_id"] for m in reopened.query(text)] == ["a"]
+    reopened.remove("a")
+    assert reopened.query(text) == []
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, num_perm=64)
+
+
+def test_cli_skips_near_duplicates_before_gemini(tmp_path, gemini_stub):
+    original = make_conversation(messages=6, seed=1, conversation_id="original")
+    retried = make_conversation(messages=6, seed=1, conversation_id="retried")
+    other = make_conversation(messages=6, seed=2, conversation_id="other")
+    assert (
+        parse_conversation(original)["raw_text"]
+        == parse_conversation(retried)["raw_text"]
+    )
+    export = tmp_path / "conversations.json"
+    export.write_text(json.dumps([original, retried, other]), encoding="utf-8")
+    output = tmp_path / "out"
+
+    stats = run_bulk(
+        export, output, workers=0, gemini_concurrency=1, near_duplicate_mode="skip"
+    )
+
+    assert gemini_stub.stats["calls"] == 2
+    assert (stats["succeeded"], stats["near_duplicates"]) == (3, 1)
+    results = [json.loads(line) for line in open(output / "results.jsonl")]
+    (linked,) = [r for r in results if "duplicate_of" in r]
+    # Both are checked concurrently; whichever is indexed first is the original
+    assert {linked["source_id"], linked["duplicate_of"]} == {"original", "retried"}
+
+
+def test_cli_processes_a_near_duplicate_whose_original_failed(
+    tmp_path, gemini_stub, monkeypatch
+):
+    original = make_conversation(messages=6, seed=1, conversation_id="original")
+    retried = make_conversation(messages=6, seed=1, conversation_id="retried")
+    export = tmp_path / "conversations.json"
+    export.write_text(json.dumps([original, retried]), encoding="utf-8")
+    output = tmp_path / "out"
+
+    failures = iter([True])
+    real_process = cli.process_with_routing
+
+    def fail_first_call(text):
+        if next(failures, False):
+            raise Exception("Gemini API error: unavailable")
+        return real_process(text)
+
+    monkeypatch.setattr(cli, "process_with_routing", fail_first_call)
+    stats = run_bulk(
+        export, output, workers=0, gemini_concurrency=1, near_duplicate_mode="skip"
+    )
+
+    # The duplicate waited for the original, then took its place
+    assert (stats["succeeded"], stats["failed"], stats["near_duplicates"]) == (1, 1, 0)
+    results = [json.loads(line) for line in open(output / "results.jsonl")]
+    assert not [r for r in results if "duplicate_of" in r]
+    (failed,) = [r for r in results if not r["success"]]
+    (written,) = [r for r in results if "path" in r]
+
+    # The failed conversation is retried and links to the one that was written
+    stats = run_bulk(
+        export, output, workers=0, gemini_concurrency=1, near_duplicate_mode="skip"
+    )
+    assert (stats["succeeded"], stats["near_duplicates"]) == (1, 1)
+    results = [json.loads(line) for line in open(output / "results.jsonl")]
+    (linked,) = [r for r in results if "duplicate_of" in r]
+    assert (linked["source_id"], linked["duplicate_of"]) == (
+        failed["source_id"],
+        written["source_id"],
+    )
@@ -0,0 +1,92 @@
+"""
+Tests for opt-in invocation profiling.
+"""
+
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import src.app as app
+import src.profiling as profiling
+from tests.bench_support import make_conversation
+
+EVENT = {
+    "body": json.dumps(
+        {"conversation": make_conversation(messages=6, conversation_id="conv-42")}
+    )
+}
+
+
+@pytest.fixture
+def stub(gemini_stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return gemini_stub
+
+
+def enable(monkeypatch, mode="", request_flag=False, output="file"):
+    monkeypatch.setattr(profiling, "PROFILE_MODE", mode)
+    monkeypatch.setattr(profiling, "PROFILE_REQUEST_FLAG", request_flag)
+    monkeypatch.setattr(profiling, "PROFILE_OUTPUT", output)
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", bool(mode) or request_flag)
+
+
+def test_disabled_profiling_is_never_consulted(stub, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("profiling touched while disabled")
+
+    enable(monkeypatch)
+    monkeypatch.setattr(profiling, "requested_profile_mode", fail)
+    monkeypatch.setattr(profiling, "profiled", fail)
+
+    assert app.lambda_handler(EVENT, None)["statusCode"] == 200
+
+
+def test_cpu_profile_written_with_source_id(stub, monkeypatch, tmp_path):
+    enable(monkeypatch, mode="cpu")
+
+    assert app.lambda_handler(EVENT, None)["statusCode"] == 200
+
+    (path,) = tmp_path.iterdir()
+    assert "conv-42" in path.name and path.name.endswith("-cpu.txt")
+    text = path.read_text()
+    assert "source_id=conv-42" in text
+    assert "Hot functions" in text and "run_pipeline" in text
+
+
+def test_request_flag_selects_memory_profile(stub, monkeypatch, capsys):
+    enable(monkeypatch, request_flag=True, output="log")
+    event = {**EVENT, "headers": {"X-Profile": "memory"}}
+
+    assert app.lambda_handler(event, None)["statusCode"] == 200
+
+    out = capsys.readouterr().out
+    assert "Peak traced memory" in out and "Top allocation sites" in out
+    assert "Hot functions" not in out
+
+
+def test_request_flag_ignored_unless_allowed(monkeypatch):
+    enable(monkeypatch, request_flag=False)
+    assert profiling.requested_profile_mode({"headers": {"X-Profile": "cpu"}}) is None
+
+    enable(monkeypatch, request_flag=True)
+    event = {"queryStringParameters": {"profile": "bogus"}}
+    assert profiling.requested_profile_mode(event) is None
+    event = {"queryStringParameters": {"profile": "both"}}
+    assert profiling.requested_profile_mode(event) == "both"
+
+
+def test_report_uploaded_to_s3(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_BUCKET", "profiles-bucket")
+    report = {"source_id": "conv/7", "mode": "cpu", "wall_ms": 1.0, "cpu_stats": "x"}
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="profiles-bucket")
+        uri = profiling.write_profile_report(report, output="s3", s3_client=s3)
+        key = uri.split("/", 3)[3]
+        body = s3.get_object(Bucket="profiles-bucket", Key=key)["Body"].read()
+
+    assert key.startswith("profiles/") and "conv_7" in key
+    assert b"source_id=conv/7" in body
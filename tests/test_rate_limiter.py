@@ -0,0 +1,146 @@
+"""
+Tests for the adaptive rate limiter and Gemini retry policy.
+"""
+
+import datetime
+
+import pytest
+from google.api_core import exceptions
+from google.rpc import error_details_pb2
+
+import src.gemini_processor as gemini_processor
+from src.rate_limiter import (
+    AdaptiveRateLimiter,
+    backoff_delay,
+    retry_after_seconds,
+    set_rate_limiter,
+)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(fake, **kwargs):
+    return AdaptiveRateLimiter(clock=fake.clock, sleep=fake.sleep, **kwargs)
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    fake = FakeTime()
+    limiter = _limiter(fake, rate=2, burst=2)
+
+    for _ in range(4):
+        limiter.acquire()
+
+    assert fake.now == pytest.approx(1.0)
+
+
+def test_aimd_rate_adjustment_and_retry_hint_pause():
+    fake = FakeTime()
+    limiter = _limiter(fake, rate=4, burst=1, min_rate=1, increase=0.5)
+
+    limiter.on_success()
+    assert limiter.rate == 4.5
+    limiter.on_throttle()
+    assert limiter.rate == 2.25
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 1
+
+    limiter.on_throttle(retry_after=7)
+    limiter.acquire()
+    assert fake.now >= 7
+
+
+def test_acquire_timeout():
+    fake = FakeTime()
+    limiter = _limiter(fake, rate=0.1, burst=1)
+    limiter.acquire()
+
+    assert limiter.acquire(timeout=1) is False
+
+
+def test_backoff_is_jittered_exponential_and_honours_hints():
+    assert backoff_delay(0, rng=lambda: 0.999, base=1, cap=30) < 1
+    assert backoff_delay(3, rng=lambda: 0.5, base=1, cap=30) == 4
+    assert backoff_delay(10, rng=lambda: 0.5, base=1, cap=30) == 15
+    assert backoff_delay(0, retry_after=12, rng=lambda: 0.5, base=1) == 12.5
+
+
+def test_retry_after_seconds_sources():
+    retry_info = error_details_pb2.RetryInfo()
+    retry_info.retry_delay.seconds = 9
+    error = exceptions.ResourceExhausted("quota", details=[retry_info])
+    assert retry_after_seconds(error) == 9
+
+    class Detail:
+        retry_delay = datetime.timedelta(seconds=3.5)
+
+    assert (
+        retry_after_seconds(exceptions.TooManyRequests("x", details=[Detail()])) == 3.5
+    )
+    assert retry_after_seconds(Exception("Please retry in 21.5s.")) == 21.5
+    assert retry_after_seconds(Exception("no hint")) is None
+
+
+class FlakyModel:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt, safety_settings=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(gemini_processor.time, "sleep", sleeps.append)
+    fake = FakeTime()
+    set_rate_limiter(_limiter(fake, rate=100, burst=100))
+    yield sleeps
+    set_rate_limiter(None)
+
+
+def test_transient_errors_are_retried(no_sleep):
+    model = FlakyModel(
+        [
+            exceptions.ServiceUnavailable("503"),
+            exceptions.DeadlineExceeded("slow"),
+            exceptions.ResourceExhausted("quota, retry in 2s"),
+        ]
+    )
+
+    assert gemini_processor.generate_with_retries(model, "prompt") == "response"
+    assert model.calls == 4
+    assert len(no_sleep) == 3
+    assert no_sleep[2] >= 2
+
+
+def test_non_retryable_errors_fail_fast(no_sleep):
+    model = FlakyModel([exceptions.InvalidArgument("bad request")])
+
+    with pytest.raises(Exception, match="Gemini API error"):
+        gemini_processor.generate_with_retries(model, "prompt")
+    assert model.calls == 1
+    assert no_sleep == []
+
+
+def test_rate_limit_gives_up_after_max_attempts(no_sleep):
+    model = FlakyModel([exceptions.ResourceExhausted("quota")] * 10)
+
+    with pytest.raises(Exception, match="Rate limit exceeded"):
+        gemini_processor.generate_with_retries(model, "prompt")
+    assert model.calls == gemini_processor.MAX_ATTEMPTS
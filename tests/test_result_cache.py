@@ -0,0 +1,200 @@
+"""
+Tests for the Gemini result cache and its backends.
+"""
+
+import threading
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import src.gemini_processor as gemini_processor
+from src.deadline import Deadline, DeadlineExceededError, deadline_scope
+from src.result_cache import (
+    DynamoDBCacheBackend,
+    MemoryCacheBackend,
+    ResultCache,
+    SQLiteCacheBackend,
+    make_cache_key,
+    set_result_cache,
+)
+
+ENTRY = {
+    "title": "Entry",
+    "topic": "Caching",
+    "tags": ["cache"],
+    "rewritten_entry_body": "I realized caching saves money.",
+}
+
+
+def test_cache_key_is_content_addressed():
+    key = make_cache_key("text", "model", {"temperature": 0.7})
+
+    assert key == make_cache_key("text", "model", {"temperature": 0.7})
+    assert key != make_cache_key("text", "model", {"temperature": 0.8})
+    assert key != make_cache_key("text!", "model", {"temperature": 0.7})
+
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2, ttl_seconds=None)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.get("a")
+    backend.set("c", {"v": 3})
+
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+    assert backend.get("c") == {"v": 3}
+
+    expiring = MemoryCacheBackend(ttl_seconds=0.01)
+    expiring.set("a", {"v": 1})
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+def test_memory_backend_hands_out_copies():
+    backend = MemoryCacheBackend()
+    entry = {"tags": ["cache"]}
+    backend.set("a", entry)
+    entry["tags"].append("changed by the caller")
+    backend.get("a")["tags"].append("changed by a reader")
+
+    assert backend.get("a") == {"tags": ["cache"]}
+
+
+def test_sqlite_backend_persists_and_evicts(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteCacheBackend(path, max_entries=2, ttl_seconds=None)
+    backend.set("a", ENTRY)
+    backend.set("b", ENTRY)
+    backend.set("c", ENTRY)
+
+    reopened = SQLiteCacheBackend(path, max_entries=2, ttl_seconds=None)
+    assert len(reopened) == 2
+    assert reopened.get("a") is None
+    assert reopened.get("c") == ENTRY
+
+    expiring = SQLiteCacheBackend(str(tmp_path / "ttl.sqlite3"), ttl_seconds=0.01)
+    expiring.set("a", ENTRY)
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+@mock_aws
+def test_dynamodb_backend():
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    dynamodb.create_table(
+        TableName="RIJG-GeminiCache",
+        KeySchema=[{"AttributeName": "cache_key", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cache_key", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    backend = DynamoDBCacheBackend(dynamodb_resource=dynamodb)
+
+    assert backend.get("missing") is None
+    backend.set("key", ENTRY)
+    assert backend.get("key") == ENTRY
+
+
+def test_identical_in_flight_requests_share_one_call():
+    cache = ResultCache(MemoryCacheBackend())
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(1)
+        return ENTRY
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("k", compute))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [ENTRY] * 8
+    assert cache.stats["misses"] == 1
+    assert cache.stats["shared"] == 7
+
+
+def test_follower_stops_waiting_at_the_request_deadline():
+    cache = ResultCache(MemoryCacheBackend())
+    release = threading.Event()
+
+    def slow_compute():
+        release.wait(2)
+        return ENTRY
+
+    leader = threading.Thread(target=cache.get_or_compute, args=("k", slow_compute))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        start = time.monotonic()
+        with deadline_scope(Deadline(0.1)):
+            with pytest.raises(DeadlineExceededError):
+                cache.get_or_compute("k", slow_compute)
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache(MemoryCacheBackend())
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", lambda: ENTRY) == ENTRY
+
+
+def test_process_with_gemini_uses_cache(monkeypatch):
+    calls = []
+
+    def fake_generate(text, model_name, api_key, prompt_template=None):
+        calls.append((text, model_name))
+        return dict(ENTRY)
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_processor, "_generate_journal_entry", fake_generate)
+    set_result_cache(ResultCache(MemoryCacheBackend()))
+    try:
+        gemini_processor.process_with_gemini("same text")
+        gemini_processor.process_with_gemini("same text")
+        gemini_processor.process_with_gemini("same text", model_name="other-model")
+    finally:
+        set_result_cache(None)
+
+    assert calls == [("same text", "gemini-2.5-flash"), ("same text", "other-model")]
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_configured_local_backends_enable_the_cache(
+    backend_name, monkeypatch, tmp_path
+):
+    import src.result_cache as result_cache
+
+    monkeypatch.setenv("GEMINI_CACHE_BACKEND", backend_name)
+    monkeypatch.setenv("GEMINI_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(result_cache, "_result_cache_configured", False)
+    monkeypatch.setattr(result_cache, "_result_cache", None)
+
+    cache = result_cache.get_result_cache()
+
+    # A new backend is empty (len 0) but must still enable caching
+    assert isinstance(cache, ResultCache)
+    assert len(cache.backend) == 0
+    cache.set("key", ENTRY)
+    assert cache.get("key") == ENTRY
@@ -0,0 +1,274 @@
+"""
+Tests for streamed journal generation.
+"""
+
+import json
+import random
+
+import pytest
+
+import src.app as app
+import src.streaming as streaming
+from src.conversation_parser import parse_conversation
+from src.model_router import RequestTooLargeError
+from src.result_cache import MemoryCacheBackend, ResultCache, set_result_cache
+from src.streaming import JournalStreamParser, JournalStreamRenderer
+from src.template_engine import render_journal_entry_safe
+
+ENTRY = {
+    "title": 'Streaming "Quotes" & Escapes',
+    "topic": "Testing",
+    "tags": ["stream", "json"],
+    "rewritten_entry_body": (
+        'Line one with a tab\tand a quote " and a backslash \\.\n\n'
+        "Unicode: caf\u00e9, emoji \U0001f600, CJK \u6f22\u5b57.\n"
+        "```python\nprint('hi')\n```\n"
+    ),
+}
+
+CONVERSATION = {
+    "title": "Stream Test",
+    "id": "conv-stream",
+    "create_time": 1738124226.0,
+    "current_node": "b",
+    "mapping": {
+        "a": {
+            "parent": None,
+            "children": ["b"],
+            "message": {"author": {"role": "user"}, "content": {"parts": ["Hi"]}},
+        },
+        "b": {
+            "parent": "a",
+            "children": [],
+            "message": {"author": {"role": "assistant"}, "content": {"parts": ["Hey"]}},
+        },
+    },
+}
+
+
+ROUTE = {
+    "tier": "test",
+    "mode": "single",
+    "models": ["m1"],
+    "estimated_tokens": 10,
+    "segment_tokens": None,
+}
+
+
+def parsed_conversation():
+    return parse_conversation(CONVERSATION)
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+def split_randomly(text, rng):
+    """Split text at random points (including inside escape sequences)."""
+    pieces = []
+    while text:
+        size = rng.randint(1, 7)
+        pieces.append(text[:size])
+        text = text[size:]
+    return pieces
+
+
+@pytest.fixture
+def stream_models(gemini_stub, monkeypatch):
+    """Fake streaming Gemini call: per-model list of chunks or an exception."""
+    responses = {}
+    calls = []
+
+    def fake_generate(model, prompt, stream=False):
+        assert stream
+        calls.append(model)
+        response = responses[model]
+        if isinstance(response, Exception):
+            raise response
+        return iter(response)
+
+    monkeypatch.setattr(
+        streaming, "get_model", lambda name, api_key, config, instruction: name
+    )
+    monkeypatch.setattr(streaming, "generate_with_retries", fake_generate)
+    return responses, calls
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parser_handles_any_chunk_split(seed):
+    rng = random.Random(seed)
+    raw = json.dumps(ENTRY, ensure_ascii=seed % 2 == 0, indent=seed % 3 or None)
+
+    parser = JournalStreamParser()
+    deltas = []
+    fields = {}
+    for piece in split_randomly(raw, rng):
+        for kind, name, value in parser.feed(piece):
+            if kind == "delta":
+                deltas.append(value)
+            else:
+                fields[name] = value
+
+    assert parser.close() == ENTRY
+    assert fields == ENTRY
+    assert "".join(deltas) == ENTRY["rewritten_entry_body"]
+
+
+def test_parser_emits_head_fields_before_body_ends():
+    parser = JournalStreamParser()
+    events = parser.feed('{"title": "T", "topic": "X", "tags": ["a"], ')
+    assert [e[1] for e in events] == ["title", "topic", "tags"]
+
+    events = parser.feed('"rewritten_entry_body": "Hello wor')
+    assert events == [("delta", "rewritten_entry_body", "Hello wor")]
+
+
+def test_parser_rejects_non_object():
+    with pytest.raises(ValueError):
+        JournalStreamParser().feed("[1, 2]")
+
+    parser = JournalStreamParser()
+    parser.feed('{"title": "unterminated')
+    with pytest.raises(ValueError, match="Incomplete"):
+        parser.close()
+
+
+def test_streamed_markdown_matches_full_render(stream_models):
+    responses, _ = stream_models
+    raw = json.dumps(ENTRY)
+    responses["m1"] = [Chunk(piece) for piece in split_randomly(raw, random.Random(1))]
+
+    parsed = parsed_conversation()
+    renderer = JournalStreamRenderer(parsed)
+    chunks = [
+        chunk
+        for event in streaming.stream_journal_entry("text", models=["m1"])
+        for chunk in renderer.feed(event)
+    ]
+
+    assert len(chunks) > 3
+    assert "".join(chunks) == render_journal_entry_safe({**parsed, **ENTRY})
+    assert chunks[0].startswith("---")
+
+
+def test_falls_back_when_model_fails_before_output(stream_models):
+    responses, calls = stream_models
+    responses["m1"] = Exception("503 unavailable")
+    responses["m2"] = [Chunk(json.dumps(ENTRY))]
+
+    events = list(streaming.stream_journal_entry("text", models=["m1", "m2"]))
+
+    assert calls == ["m1", "m2"]
+    assert events[-1] == ("entry", "", ENTRY)
+
+
+def test_error_after_output_is_not_retried(stream_models):
+    responses, calls = stream_models
+
+    def broken_stream():
+        yield Chunk('{"title": "T", "topic": "X", ')
+        raise ConnectionError("reset")
+
+    responses["m1"] = broken_stream()
+    responses["m2"] = [Chunk(json.dumps(ENTRY))]
+
+    with pytest.raises(Exception, match="stream interrupted"):
+        list(streaming.stream_journal_entry("text", models=["m1", "m2"]))
+    assert calls == ["m1"]
+
+
+def test_cached_entry_is_emitted_without_a_call(stream_models):
+    responses, calls = stream_models
+    responses["m1"] = [Chunk(json.dumps(ENTRY))]
+    set_result_cache(ResultCache(MemoryCacheBackend()))
+    try:
+        first = list(streaming.stream_journal_entry("text", models=["m1"]))
+        second = list(streaming.stream_journal_entry("text", models=["m1"]))
+    finally:
+        set_result_cache(None)
+
+    assert calls == ["m1"]
+    assert first[-1] == second[-1] == ("entry", "", ENTRY)
+
+    parsed = parsed_conversation()
+    renderer = JournalStreamRenderer(parsed)
+    markdown = "".join(chunk for event in second for chunk in renderer.feed(event))
+    assert markdown == render_journal_entry_safe({**parsed, **ENTRY})
+
+
+def test_fallback_entry_is_cached_under_the_fallback_model(stream_models):
+    responses, calls = stream_models
+    responses["m1"] = Exception("503 unavailable")
+    responses["m2"] = [Chunk(json.dumps(ENTRY))]
+    set_result_cache(ResultCache(MemoryCacheBackend()))
+    try:
+        list(streaming.stream_journal_entry("text", models=["m1", "m2"]))
+        responses["m1"] = [Chunk(json.dumps({**ENTRY, "title": "Primary"}))]
+        primary = list(streaming.stream_journal_entry("text", models=["m1", "m2"]))
+        fallback = list(streaming.stream_journal_entry("text", models=["m2"]))
+    finally:
+        set_result_cache(None)
+
+    assert calls == ["m1", "m2", "m1"]
+    assert primary[-1][2]["title"] == "Primary"
+    assert fallback[-1] == ("entry", "", ENTRY)
+
+
+def test_stream_handler_streams_markdown(stream_models, monkeypatch):
+    responses, _ = stream_models
+    monkeypatch.setattr(app, "route_request", lambda text: ROUTE)
+    raw = json.dumps(ENTRY)
+    responses["m1"] = [Chunk(piece) for piece in split_randomly(raw, random.Random(2))]
+
+    body = json.dumps({"conversation": CONVERSATION})
+    response = app.stream_handler({"body": body}, None)
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"].startswith("text/markdown")
+    markdown = "".join(response["body"])
+    assert markdown == render_journal_entry_safe({**parsed_conversation(), **ENTRY})
+
+
+def test_stream_handler_reports_mid_stream_failure(stream_models, monkeypatch):
+    responses, _ = stream_models
+    monkeypatch.delenv("AWS_SAM_LOCAL")
+    refunds = []
+    monkeypatch.setattr(app, "check_and_deduct_credits", lambda user_id: True)
+    monkeypatch.setattr(
+        app, "refund_credits", lambda user_id: refunds.append(user_id) or True
+    )
+    monkeypatch.setattr(app, "route_request", lambda text: ROUTE)
+
+    def broken_stream():
+        yield Chunk('{"title": "T", "topic": "X", "tags": ["a"], ')
+        yield Chunk('"rewritten_entry_body": "Hel')
+        raise ConnectionError("reset")
+
+    responses["m1"] = broken_stream()
+    response = app.stream_handler(
+        {"body": json.dumps({"user_id": "u1", "conversation": CONVERSATION})}, None
+    )
+    chunks = list(response["body"])
+
+    assert chunks[1] == "Hel"
+    assert chunks[-1].startswith("\n\n<!-- Processing failed")
+    assert refunds == ["u1"]
+
+
+def test_stream_handler_rejects_oversized_input_before_charging(monkeypatch):
+    charged = []
+
+    def too_large(text):
+        raise RequestTooLargeError("Conversation is too long to process")
+
+    monkeypatch.setattr(app, "route_request", too_large)
+    monkeypatch.setattr(
+        app, "check_and_deduct_credits", lambda user_id: charged.append(user_id)
+    )
+
+    body = json.dumps({"conversation": CONVERSATION})
+    response = app.stream_handler({"body": body}, None)
+
+    assert response["statusCode"] == 400
+    assert charged == []
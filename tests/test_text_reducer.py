@@ -0,0 +1,86 @@
+"""Tests for text_reducer."""
+
+import pytest
+
+from src.conversation_parser import Message, parse_conversation_messages
+from src.text_reducer import DUPLICATE_MARKER, reduce_messages
+
+
+def _msg(role, text, text_only=None):
+    return Message(role, role, 0, text, text_only)
+
+
+def test_drop_non_text_uses_text_only_view():
+    conversation = {
+        "title": "Image",
+        "current_node": "u1",
+        "mapping": {
+            "u1": {
+                "id": "u1",
+                "parent": None,
+                "children": [],
+                "message": {
+                    "author": {"role": "user"},
+                    "content": {
+                        "parts": [
+                            {"content_type": "image_asset_pointer", "size": 1},
+                            "What is in this picture?",
+                        ]
+                    },
+                },
+            }
+        },
+    }
+
+    parsed, messages = parse_conversation_messages(conversation)
+    text, report = reduce_messages(messages)
+
+    assert "image_asset_pointer" in parsed["transcript"]
+    assert text == "User: What is in this picture?"
+    assert report["tokens_saved"]["drop_non_text"] > 0
+
+
+def test_repeated_blocks_are_collapsed():
+    log = "\n".join(f"line {i} of a pasted error output" for i in range(10))
+    messages = [
+        _msg("user", f"Here is the error:\n\n{log}"),
+        _msg("assistant", "Try restarting."),
+        _msg("user", f"Still failing:\n\n{log}"),
+    ]
+
+    text, report = reduce_messages(messages)
+
+    assert text.count(log) == 1
+    assert f"Still failing:\n\n{DUPLICATE_MARKER}" in text
+    assert report["tokens_saved"]["dedupe_blocks"] > 0
+
+
+def test_long_code_blocks_keep_head_and_tail():
+    code = "\n".join(f"x{i} = {i}" for i in range(100))
+    messages = [_msg("assistant", f"Here you go:\n```python\n{code}\n```")]
+
+    text, _ = reduce_messages(
+        messages, {"max_block_lines": 20, "head_lines": 5, "tail_lines": 3}
+    )
+
+    assert "x0 = 0" in text and "x99 = 99" in text
+    assert "x50 = 50" not in text
+    assert "[93 lines omitted]" in text
+    assert text.endswith("```")
+
+
+def test_message_cap_and_disabled_reducer():
+    messages = [_msg("user", "a" * 1000 + "b" * 1000)]
+
+    capped, report = reduce_messages(messages, {"max_message_chars": 300})
+    unchanged, _ = reduce_messages(messages, {"enabled": False})
+
+    assert len(capped) < 400
+    assert capped.startswith("User: aaa") and capped.endswith("bbb")
+    assert report["reduced_tokens"] < report["original_tokens"]
+    assert unchanged == "User: " + "a" * 1000 + "b" * 1000
+
+
+def test_unknown_stage_raises():
+    with pytest.raises(ValueError):
+        reduce_messages([], {"stages": ["summarise"]})
@@ -0,0 +1,142 @@
+"""
+Tests for the Obsidian vault writer and its incremental tag/date pages.
+"""
+
+import json
+
+import pytest
+
+from src.cli import run_bulk
+from src.vault_writer import VaultWriter, safe_name, tag_page_name
+from tests.bench_support import make_conversation
+
+
+def metadata(source_id, date="2024-03-05", tags=("python",), title=None):
+    return {
+        "source_id": source_id,
+        "title": title or f"Entry {source_id}",
+        "date": date,
+        "tags": list(tags),
+    }
+
+
+@pytest.fixture
+def vault(tmp_path):
+    writer = VaultWriter(str(tmp_path / "vault"))
+    yield writer
+    writer.close()
+
+
+def test_entries_are_filed_by_date_with_tag_and_daily_pages(vault):
+    path = vault.write_entry("# one", metadata("abc123456789", tags=["python", "aws"]))
+
+    assert path == (
+        vault.vault_dir
+        / "Journal/2024/03/2024-03-05 Entry abc123456789 (abc123456789).md"
+    )
+    assert path.read_text(encoding="utf-8") == "# one"
+    tag_page = (vault.vault_dir / "RIJG/Tags/aws.md").read_text(encoding="utf-8")
+    assert "[[Journal/2024/03/2024-03-05 Entry abc123456789 (abc123456789)|" in tag_page
+    daily = (vault.vault_dir / "RIJG/Daily/2024-03-05.md").read_text(encoding="utf-8")
+    assert "Entry abc123456789" in daily
+
+
+def test_ids_with_a_common_prefix_get_their_own_files(vault):
+    same = dict(title="Retry", tags=["python"])
+    first = vault.write_entry("# first", metadata("conv-1234-a", **same))
+    second = vault.write_entry("# second", metadata("conv-1234-b", **same))
+    odd = vault.write_entry("# odd", metadata("conv/1234", **same))
+    clash = vault.write_entry("# clash", metadata("conv-1234", **same))
+
+    assert len({first, second, odd, clash}) == 4
+    assert first.read_text(encoding="utf-8") == "# first"
+    assert second.read_text(encoding="utf-8") == "# second"
+    assert odd.read_text(encoding="utf-8") == "# odd"
+    assert len(vault.entries_for_tag("python")) == 4
+
+
+def test_only_affected_pages_are_rewritten(vault):
+    vault.write_entries(
+        [
+            ("a", metadata("a", tags=["python"])),
+            ("b", metadata("b", date="2024-03-06", tags=["rust"])),
+        ]
+    )
+    rust_page = vault.vault_dir / "RIJG/Tags/rust.md"
+    rust_page.write_text("untouched", encoding="utf-8")
+
+    vault.write_entry("c", metadata("c", tags=["python"]))
+
+    assert rust_page.read_text(encoding="utf-8") == "untouched"
+    assert [e["source_id"] for e in vault.entries_for_tag("python")] == ["a", "c"]
+
+
+def test_rewriting_an_entry_moves_it_between_pages(vault):
+    first = vault.write_entry("v1", metadata("a", tags=["python"]))
+    second = vault.write_entry(
+        "v2", metadata("a", date="2024-04-01", tags=["go"], title="Renamed")
+    )
+
+    assert not first.exists() and second.exists()
+    assert len(vault) == 1
+    assert not (vault.vault_dir / "RIJG/Tags/python.md").exists()
+    assert not (vault.vault_dir / "RIJG/Daily/2024-03-05.md").exists()
+    assert "Renamed" in (vault.vault_dir / "RIJG/Tags/go.md").read_text(
+        encoding="utf-8"
+    )
+
+
+def test_index_persists_and_pages_can_be_rebuilt(tmp_path):
+    root = str(tmp_path / "vault")
+    VaultWriter(root).write_entry("a", metadata("a", tags=["python", "aws"]))
+
+    reopened = VaultWriter(root)
+    assert reopened.remove_entry("a")
+    assert not reopened.remove_entry("a")
+    reopened.write_entry("b", metadata("b"))
+    assert reopened.rebuild_pages() == 2
+
+
+def test_safe_name_strips_link_breaking_characters():
+    assert safe_name("a/b: [c]#d|e") == "a-b- -c-d-e"
+    assert safe_name("...") == "untitled"
+
+
+def test_user_notes_outside_the_pages_folder_are_left_alone(vault):
+    user_daily = vault.vault_dir / "Daily/2024-03-05.md"
+    user_tag = vault.vault_dir / "Tags/python.md"
+    for note in (user_daily, user_tag):
+        note.parent.mkdir(parents=True, exist_ok=True)
+        note.write_text("my own note", encoding="utf-8")
+
+    vault.write_entry("a", metadata("a", tags=["python"]))
+    vault.remove_entry("a")
+
+    assert user_daily.read_text(encoding="utf-8") == "my own note"
+    assert user_tag.read_text(encoding="utf-8") == "my own note"
+
+
+def test_tags_with_the_same_safe_name_get_their_own_pages(vault):
+    vault.write_entry("a", metadata("a", tags=["a/b"]))
+    vault.write_entry("b", metadata("b", tags=["a-b"]))
+    vault.write_entry("c", metadata("c", tags=["A-B"]))
+
+    assert tag_page_name("a-b") == "a-b"
+    assert len({tag_page_name(tag) for tag in ("a/b", "a-b", "A-B")}) == 3
+    pages = (vault.vault_dir / "RIJG/Tags").glob("*.md")
+    headings = {page.read_text(encoding="utf-8").split("\n", 1)[0] for page in pages}
+    assert headings == {"# #a/b", "# #a-b", "# #A-B"}
+
+
+def test_cli_writes_into_a_vault(tmp_path, gemini_stub):
+    export = tmp_path / "conversations.json"
+    export.write_text(
+        json.dumps([make_conversation(messages=4, conversation_id="conv-1")]),
+        encoding="utf-8",
+    )
+
+    stats = run_bulk(export, tmp_path / "out", workers=0, vault_dir=tmp_path / "v")
+
+    assert stats["succeeded"] == 1
+    assert len(list((tmp_path / "v" / "Journal").rglob("*.md"))) == 1
+    assert list((tmp_path / "v" / "RIJG" / "Daily").glob("*.md"))